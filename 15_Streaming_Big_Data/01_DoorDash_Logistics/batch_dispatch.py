@@ -0,0 +1,158 @@
+import time
+from utils_logger import setup_logger
+
+logger = setup_logger("batch_dispatch")
+
+# Micro-batch defaults: wait up to BATCH_WINDOW_SEC or BATCH_MAX_ORDERS orders,
+# then assign the whole batch at once using each order's nearest candidates
+BATCH_WINDOW_SEC = 2.0
+BATCH_MAX_ORDERS = 32
+CANDIDATES_PER_ORDER = 5
+
+# Assignment costs: leaving an order unassigned is cheaper than any pair that
+# is not a candidate, and dearer than any real pickup distance
+UNASSIGNED_COST = 1e6
+FORBIDDEN_COST = 1e9
+
+def hungarian(cost):
+    # Min-cost assignment for an n x m matrix with n <= m (O(n^2 m)).
+    # Returns col_for_row: the column assigned to each row.
+    n = len(cost)
+    if n == 0:
+        return []
+    m = len(cost[0])
+    if n > m:
+        raise ValueError(f"need rows <= columns, got {n} x {m}")
+    
+    INF = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    row_of = [0] * (m + 1)  # row_of[j]: row matched to column j (1-based, 0 = free)
+    way = [0] * (m + 1)
+    
+    for i in range(1, n + 1):
+        row_of[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = row_of[j0]
+            delta, j1 = INF, 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[row_of[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if row_of[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            row_of[j0] = row_of[j1]
+            j0 = j1
+    
+    col_for_row = [0] * n
+    for j in range(1, m + 1):
+        if row_of[j]:
+            col_for_row[row_of[j] - 1] = j - 1
+    return col_for_row
+
+def assign_orders(orders, index, k=CANDIDATES_PER_ORDER):
+    # Jointly assign orders [(order_id, loc)] to idle drivers, minimising
+    # total pickup distance over each order's k nearest candidates.
+    # Returns {order_id: (driver_id, distance)}, None for unassigned orders.
+    candidates = [index.k_nearest(loc, k) for _, loc in orders]
+    if index.arrays is not None:
+        # Geo index: cost is the haversine km, one vectorized call per order
+        candidates = [
+            list(zip([d for d, _ in options], index.score(loc, [d for d, _ in options]).tolist()))
+            if options else []
+            for (_, loc), options in zip(orders, candidates)
+        ]
+    
+    columns = {}
+    for options in candidates:
+        for driver_id, _ in options:
+            columns.setdefault(driver_id, len(columns))
+    drivers = list(columns)
+    
+    # One dummy column per order stands for "leave unassigned this round"
+    n_cols = len(drivers) + len(orders)
+    cost = []
+    for row, options in enumerate(candidates):
+        line = [FORBIDDEN_COST] * n_cols
+        for driver_id, dist in options:
+            line[columns[driver_id]] = dist
+        line[len(drivers) + row] = UNASSIGNED_COST
+        cost.append(line)
+    
+    result = {}
+    for row, col in enumerate(hungarian(cost)):
+        order_id = orders[row][0]
+        if col < len(drivers) and cost[row][col] < UNASSIGNED_COST:
+            result[order_id] = (drivers[col], cost[row][col])
+        else:
+            result[order_id] = None
+    return result
+
+class BatchDispatcher:
+    # Collects ready orders and assigns them in micro-batches. Drivers are
+    # marked BUSY under the state lock, so no driver is handed two orders
+    # and pings cannot interleave with a batch.
+    
+    def __init__(self, drivers, index, lock, window_sec=BATCH_WINDOW_SEC,
+                 max_orders=BATCH_MAX_ORDERS, candidates=CANDIDATES_PER_ORDER):
+        if max_orders < 1:
+            raise ValueError(f"max_orders must be >= 1, got {max_orders}")
+        self.drivers = drivers
+        self.index = index
+        self.lock = lock
+        self.window_sec = window_sec
+        self.max_orders = max_orders
+        self.candidates = candidates
+        self.pending = []
+        self.opened_at = None
+    
+    def submit(self, order_id, loc):
+        # Queue an order; returns the batch's assignments if this filled it
+        if not self.pending:
+            self.opened_at = time.monotonic()
+        self.pending.append((order_id, tuple(loc)))
+        if len(self.pending) >= self.max_orders:
+            return self.flush()
+        return {}
+    
+    def poll(self):
+        # Flush once the oldest pending order has waited a full window
+        if self.pending and time.monotonic() - self.opened_at >= self.window_sec:
+            return self.flush()
+        return {}
+    
+    def flush(self):
+        orders, self.pending = self.pending, []
+        if not orders:
+            return {}
+        
+        with self.lock:
+            assignments = assign_orders(orders, self.index, self.candidates)
+            for match in assignments.values():
+                if match is not None:
+                    driver_id = match[0]
+                    self.drivers[driver_id]["status"] = "BUSY"
+                    self.index.remove(driver_id)
+        
+        matched = sum(match is not None for match in assignments.values())
+        total = sum(match[1] for match in assignments.values() if match is not None)
+        logger.info(f"📦 BATCH: {matched}/{len(orders)} orders assigned (Total Distance: {total:.3f})")
+        return assignments
\ No newline at end of file
@@ -0,0 +1,198 @@
+import argparse
+import logging
+import threading
+import time
+from itertools import islice
+import numpy as np
+from producer import generate_event_stream
+from consumer import GRID_CELL_KM, REFERENCE_LAT, apply_driver_ping, match_driver
+from batch_dispatch import BATCH_MAX_ORDERS, CANDIDATES_PER_ORDER, BatchDispatcher
+from geo_distance import DriverArrays, Projection
+from spatial_index import GridIndex
+
+# Benchmark: dispatch capacity on a seeded, unpaced order/ping stream
+# (producer.generate_event_stream) instead of the sleep-paced simulation.
+# Run with: python bench_dispatch.py --events 2000000 --drivers 50000 --spread 0.1
+#
+# Time is "engine time": only the dispatch calls are clocked, so the
+# generator and the quality check are free. An order's latency is the
+# engine time from its arrival until its assignment comes back, which for
+# batch and sharded mode includes waiting for the rest of its batch/wave.
+# Quality compares each sampled match with an exhaustive haversine scan of
+# the idle drivers at the moment the order arrived.
+
+class Engine:
+    # Greedy: every order goes through consumer.match_driver on arrival
+    
+    def __init__(self, args):
+        self.drivers = {}
+        self.index = GridIndex(args.cell_size, Projection(REFERENCE_LAT))
+        self.lock = threading.RLock()
+    
+    def ping(self, event):
+        apply_driver_ping(event, self.drivers, self.index, self.lock)
+    
+    def order(self, order_id, loc):
+        # Returns {order_id: (driver_id, km) or None} for every order resolved by this call
+        return {order_id: match_driver(order_id, loc, self.drivers, self.index, self.lock)}
+    
+    def drain(self):
+        return {}
+    
+    def close(self):
+        pass
+
+class BatchEngine(Engine):
+    # Micro-batches closed by size only: an unpaced stream has no wall-clock window
+    
+    def __init__(self, args):
+        super().__init__(args)
+        self.dispatcher = BatchDispatcher(self.drivers, self.index, self.lock, window_sec=float("inf"),
+                                          max_orders=args.batch_size, candidates=args.candidates)
+    
+    def order(self, order_id, loc):
+        return self.dispatcher.submit(order_id, loc)
+    
+    def drain(self):
+        return self.dispatcher.flush()
+
+class ShardedEngine:
+    # Pings and orders are buffered and sent as waves; pings that arrived
+    # after an order in the same wave are applied before it is matched
+    
+    def __init__(self, args):
+        # Imported here: worker processes are only started in this mode
+        from sharded_dispatch import ShardedDispatcher
+        self.dispatcher = ShardedDispatcher(args.workers, cell_km=args.cell_size)
+        self.wave = args.wave
+        self.pings = []
+        self.orders = []
+    
+    def ping(self, event):
+        self.pings.append(event)
+    
+    def order(self, order_id, loc):
+        self.orders.append((order_id, loc))
+        if len(self.orders) >= self.wave:
+            return self.drain()
+        return {}
+    
+    def drain(self):
+        pings, self.pings = self.pings, []
+        orders, self.orders = self.orders, []
+        if pings:
+            self.dispatcher.route_pings(pings)
+        return self.dispatcher.dispatch(orders) if orders else {}
+    
+    def close(self):
+        self.dispatcher.close()
+
+ENGINES = {"greedy": Engine, "batch": BatchEngine, "sharded": ShardedEngine}
+
+def run_mode(mode, args):
+    engine = ENGINES[mode](args)
+    reference = DriverArrays()  # idle drivers, for the exhaustive-scan check
+    stream = generate_event_stream(args.seed, args.drivers, args.spread, args.order_ratio)
+    
+    def track_ping(event):
+        if event["status"] == "IDLE":
+            reference.set(event["driver_id"], event["location"])
+        else:
+            reference.remove(event["driver_id"])
+    
+    # Initial fleet: one ping per driver, not timed
+    for event in islice(stream, args.drivers):
+        engine.ping(event)
+        track_ping(event)
+    if mode == "sharded":
+        engine.drain()
+    
+    clock = 0.0       # engine seconds so far
+    arrived = {}      # order_id -> engine clock at arrival
+    optimum = {}      # sampled order_id -> exhaustive-scan km at arrival
+    latencies = []
+    excess = []       # matched km - optimum km, for sampled orders
+    orders = matched = 0
+    
+    def settle(results):
+        nonlocal matched
+        for order_id, match in results.items():
+            latencies.append(clock - arrived.pop(order_id))
+            best = optimum.pop(order_id, None)
+            if match is None:
+                continue
+            matched += 1
+            reference.remove(match[0])
+            if best is not None:
+                excess.append(match[1] - best)
+    
+    for event in islice(stream, args.events):
+        if event["event_type"] == "driver_update":
+            start = time.perf_counter()
+            engine.ping(event)
+            clock += time.perf_counter() - start
+            track_ping(event)
+            continue
+        
+        orders += 1
+        order_id, loc = event["order_id"], event["location"]
+        if orders % args.quality_every == 0:
+            optimum[order_id] = reference.nearest(loc)[1]
+        arrived[order_id] = clock
+        start = time.perf_counter()
+        results = engine.order(order_id, loc)
+        clock += time.perf_counter() - start
+        settle(results)
+    
+    start = time.perf_counter()
+    results = engine.drain()
+    clock += time.perf_counter() - start
+    settle(results)
+    engine.close()
+    
+    excess = np.array(excess)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e6 if latencies else (0.0, 0.0, 0.0)
+    return {
+        "mode": mode,
+        "orders": orders,
+        "matched": matched,
+        "events_per_s": args.events / clock if clock else 0.0,
+        "matched_per_s": matched / clock if clock else 0.0,
+        "p50_us": p50, "p95_us": p95, "p99_us": p99,
+        "sampled": len(excess),
+        "worse": int(np.sum(excess > 1e-9)),
+        "excess_m": float(excess.mean() * 1000) if len(excess) else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatch throughput on a synthetic order/ping stream")
+    parser.add_argument("--events", type=int, default=500_000, help="timed events after the initial fleet pings")
+    parser.add_argument("--drivers", type=int, default=20_000)
+    parser.add_argument("--spread", type=float, default=0.1, help="degrees around the city center (sets density)")
+    parser.add_argument("--order-ratio", type=float, default=0.3, help="fraction of events that are orders")
+    parser.add_argument("--modes", default="greedy,batch,sharded", help="comma-separated: greedy, batch, sharded")
+    parser.add_argument("--cell-size", type=float, default=GRID_CELL_KM, help="grid cell edge in km")
+    parser.add_argument("--batch-size", type=int, default=BATCH_MAX_ORDERS)
+    parser.add_argument("--candidates", type=int, default=CANDIDATES_PER_ORDER)
+    parser.add_argument("--workers", type=int, default=4, help="shard worker processes")
+    parser.add_argument("--wave", type=int, default=2000, help="orders per sharded dispatch() call")
+    parser.add_argument("--quality-every", type=int, default=50, help="check every Nth order against a full scan")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    for name in ("dispatch_engine", "batch_dispatch"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    
+    side_km = 2 * args.spread * 111.0
+    print(f"{args.events} events, {args.drivers} drivers over ~{side_km:.0f} km square "
+          f"({args.drivers / side_km ** 2:.1f} drivers/km^2), order ratio {args.order_ratio}")
+    print(f"{'mode':>8} {'orders':>8} {'matched':>8} {'events/s':>10} {'matched/s':>10} "
+          f"{'p50 us':>8} {'p95 us':>9} {'p99 us':>9} {'worse':>9} {'excess m':>9}")
+    for mode in args.modes.split(","):
+        r = run_mode(mode.strip(), args)
+        print(f"{r['mode']:>8} {r['orders']:>8d} {r['matched']:>8d} {r['events_per_s']:>10.0f} "
+              f"{r['matched_per_s']:>10.0f} {r['p50_us']:>8.1f} {r['p95_us']:>9.1f} {r['p99_us']:>9.1f} "
+              f"{r['worse']:>4d}/{r['sampled']:<4d} {r['excess_m']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
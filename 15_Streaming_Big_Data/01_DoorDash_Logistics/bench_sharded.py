@@ -0,0 +1,67 @@
+import argparse
+import copy
+import logging
+import os
+import time
+from benchmark import make_drivers, make_orders
+from consumer import GRID_CELL_KM, REFERENCE_LAT, find_nearest
+from geo_distance import Projection
+from sharded_dispatch import ShardedDispatcher
+from spatial_index import build_idle_index
+
+# Benchmark: dispatch throughput of the geo-sharded workers vs worker count.
+# Run with: python bench_sharded.py --drivers 100000 --orders 20000 --workers 1,2,4,8
+# Scaling needs as many free CPU cores as workers (plus one for the router).
+
+def run_single(drivers, orders):
+    # In-process reference: same matcher, no queues
+    state = copy.deepcopy(drivers)
+    index = build_idle_index(state, GRID_CELL_KM, Projection(REFERENCE_LAT))
+    start = time.perf_counter()
+    for loc in orders:
+        driver_id, _ = find_nearest(loc, index)
+        if driver_id is not None:
+            state[driver_id]["status"] = "BUSY"
+            index.remove(driver_id)
+    return len(orders) / (time.perf_counter() - start)
+
+def run_sharded(n_workers, drivers, orders, wave):
+    dispatcher = ShardedDispatcher(n_workers)
+    try:
+        dispatcher.route_pings([
+            {"event_type": "driver_update", "driver_id": d, "location": v["loc"], "status": v["status"]}
+            for d, v in drivers.items()
+        ])
+        tagged = [(i, loc) for i, loc in enumerate(orders)]
+        start = time.perf_counter()
+        for i in range(0, len(tagged), wave):
+            dispatcher.dispatch(tagged[i:i + wave])
+        elapsed = time.perf_counter() - start
+        return len(orders) / elapsed, dispatcher.stats
+    finally:
+        dispatcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Geo-sharded dispatch scaling benchmark")
+    parser.add_argument("--drivers", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--spread", type=float, default=0.25, help="degrees around the city center")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--wave", type=int, default=2000, help="orders dispatched per dispatch() call")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    logging.getLogger("dispatch_engine").setLevel(logging.ERROR)
+    drivers = make_drivers(args.drivers, args.spread, args.seed)
+    orders = make_orders(args.orders, args.spread, args.seed)
+    
+    print(f"{args.drivers} drivers, {args.orders} orders, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'orders/s':>10} {'local':>7} {'cross':>7} {'retries':>8} {'unmatched':>10}")
+    print(f"{'inproc':>8} {run_single(drivers, orders):>10.0f}")
+    for n in (int(x) for x in args.workers.split(",")):
+        rate, stats = run_sharded(n, drivers, orders, args.wave)
+        print(f"{n:>8} {rate:>10.0f} {stats['local']:>7} {stats['cross_shard']:>7} "
+              f"{stats['retries']:>8} {stats['unmatched']:>10}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
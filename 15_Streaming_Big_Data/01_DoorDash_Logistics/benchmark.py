@@ -0,0 +1,188 @@
+import argparse
+import copy
+import logging
+import random
+import threading
+import time
+import numpy as np
+from consumer import GRID_CELL_KM, REFERENCE_LAT, apply_driver_ping, find_nearest, find_nearest_bruteforce
+from spatial_index import build_idle_index
+from batch_dispatch import BATCH_MAX_ORDERS, CANDIDATES_PER_ORDER, BatchDispatcher
+from geo_distance import Projection, haversine_km, haversine_many
+
+# Benchmark: nearest-idle-driver lookup, brute-force scan vs grid index,
+# incremental ping ingestion, greedy vs micro-batch dispatch, and the
+# per-pair vs vectorized haversine kernel.
+# Run with: python benchmark.py --drivers 100000 --orders 200 --pings 200000
+
+CENTER = (47.60, -122.33)  # Seattle
+
+def make_drivers(n, spread, seed):
+    rng = random.Random(seed)
+    drivers = {}
+    for driver_id in range(1, n + 1):
+        # Snap some drivers to a coarse lattice so exact distance ties occur
+        if driver_id % 10 == 0:
+            lat = CENTER[0] + round(rng.uniform(-spread, spread), 2)
+            lon = CENTER[1] + round(rng.uniform(-spread, spread), 2)
+        else:
+            lat = CENTER[0] + rng.uniform(-spread, spread)
+            lon = CENTER[1] + rng.uniform(-spread, spread)
+        drivers[driver_id] = {"loc": (lat, lon), "status": rng.choice(["IDLE", "IDLE", "BUSY"])}
+    return drivers
+
+def make_orders(n, spread, seed):
+    rng = random.Random(seed + 1)
+    return [(CENTER[0] + rng.uniform(-spread, spread), CENTER[1] + rng.uniform(-spread, spread))
+            for _ in range(n)]
+
+def make_pings(n, drivers, seed):
+    # Mostly small moves, some status flips and a few brand-new drivers
+    rng = random.Random(seed + 2)
+    ids = list(drivers)
+    next_id = max(ids) + 1
+    pings = []
+    for _ in range(n):
+        if rng.random() < 0.01:
+            driver_id, next_id = next_id, next_id + 1
+            lat, lon = CENTER[0] + rng.uniform(-0.25, 0.25), CENTER[1] + rng.uniform(-0.25, 0.25)
+        else:
+            driver_id = rng.choice(ids)
+            lat, lon = drivers[driver_id]["loc"]
+            lat, lon = lat + rng.uniform(-0.002, 0.002), lon + rng.uniform(-0.002, 0.002)
+        pings.append({
+            "event_type": "driver_update",
+            "driver_id": driver_id,
+            "location": (lat, lon),
+            "status": rng.choice(["IDLE", "BUSY", "IDLE"])
+        })
+    return pings
+
+def compare_dispatch(drivers, orders, batch_sizes, candidates, cell_size):
+    # Dispatch the same burst greedily and in micro-batches, each on its own
+    # copy of the driver state. Returns rows of (name, assigned, distance, seconds).
+    state = copy.deepcopy(drivers)
+    index = build_idle_index(state, cell_size, Projection(REFERENCE_LAT))
+    start = time.perf_counter()
+    assigned, total = 0, 0.0
+    for loc in orders:
+        # Same claim as match_driver(): nearest idle driver, then BUSY
+        driver_id, dist = find_nearest(loc, index)
+        if driver_id is not None:
+            state[driver_id]["status"] = "BUSY"
+            index.remove(driver_id)
+            assigned += 1
+            total += dist
+    rows = [("greedy", assigned, total, time.perf_counter() - start)]
+    
+    for size in batch_sizes:
+        state = copy.deepcopy(drivers)
+        index = build_idle_index(state, cell_size, Projection(REFERENCE_LAT))
+        dispatcher = BatchDispatcher(state, index, threading.RLock(), window_sec=0,
+                                     max_orders=size, candidates=candidates)
+        start = time.perf_counter()
+        results = {}
+        for i, loc in enumerate(orders):
+            results.update(dispatcher.submit(f"ORD-{i}", loc))
+        results.update(dispatcher.flush())
+        elapsed = time.perf_counter() - start
+        matches = [m for m in results.values() if m is not None]
+        rows.append((f"batch x{size}", len(matches), sum(m[1] for m in matches), elapsed))
+    
+    return rows
+
+def worse_matches(found, expected):
+    # Orders whose chosen driver is farther than the brute-force optimum
+    # (ids may differ on exact ties, distances may not)
+    return sum(f[1] > e[1] * (1 + 1e-9) for f, e in zip(found, expected))
+
+def compare_kernels(n, spread, seed, repeat=20):
+    # Distances from one order to n drivers: Python loop vs one NumPy call
+    rng = random.Random(seed)
+    lats = np.array([CENTER[0] + rng.uniform(-spread, spread) for _ in range(n)])
+    lons = np.array([CENTER[1] + rng.uniform(-spread, spread) for _ in range(n)])
+    pairs = list(zip(lats.tolist(), lons.tolist()))
+    order = CENTER
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        loop = [haversine_km(order, loc) for loc in pairs]
+    loop_s = (time.perf_counter() - start) / repeat
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        vec = haversine_many(order[0], order[1], lats, lons)
+    vec_s = (time.perf_counter() - start) / repeat
+    
+    max_err = float(np.max(np.abs(vec - np.array(loop))))
+    return loop_s, vec_s, max_err
+
+def main():
+    parser = argparse.ArgumentParser(description="Nearest-driver lookup benchmark")
+    parser.add_argument("--drivers", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=0.25, help="degrees around the city center")
+    parser.add_argument("--cell-size", type=float, default=GRID_CELL_KM, help="grid cell edge in km")
+    parser.add_argument("--pings", type=int, default=200_000, help="driver pings applied incrementally")
+    parser.add_argument("--dispatch-drivers", type=int, default=3000, help="drivers in the dispatch comparison")
+    parser.add_argument("--dispatch-orders", type=int, default=1500, help="orders in the dispatch burst")
+    parser.add_argument("--batch-sizes", default=f"8,{BATCH_MAX_ORDERS},128", help="comma-separated micro-batch sizes")
+    parser.add_argument("--candidates", type=int, default=CANDIDATES_PER_ORDER)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    drivers = make_drivers(args.drivers, args.spread, args.seed)
+    orders = make_orders(args.orders, args.spread, args.seed)
+    
+    start = time.perf_counter()
+    index = build_idle_index(drivers, args.cell_size, Projection(REFERENCE_LAT))
+    build_s = time.perf_counter() - start
+    idle = len(index)
+    
+    start = time.perf_counter()
+    brute = [find_nearest_bruteforce(loc, drivers) for loc in orders]
+    brute_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    grid = [find_nearest(loc, index) for loc in orders]
+    grid_s = time.perf_counter() - start
+    
+    mismatches = worse_matches(grid, brute)
+    
+    pings = make_pings(args.pings, drivers, args.seed)
+    start = time.perf_counter()
+    for event in pings:
+        apply_driver_ping(event, drivers, index)
+    ping_s = time.perf_counter() - start
+    
+    # The incrementally updated index must still agree with a full scan
+    check = orders[:50]
+    mismatches += worse_matches([find_nearest(loc, index) for loc in check],
+                                [find_nearest_bruteforce(loc, drivers) for loc in check])
+    
+    print(f"{args.drivers} drivers ({idle} idle), {args.orders} orders, cell {args.cell_size} km")
+    print(f"index build:  {build_s * 1000:10.1f} ms")
+    print(f"brute force:  {brute_s / args.orders * 1e6:10.1f} us/order")
+    print(f"grid index:   {grid_s / args.orders * 1e6:10.1f} us/order  ({brute_s / grid_s:.0f}x faster)")
+    print(f"driver pings: {args.pings / ping_s:10.0f} pings/s (incremental, no rebuild)")
+    print(f"worse than brute force: {mismatches}")
+    
+    loop_s, vec_s, max_err = compare_kernels(args.drivers, args.spread, args.seed)
+    print(f"\nhaversine, 1 order x {args.drivers} drivers:")
+    print(f"per-pair loop: {loop_s * 1000:10.2f} ms")
+    print(f"vectorized:    {vec_s * 1000:10.2f} ms  ({loop_s / vec_s:.0f}x faster, max diff {max_err:.1e} km)")
+    
+    logging.getLogger("batch_dispatch").setLevel(logging.WARNING)
+    burst_drivers = make_drivers(args.dispatch_drivers, args.spread, args.seed + 3)
+    burst_orders = make_orders(args.dispatch_orders, args.spread, args.seed + 3)
+    sizes = [int(x) for x in args.batch_sizes.split(",")]
+    print(f"\ndispatch: {args.dispatch_orders} orders, {args.dispatch_drivers} drivers, "
+          f"{args.candidates} candidates/order")
+    print(f"{'mode':>12} {'assigned':>9} {'total km':>11} {'us/order':>9}")
+    for name, assigned, total, seconds in compare_dispatch(burst_drivers, burst_orders, sizes,
+                                                           args.candidates, args.cell_size):
+        print(f"{name:>12} {assigned:>9d} {total:>11.3f} {seconds / args.dispatch_orders * 1e6:>9.1f}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
\ No newline at end of file
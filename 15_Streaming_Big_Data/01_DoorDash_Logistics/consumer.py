@@ -1,6 +1,11 @@
+import argparse
+import threading
 import time
-import math
+import numpy as np
 from utils_logger import setup_logger
+from spatial_index import build_idle_index
+from geo_distance import Projection, haversine_km
+from batch_dispatch import BATCH_MAX_ORDERS, BATCH_WINDOW_SEC, CANDIDATES_PER_ORDER, BatchDispatcher
 
 logger = setup_logger("dispatch_engine")
 
@@ -11,32 +16,93 @@ drivers_db = {
     103: {"loc": (47.58, -122.30), "status": "IDLE"},
 }
 
-def calculate_distance(loc1, loc2):
-    # Simple Euclidean distance
-    return math.sqrt((loc1[0] - loc2[0])**2 + (loc1[1] - loc2[1])**2)
+# Geometry: the grid works in planar km around the service area's latitude,
+# candidates are then ranked by great-circle (haversine) distance
+REFERENCE_LAT = 47.60  # Seattle
+GRID_CELL_KM = 0.5
+MATCH_CANDIDATES = 8   # nearest drivers (planar) re-scored with haversine
 
-def match_driver(order_id, order_loc):
-    logger.info(f"Processing Order {order_id} at {order_loc}...")
-    
+# Grid index over IDLE drivers; nearest-driver lookups only touch nearby cells
+idle_index = build_idle_index(drivers_db, GRID_CELL_KM, Projection(REFERENCE_LAT))
+
+# Guards drivers_db + idle_index: a match and the BUSY update happen together
+state_lock = threading.RLock()
+
+def find_nearest_bruteforce(order_loc, drivers=drivers_db):
+    # Reference O(drivers) scan, kept for benchmarks and verification
     best_driver = None
     closest_dist = float('inf')
     
-    for driver_id, data in drivers_db.items():
+    for driver_id, data in drivers.items():
         if data['status'] == 'IDLE':
-            dist = calculate_distance(order_loc, data['loc'])
+            dist = haversine_km(order_loc, data['loc'])
             if dist < closest_dist:
                 closest_dist = dist
                 best_driver = driver_id
-                
-    if best_driver:
-        logger.info(f"✅ MATCH: Assigned Driver {best_driver} (Distance: {closest_dist:.3f})")
-        return True
+    
+    return best_driver, closest_dist
+
+def find_nearest(order_loc, index=idle_index, k=MATCH_CANDIDATES):
+    # Grid candidates, then one vectorized haversine call over their coordinates.
+    # Candidates come closest-first, so argmin keeps the grid's tie order.
+    candidates = [driver_id for driver_id, _ in index.k_nearest(order_loc, k)]
+    if not candidates:
+        return None, float('inf')
+    dists = index.score(order_loc, candidates)
+    best = int(np.argmin(dists))
+    return candidates[best], float(dists[best])
+
+def apply_driver_ping(event, drivers=drivers_db, index=idle_index, lock=state_lock):
+    # Apply one driver_update event from the producer: O(1) bucket moves,
+    # no index rebuild. Only IDLE drivers live in the index.
+    driver_id = event["driver_id"]
+    loc = tuple(event["location"])
+    status = event["status"]
+    
+    with lock:
+        driver = drivers.get(driver_id)
+        if driver is None:
+            drivers[driver_id] = {"loc": loc, "status": status}
+            index.register(driver_id)
+        else:
+            driver["loc"] = loc
+            driver["status"] = status
+        
+        if status == "IDLE":
+            index.add(driver_id, loc)
+        else:
+            index.remove(driver_id)
+
+def match_driver(order_id, order_loc, drivers=drivers_db, index=idle_index, lock=state_lock):
+    logger.info(f"Processing Order {order_id} at {order_loc}...")
+    
+    # Claim the driver in the same critical section that found it
+    with lock:
+        best_driver, closest_dist = find_nearest(order_loc, index)
+        if best_driver is not None:
+            drivers[best_driver]["status"] = "BUSY"
+            index.remove(best_driver)
+    
+    if best_driver is not None:
+        logger.info(f"✅ MATCH: Assigned Driver {best_driver} (Distance: {closest_dist:.3f} km)")
+        return best_driver, closest_dist
     else:
         logger.warning(f"❌ FAILED: No available drivers for Order {order_id}")
-        return False
+        return None
 
-def start_service():
-    logger.info("Dispatch Service Online...")
+def handle_event(event, dispatcher=None):
+    # Route one stream event (see producer.py) to the matching handler.
+    # With a BatchDispatcher, ready orders wait for the next micro-batch.
+    if event["event_type"] == "driver_update":
+        apply_driver_ping(event)
+    elif event["event_type"] == "order_ready":
+        if dispatcher is not None:
+            return dispatcher.submit(event["order_id"], event["location"])
+        return match_driver(event["order_id"], tuple(event["location"]))
+
+def start_service(mode="greedy", window_sec=BATCH_WINDOW_SEC, batch_size=BATCH_MAX_ORDERS,
+                  candidates=CANDIDATES_PER_ORDER, workers=4):
+    logger.info(f"Dispatch Service Online ({mode} mode)...")
     logger.info("Listening for Order Events (Simulated Loop)...")
     
     # Simulate receiving an order every few seconds
@@ -46,9 +112,46 @@ def start_service():
         ("ORD-888", (47.581, -122.301))
     ]
     
+    if mode == "sharded":
+        # Imported here: sharded_dispatch builds on this module
+        from sharded_dispatch import ShardedDispatcher
+        sharded = ShardedDispatcher(workers)
+        sharded.route_pings([
+            {"event_type": "driver_update", "driver_id": d, "location": v["loc"], "status": v["status"]}
+            for d, v in drivers_db.items()
+        ])
+        for order_id, loc in mock_orders:
+            time.sleep(2)
+            match = sharded.dispatch([(order_id, loc)])[order_id]
+            if match is not None:
+                logger.info(f"✅ MATCH: Assigned Driver {match[0]} to {order_id} (Distance: {match[1]:.3f} km)")
+            else:
+                logger.warning(f"❌ FAILED: No available drivers for Order {order_id}")
+        logger.info(f"Shard stats: {sharded.stats}")
+        sharded.close()
+        return
+    
+    dispatcher = None
+    if mode == "batch":
+        dispatcher = BatchDispatcher(drivers_db, idle_index, state_lock, window_sec, batch_size, candidates)
+    
     for order_id, loc in mock_orders:
         time.sleep(2)
-        match_driver(order_id, loc)
+        handle_event({"event_type": "order_ready", "order_id": order_id, "location": loc}, dispatcher)
+        if dispatcher is not None:
+            dispatcher.poll()
+    
+    if dispatcher is not None:
+        dispatcher.flush()
 
 if __name__ == "__main__":
-    start_service()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="DoorDash dispatch engine")
+    parser.add_argument("--mode", choices=["greedy", "batch", "sharded"], default="greedy",
+                        help="greedy: match each order on arrival; batch: assign micro-batches jointly; "
+                             "sharded: one worker process per region")
+    parser.add_argument("--window", type=float, default=BATCH_WINDOW_SEC, help="batch window in seconds")
+    parser.add_argument("--batch-size", type=int, default=BATCH_MAX_ORDERS, help="orders that close a batch early")
+    parser.add_argument("--candidates", type=int, default=CANDIDATES_PER_ORDER, help="nearest drivers considered per order")
+    parser.add_argument("--workers", type=int, default=4, help="shard worker processes (sharded mode)")
+    args = parser.parse_args()
+    start_service(args.mode, args.window, args.batch_size, args.candidates, args.workers)
\ No newline at end of file
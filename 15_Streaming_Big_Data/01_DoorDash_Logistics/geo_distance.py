@@ -0,0 +1,102 @@
+import math
+import numpy as np
+
+# Great-circle distances in kilometres, per pair (pure Python) or from one
+# point to many (NumPy, one call over contiguous float64 arrays)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+def haversine_km(loc1, loc2):
+    lat1, lon1 = math.radians(loc1[0]), math.radians(loc1[1])
+    lat2, lon2 = math.radians(loc2[0]), math.radians(loc2[1])
+    a = math.sin((lat2 - lat1) / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2)**2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def equirectangular_km(loc1, loc2):
+    # Flat-earth approximation; fine within a city, cheaper than haversine
+    x = math.radians(loc2[1] - loc1[1]) * math.cos(math.radians((loc1[0] + loc2[0]) / 2))
+    y = math.radians(loc2[0] - loc1[0])
+    return EARTH_RADIUS_KM * math.sqrt(x * x + y * y)
+
+def haversine_many(lat, lon, lats, lons):
+    # Distances from (lat, lon) to every (lats[i], lons[i])
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2)**2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def equirectangular_many(lat, lon, lats, lons):
+    x = np.radians(lons - lon) * np.cos(np.radians((lats + lat) / 2))
+    y = np.radians(lats - lat)
+    return EARTH_RADIUS_KM * np.sqrt(x * x + y * y)
+
+METRICS = {"haversine": haversine_many, "equirectangular": equirectangular_many}
+
+class Projection:
+    # Planar (y, x) kilometres around a reference latitude. Euclidean distance
+    # between projected points is an equirectangular distance with a fixed
+    # latitude, so a grid over them can prune rings exactly.
+    
+    def __init__(self, ref_lat):
+        self.ref_lat = ref_lat
+        self.ky = KM_PER_DEGREE
+        self.kx = KM_PER_DEGREE * math.cos(math.radians(ref_lat))
+    
+    def __call__(self, loc):
+        return (loc[0] * self.ky, loc[1] * self.kx)
+
+class DriverArrays:
+    # Driver coordinates in contiguous float64 arrays with a slot per driver.
+    # Removal swaps the last slot into the hole, so arrays stay dense.
+    
+    def __init__(self, capacity=1024):
+        self.lat = np.empty(capacity, dtype=np.float64)
+        self.lon = np.empty(capacity, dtype=np.float64)
+        self.ids = []
+        self.slots = {}
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def set(self, driver_id, loc):
+        slot = self.slots.get(driver_id)
+        if slot is None:
+            slot = len(self.ids)
+            if slot == len(self.lat):
+                self.lat = np.concatenate([self.lat, np.empty(slot, dtype=np.float64)])
+                self.lon = np.concatenate([self.lon, np.empty(slot, dtype=np.float64)])
+            self.slots[driver_id] = slot
+            self.ids.append(driver_id)
+        self.lat[slot] = loc[0]
+        self.lon[slot] = loc[1]
+    
+    def remove(self, driver_id):
+        slot = self.slots.pop(driver_id, None)
+        if slot is None:
+            return False
+        last = len(self.ids) - 1
+        last_id = self.ids.pop()
+        if slot != last:
+            self.ids[slot] = last_id
+            self.slots[last_id] = slot
+            self.lat[slot] = self.lat[last]
+            self.lon[slot] = self.lon[last]
+        return True
+    
+    def distances(self, loc, driver_ids=None, metric="haversine"):
+        # Distances (km) from loc to the given drivers, or to all of them
+        if driver_ids is None:
+            lats, lons = self.lat[:len(self.ids)], self.lon[:len(self.ids)]
+        else:
+            idx = np.fromiter((self.slots[d] for d in driver_ids), dtype=np.intp, count=len(driver_ids))
+            lats, lons = self.lat[idx], self.lon[idx]
+        return METRICS[metric](loc[0], loc[1], lats, lons)
+    
+    def nearest(self, loc, metric="haversine"):
+        # Vectorized full scan: (driver_id, km), or (None, inf) when empty
+        if not self.ids:
+            return None, float('inf')
+        dists = self.distances(loc, metric=metric)
+        i = int(np.argmin(dists))
+        return self.ids[i], float(dists[i])
\ No newline at end of file
@@ -33,6 +33,39 @@ def generate_order():
         "timestamp": time.time()
     }
 
+def generate_event_stream(seed, n_drivers, spread=0.05, order_ratio=0.3, center=(47.60, -122.33)):
+    # Seeded, unpaced event stream for benchmarks: one ping per driver to
+    # start, then an endless mix of driver moves and ready orders.
+    # spread (degrees around center) sets the geographic density.
+    rng = random.Random(seed)
+    positions = {}
+    for driver_id in range(1, n_drivers + 1):
+        loc = (center[0] + rng.uniform(-spread, spread), center[1] + rng.uniform(-spread, spread))
+        positions[driver_id] = loc
+        yield {"event_type": "driver_update", "driver_id": driver_id, "location": loc,
+               "status": rng.choice(["IDLE", "BUSY", "IDLE"])}
+    
+    order_seq = 0
+    while True:
+        if rng.random() < order_ratio:
+            order_seq += 1
+            yield {
+                "event_type": "order_ready",
+                "order_id": f"ORD-{order_seq}",
+                "restaurant": "synthetic",
+                "location": (center[0] + rng.uniform(-spread, spread), center[1] + rng.uniform(-spread, spread)),
+                "timestamp": order_seq
+            }
+        else:
+            driver_id = rng.randint(1, n_drivers)
+            lat, lon = positions[driver_id]
+            # Drivers drift ~100 m per ping and stay inside the area
+            lat = min(max(lat + rng.uniform(-0.001, 0.001), center[0] - spread), center[0] + spread)
+            lon = min(max(lon + rng.uniform(-0.001, 0.001), center[1] - spread), center[1] + spread)
+            positions[driver_id] = (lat, lon)
+            yield {"event_type": "driver_update", "driver_id": driver_id, "location": (lat, lon),
+                   "status": rng.choice(["IDLE", "BUSY", "IDLE"])}
+
 def start_stream():
     logger.info("Starting DoorDash Simulation Stream...")
     logger.info("Press Ctrl+C to stop.")
@@ -0,0 +1,229 @@
+import math
+import multiprocessing as mp
+import queue
+import threading
+import time
+from utils_logger import setup_logger
+from geo_distance import KM_PER_DEGREE, Projection
+from spatial_index import GridIndex
+from consumer import GRID_CELL_KM, MATCH_CANDIDATES, REFERENCE_LAT, apply_driver_ping, find_nearest
+
+logger = setup_logger("sharded_dispatch")
+
+# Service area split into equal longitude strips, one worker process per strip
+SERVICE_AREA = ((47.35, -122.60), (47.85, -122.05))  # (south, west), (north, east)
+ORDER_CHUNK = 64   # orders per message to a shard
+MAX_RESERVE_ATTEMPTS = 5
+REPLY_POLL_SEC = 0.5      # how often a dispatcher waiting on replies checks its workers
+REPLY_TIMEOUT_SEC = 30.0  # give up when no shard has replied for this long
+
+class ShardMap:
+    # Maps locations to longitude strips and measures how far an order is
+    # from each strip, in km at the reference latitude
+    
+    def __init__(self, n_shards, area=SERVICE_AREA, ref_lat=REFERENCE_LAT):
+        (_, west), (_, east) = area
+        self.n_shards = n_shards
+        self.edges = [west + (east - west) * i / n_shards for i in range(n_shards + 1)]
+        self.km_per_lon = KM_PER_DEGREE * math.cos(math.radians(ref_lat))
+    
+    def shard_of(self, loc):
+        lon = loc[1]
+        for shard in range(self.n_shards - 1):
+            if lon < self.edges[shard + 1]:
+                return shard
+        return self.n_shards - 1
+    
+    def gap_km(self, loc, shard):
+        # Distance from loc to the strip (0 inside). Outer strips extend forever.
+        lo = self.edges[shard] if shard > 0 else -math.inf
+        hi = self.edges[shard + 1] if shard < self.n_shards - 1 else math.inf
+        lon = loc[1]
+        if lon < lo:
+            return (lo - lon) * self.km_per_lon
+        if lon > hi:
+            return (lon - hi) * self.km_per_lon
+        return 0.0
+    
+    def edge_km(self, loc, shard):
+        # How far an order can look inside its own strip before crossing into another
+        return min(self.gap_km(loc, other) for other in range(self.n_shards) if other != shard) \
+            if self.n_shards > 1 else math.inf
+
+def shard_worker(shard_id, inbox, outbox, cell_km, ref_lat):
+    # Owns the drivers of one strip. Messages (all tuples):
+    #   ("pings", [event, ...])                    apply driver_update events
+    #   ("drop", driver_id)                        driver moved to another shard
+    #   ("match", [(req, loc, edge_km), ...])      claim if the best driver is within edge_km,
+    #                                              else reply with a proposal
+    #   ("query", req, loc)                        best idle driver here (no claim)
+    #   ("reserve", req, driver_id)                claim a proposed driver if still idle
+    #   ("stop",)
+    drivers = {}
+    index = GridIndex(cell_km, Projection(ref_lat))
+    lock = threading.RLock()
+    
+    def claim(driver_id):
+        if driver_id not in index:
+            return False
+        drivers[driver_id]["status"] = "BUSY"
+        index.remove(driver_id)
+        return True
+    
+    while True:
+        msg = inbox.get()
+        kind = msg[0]
+        if kind == "pings":
+            for event in msg[1]:
+                apply_driver_ping(event, drivers, index, lock)
+        elif kind == "drop":
+            drivers.pop(msg[1], None)
+            index.remove(msg[1])
+        elif kind == "match":
+            replies = []
+            for req, loc, edge_km in msg[1]:
+                driver_id, dist = find_nearest(loc, index, MATCH_CANDIDATES)
+                if driver_id is not None and dist <= edge_km:
+                    claim(driver_id)
+                    replies.append((req, "claimed", shard_id, driver_id, dist))
+                else:
+                    replies.append((req, "proposal", shard_id, driver_id, dist))
+            outbox.put(replies)
+        elif kind == "query":
+            driver_id, dist = find_nearest(msg[2], index, MATCH_CANDIDATES)
+            outbox.put([(msg[1], "candidate", shard_id, driver_id, dist)])
+        elif kind == "reserve":
+            outbox.put([(msg[1], "reserved" if claim(msg[2]) else "taken", shard_id, msg[2], None)])
+        elif kind == "stop":
+            return
+
+class ShardedDispatcher:
+    # Routes pings and orders to per-strip worker processes over local
+    # multiprocessing queues. An order is matched inside its own strip when
+    # the best driver there is closer than any other strip; otherwise the
+    # neighbours that could hold a closer driver are queried and the winner
+    # is reserved on its shard (propose, then reserve).
+    
+    def __init__(self, n_workers, area=SERVICE_AREA, cell_km=GRID_CELL_KM, ref_lat=REFERENCE_LAT,
+                 chunk=ORDER_CHUNK):
+        if n_workers < 1:
+            raise ValueError(f"n_workers must be >= 1, got {n_workers}")
+        self.shards = ShardMap(n_workers, area, ref_lat)
+        self.chunk = chunk
+        self.outbox = mp.Queue()
+        self.inboxes = [mp.Queue() for _ in range(n_workers)]
+        self.workers = [
+            mp.Process(target=shard_worker, args=(i, inbox, self.outbox, cell_km, ref_lat), daemon=True)
+            for i, inbox in enumerate(self.inboxes)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.driver_shard = {}
+        self.stats = {"orders": 0, "local": 0, "cross_shard": 0, "retries": 0, "unmatched": 0}
+    
+    def route_pings(self, events):
+        # Group pings by the shard of their new location; a driver that crossed
+        # a boundary is dropped from its old shard first
+        batches = {}
+        for event in events:
+            shard = self.shards.shard_of(event["location"])
+            old = self.driver_shard.get(event["driver_id"])
+            if old is not None and old != shard:
+                self.inboxes[old].put(("drop", event["driver_id"]))
+            self.driver_shard[event["driver_id"]] = shard
+            batches.setdefault(shard, []).append(event)
+        for shard, batch in batches.items():
+            self.inboxes[shard].put(("pings", batch))
+    
+    def dispatch(self, orders):
+        # Match [(order_id, loc)]; returns {order_id: (driver_id, km) or None}
+        results = self._results = {}
+        pending = {}     # req -> state for orders still being matched
+        outstanding = 0  # replies still expected
+        
+        by_shard = {}
+        for req, (order_id, loc) in enumerate(orders):
+            loc = tuple(loc)
+            shard = self.shards.shard_of(loc)
+            pending[req] = {"order_id": order_id, "loc": loc, "attempts": 0}
+            by_shard.setdefault(shard, []).append((req, loc, self.shards.edge_km(loc, shard)))
+        for shard, items in by_shard.items():
+            for i in range(0, len(items), self.chunk):
+                self.inboxes[shard].put(("match", items[i:i + self.chunk]))
+                outstanding += 1
+        
+        while outstanding:
+            replies = self._next_replies(len(pending))
+            outstanding -= 1
+            for req, kind, shard, driver_id, dist in replies:
+                state = pending[req]
+                if kind == "claimed":
+                    self.stats["local"] += 1
+                    results[state["order_id"]] = (driver_id, dist)
+                    del pending[req]
+                elif kind == "proposal":
+                    outstanding += self._ask_neighbours(req, state, shard, driver_id, dist)
+                elif kind == "candidate":
+                    state["waiting"] -= 1
+                    if driver_id is not None and dist < state["best"][2]:
+                        state["best"] = (shard, driver_id, dist)
+                    if state["waiting"] == 0:
+                        outstanding += self._reserve(req, state)
+                elif kind == "reserved":
+                    self.stats["cross_shard"] += 1
+                    results[state["order_id"]] = (driver_id, state["best"][2])
+                    del pending[req]
+                elif kind == "taken":
+                    # Someone claimed it between proposal and reservation: start over
+                    self.stats["retries"] += 1
+                    outstanding += self._ask_neighbours(req, state, None, None, math.inf)
+        
+        self.stats["orders"] += len(orders)
+        self.stats["unmatched"] += sum(result is None for result in results.values())
+        return results
+    
+    def _next_replies(self, n_pending):
+        # Wait for the next reply batch, but never on a dead or hung shard:
+        # a worker that exits (or stops answering) would otherwise block
+        # dispatch forever
+        deadline = time.monotonic() + REPLY_TIMEOUT_SEC
+        while True:
+            try:
+                return self.outbox.get(timeout=REPLY_POLL_SEC)
+            except queue.Empty:
+                pass
+            dead = [i for i, worker in enumerate(self.workers) if not worker.is_alive()]
+            if dead:
+                raise RuntimeError(f"shard worker(s) {dead} exited with {n_pending} order(s) pending")
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"no shard replied in {REPLY_TIMEOUT_SEC:.0f} s with {n_pending} order(s) pending")
+    
+    def _ask_neighbours(self, req, state, shard, driver_id, dist):
+        # Query every shard that could hold a driver closer than the proposal
+        state["attempts"] += 1
+        state["best"] = (shard, driver_id, dist) if driver_id is not None else (None, None, math.inf)
+        if state["attempts"] > MAX_RESERVE_ATTEMPTS:
+            self._results[state["order_id"]] = None
+            return 0
+        targets = [s for s in range(self.shards.n_shards)
+                   if s != shard and self.shards.gap_km(state["loc"], s) < state["best"][2]]
+        if not targets:
+            return self._reserve(req, state)
+        state["waiting"] = len(targets)
+        for target in targets:
+            self.inboxes[target].put(("query", req, state["loc"]))
+        return len(targets)
+    
+    def _reserve(self, req, state):
+        shard, driver_id, _ = state["best"]
+        if driver_id is None:
+            self._results[state["order_id"]] = None
+            return 0
+        self.inboxes[shard].put(("reserve", req, driver_id))
+        return 1
+    
+    def close(self):
+        for inbox in self.inboxes:
+            inbox.put(("stop",))
+        for worker in self.workers:
+            worker.join()
\ No newline at end of file
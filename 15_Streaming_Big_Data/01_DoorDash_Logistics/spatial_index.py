@@ -0,0 +1,236 @@
+import bisect
+import math
+from geo_distance import DriverArrays
+
+# Default grid cell edge per coordinate unit: degrees for raw (lat, lon)
+# points (~1.1 km of latitude), km for projected ones. Smaller cells scan
+# fewer drivers per order but need more rings when the area is sparse.
+DEFAULT_CELL_SIZE = 0.01
+DEFAULT_CELL_KM = 0.5
+
+def calculate_distance(loc1, loc2):
+    # Simple Euclidean distance (same metric as the brute-force matcher)
+    return math.sqrt((loc1[0] - loc2[0])**2 + (loc1[1] - loc2[1])**2)
+
+class GridIndex:
+    # Uniform grid over driver locations: cell (row, col) -> {driver_id: point}.
+    # nearest() searches outward ring by ring from the order's cell and stops
+    # as soon as no unscanned cell can hold a closer driver.
+    #
+    # Without a projection, points are raw (lat, lon) degrees. With one (see
+    # geo_distance.Projection) they are planar km, cell_size is in km, and the
+    # lat/lon of indexed drivers are also kept in contiguous arrays so
+    # candidates can be scored with one vectorized haversine call. Leaving
+    # cell_size unset picks the default for the unit in use.
+    
+    def __init__(self, cell_size=None, projection=None):
+        if cell_size is None:
+            cell_size = DEFAULT_CELL_KM if projection is not None else DEFAULT_CELL_SIZE
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+        self.cell_size = cell_size
+        self.projection = projection
+        self.arrays = DriverArrays() if projection is not None else None
+        self.cells = {}
+        self.locations = {}
+        self.points = {}
+        # First-seen order per driver, so ties resolve like a scan of drivers_db
+        self.order = {}
+        # Occupied cells per grid row / column; the bounding box of occupied
+        # cells is recomputed from them lazily after a removal shrinks it
+        self.row_cells = {}
+        self.col_cells = {}
+        self._bounds = None
+        self._bounds_stale = False
+    
+    def __len__(self):
+        return len(self.locations)
+    
+    def __contains__(self, driver_id):
+        return driver_id in self.locations
+    
+    def project(self, loc):
+        return self.projection(loc) if self.projection is not None else loc
+    
+    def cell_of(self, point):
+        return (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size))
+    
+    def register(self, driver_id):
+        # Record a driver's first-seen position for tie-breaking, even while
+        # it is not idle (mirrors the insertion order of drivers_db)
+        if driver_id not in self.order:
+            self.order[driver_id] = len(self.order)
+    
+    def add(self, driver_id, loc):
+        # Insert a driver, or move one already indexed
+        point = self.project(loc)
+        cell = self.cell_of(point)
+        old_point = self.points.get(driver_id)
+        if old_point is not None:
+            if self.cell_of(old_point) == cell:
+                # Same bucket: update in place, bounds are unchanged
+                self.cells[cell][driver_id] = point
+                self.points[driver_id] = point
+                self.locations[driver_id] = loc
+                if self.arrays is not None:
+                    self.arrays.set(driver_id, loc)
+                return
+            self.remove(driver_id)
+        self.register(driver_id)
+        
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            bucket = self.cells[cell] = {}
+            self.row_cells[cell[0]] = self.row_cells.get(cell[0], 0) + 1
+            self.col_cells[cell[1]] = self.col_cells.get(cell[1], 0) + 1
+            # Bounding box of occupied cells caps how far a search can go
+            b = self._bounds
+            if b is None:
+                if not self._bounds_stale:
+                    self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+            else:
+                b[0], b[1] = min(b[0], cell[0]), max(b[1], cell[0])
+                b[2], b[3] = min(b[2], cell[1]), max(b[3], cell[1])
+        bucket[driver_id] = point
+        self.points[driver_id] = point
+        self.locations[driver_id] = loc
+        if self.arrays is not None:
+            self.arrays.set(driver_id, loc)
+    
+    def remove(self, driver_id):
+        point = self.points.pop(driver_id, None)
+        if point is None:
+            return False
+        del self.locations[driver_id]
+        if self.arrays is not None:
+            self.arrays.remove(driver_id)
+        cell = self.cell_of(point)
+        bucket = self.cells[cell]
+        del bucket[driver_id]
+        if not bucket:
+            del self.cells[cell]
+            row, col = cell
+            self.row_cells[row] -= 1
+            if not self.row_cells[row]:
+                del self.row_cells[row]
+            self.col_cells[col] -= 1
+            if not self.col_cells[col]:
+                del self.col_cells[col]
+            b = self._bounds
+            if b is not None and (row in (b[0], b[1]) or col in (b[2], b[3])):
+                # An edge may have emptied; rebuild the box on the next search
+                self._bounds, self._bounds_stale = None, True
+        return True
+    
+    @property
+    def bounds(self):
+        # [min_row, max_row, min_col, max_col] of occupied cells, or None when empty
+        if self._bounds_stale:
+            self._bounds_stale = False
+            if self.row_cells:
+                self._bounds = [min(self.row_cells), max(self.row_cells),
+                                min(self.col_cells), max(self.col_cells)]
+        return self._bounds
+    
+    def _ring(self, row, col, k, bounds):
+        # Cells at Chebyshev distance exactly k from (row, col), clipped to
+        # the occupied bounding box
+        min_row, max_row, min_col, max_col = bounds
+        if k == 0:
+            yield (row, col)
+            return
+        c_lo, c_hi = max(col - k, min_col), min(col + k, max_col)
+        for r in (row - k, row + k):
+            if min_row <= r <= max_row:
+                for c in range(c_lo, c_hi + 1):
+                    yield (r, c)
+        r_lo, r_hi = max(row - k + 1, min_row), min(row + k - 1, max_row)
+        for c in (col - k, col + k):
+            if min_col <= c <= max_col:
+                for r in range(r_lo, r_hi + 1):
+                    yield (r, c)
+    
+    def _ring_range(self, row, col, bounds):
+        # First and last ring that can hold an occupied cell
+        min_row, max_row, min_col, max_col = bounds
+        first = max(0, min_row - row, row - max_row, min_col - col, col - max_col)
+        last = max(row - min_row, max_row - row, col - min_col, max_col - col)
+        return first, last
+    
+    def nearest(self, loc):
+        # Returns (driver_id, distance in index units), or (None, inf) when empty
+        best_driver, best_dist, best_order = None, float('inf'), None
+        bounds = self.bounds
+        if bounds is None:
+            return best_driver, best_dist
+        
+        point = self.project(loc)
+        row, col = self.cell_of(point)
+        # Rings outside [k, max_k] cannot contain any occupied cell
+        k, max_k = self._ring_range(row, col, bounds)
+        
+        while k <= max_k:
+            for cell in self._ring(row, col, k, bounds):
+                bucket = self.cells.get(cell)
+                if not bucket:
+                    continue
+                for driver_id, driver_point in bucket.items():
+                    dist = calculate_distance(point, driver_point)
+                    if dist < best_dist or (dist == best_dist and self.order[driver_id] < best_order):
+                        best_driver, best_dist, best_order = driver_id, dist, self.order[driver_id]
+            
+            # Every cell in ring k+1 is at least k cells away on some axis.
+            # Strict "<" keeps scanning on an exact tie so the earliest driver wins.
+            if best_dist < k * self.cell_size * (1 - 1e-9):
+                break
+            k += 1
+        
+        return best_driver, best_dist
+    
+    def k_nearest(self, loc, k):
+        # Up to k (driver_id, distance) pairs, closest first, same tie rule
+        # as nearest(). Stops once the k-th best beats every unscanned ring.
+        best = []
+        bounds = self.bounds
+        if bounds is None or k < 1:
+            return []
+        
+        point = self.project(loc)
+        row, col = self.cell_of(point)
+        ring, max_k = self._ring_range(row, col, bounds)
+        
+        while ring <= max_k:
+            for cell in self._ring(row, col, ring, bounds):
+                bucket = self.cells.get(cell)
+                if not bucket:
+                    continue
+                for driver_id, driver_point in bucket.items():
+                    dist = calculate_distance(point, driver_point)
+                    if len(best) < k:
+                        bisect.insort(best, (dist, self.order[driver_id], driver_id))
+                    elif dist <= best[-1][0]:
+                        entry = (dist, self.order[driver_id], driver_id)
+                        if entry < best[-1]:
+                            best.pop()
+                            bisect.insort(best, entry)
+            
+            if len(best) == k and best[-1][0] < ring * self.cell_size * (1 - 1e-9):
+                break
+            ring += 1
+        
+        return [(driver_id, dist) for dist, _, driver_id in best]
+    
+    def score(self, loc, driver_ids, metric="haversine"):
+        # Great-circle km from loc to the given indexed drivers, in one call
+        if self.arrays is None:
+            raise ValueError("score() needs an index built with a projection")
+        return self.arrays.distances(loc, driver_ids, metric)
+
+def build_idle_index(drivers, cell_size=None, projection=None):
+    # Index every IDLE driver of a drivers_db-style dict, in dict order
+    index = GridIndex(cell_size, projection)
+    for driver_id, data in drivers.items():
+        index.register(driver_id)
+        if data['status'] == 'IDLE':
+            index.add(driver_id, data['loc'])
+    return index
\ No newline at end of file
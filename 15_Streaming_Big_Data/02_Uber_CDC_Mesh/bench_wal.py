@@ -0,0 +1,83 @@
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+import consumer
+from consumer import consume_wal, percentile
+from producer import generate_wal_event, start_cdc_stream
+from wal import WALReader, WALWriter, list_segments
+
+# Benchmark: the local WAL as a Kafka stand-in.
+#   1. append throughput (events pre-generated, so only encoding + writes)
+#   2. replay from offset 0 (sealed segments via mmap), read-only and applied
+#   3. live: producer process at --rate, consumer tailing it; throughput and
+#      end-to-end lag (consumer wall clock minus the producer's ts_ms)
+# Run with: python bench_wal.py --events 1000000 --rate 20000 --seconds 10
+
+def main():
+    parser = argparse.ArgumentParser(description="WAL append / replay / tail benchmark")
+    parser.add_argument("--events", type=int, default=1_000_000, help="events appended for phases 1-2")
+    parser.add_argument("--drivers", type=int, default=50_000)
+    parser.add_argument("--segment-mb", type=float, default=16, help="segment size in MiB")
+    parser.add_argument("--rate", type=float, default=20_000, help="producer events/s in the live phase")
+    parser.add_argument("--seconds", type=float, default=10, help="length of the live phase")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    consumer.logger.setLevel(logging.WARNING)
+    segment_bytes = int(args.segment_mb * 2**20)
+    random.seed(args.seed)
+    driver_ids = range(1, args.drivers + 1)
+    events = [generate_wal_event(driver_ids) for _ in range(args.events)]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        log_dir = os.path.join(directory, "append")
+        writer = WALWriter(log_dir, segment_bytes)
+        start = time.perf_counter()
+        for event in events:
+            writer.append(event)
+        writer.close()
+        append_s = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(log_dir, name)) for name in os.listdir(log_dir))
+        print(f"append:  {args.events / append_s:>10.0f} events/s  {size / 2**20 / append_s:>7.1f} MiB/s  "
+              f"({size / 2**20:.0f} MiB in {len(list_segments(log_dir))} segments)")
+        
+        reader = WALReader(log_dir)
+        start = time.perf_counter()
+        replayed = sum(1 for _ in reader)
+        read_s = time.perf_counter() - start
+        reader.close()
+        print(f"replay:  {replayed / read_s:>10.0f} events/s  (read + decode)")
+        
+        consumer.driver_stats_cache = {}
+        result = consume_wal(log_dir, idle_exit=0)
+        print(f"apply:   {result['events'] / result['seconds']:>10.0f} events/s  (read + decode + batch apply)")
+        if replayed != args.events or result["events"] != args.events:
+            print(f"replay incomplete: {replayed} read, {result['events']} applied of {args.events}")
+            return 1
+        
+        live_dir = os.path.join(directory, "live")
+        count = int(args.rate * args.seconds)
+        producer = mp.Process(target=start_cdc_stream, args=(live_dir, args.rate, count, args.drivers, segment_bytes))
+        logging.getLogger("cdc_producer").setLevel(logging.WARNING)
+        consumer.driver_stats_cache = {}
+        producer.start()
+        # Wait for the first segment, then tail until the producer goes quiet
+        while not list_segments(live_dir):
+            time.sleep(0.01)
+        result = consume_wal(live_dir, idle_exit=1.0)
+        producer.join()
+        lags = result["lags_ms"]
+        busy = result["seconds"] - 1.0
+        print(f"live:    {result['events'] / busy:>10.0f} events/s at a target of {args.rate:.0f}/s "
+              f"({result['events']} of {count} events)")
+        if lags:
+            print(f"lag:     p50 {percentile(lags, 50):.1f} ms  p99 {percentile(lags, 99):.1f} ms  "
+                  f"max {max(lags):.1f} ms")
+        return 0 if result["events"] == count else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
\ No newline at end of file
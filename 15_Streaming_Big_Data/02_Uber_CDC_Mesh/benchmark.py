@@ -0,0 +1,107 @@
+import argparse
+import copy
+import logging
+import os
+import random
+import tempfile
+import time
+import consumer
+from producer import generate_wal_event
+from state_store import DriverStatsStore, dict_cache_bytes
+from snapshot import capture, load_latest, write_snapshot
+
+# Benchmark: per-event vs batched CDC apply path of the incentive service.
+# Run with: python benchmark.py --events 1000000 --drivers 50000 --batch-sizes 100,1000,10000
+# Add --store array to run against the array-backed DriverStatsStore.
+
+def make_events(n, n_drivers, seed):
+    random.seed(seed)
+    driver_ids = range(1, n_drivers + 1)
+    return [generate_wal_event(driver_ids) for _ in range(n)]
+
+def make_cache(kind, n_drivers):
+    # Warm state: every driver already known, as on a long-running node
+    cache = DriverStatsStore() if kind == "array" else {}
+    for driver_id in range(1, n_drivers + 1):
+        cache[driver_id] = {"trips": 0, "rating": 5.0, "bonus_eligible": False}
+    return cache
+
+def run_single(events, initial):
+    consumer.driver_stats_cache = copy.deepcopy(initial)
+    start = time.perf_counter()
+    for event in events:
+        consumer.process_change_event(event)
+    return time.perf_counter() - start, consumer.driver_stats_cache
+
+def run_batched(events, initial, batch_size):
+    consumer.driver_stats_cache = copy.deepcopy(initial)
+    start = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        consumer.process_change_events(events[i:i + batch_size])
+    return time.perf_counter() - start, consumer.driver_stats_cache
+
+def compare(expected, actual):
+    # (trips/rating mismatches, bonus flags that differ)
+    state = sum((expected[d]["trips"], expected[d]["rating"]) != (actual[d]["trips"], actual[d]["rating"])
+                for d in expected)
+    bonus = sum(expected[d]["bonus_eligible"] != actual[d]["bonus_eligible"] for d in expected)
+    return state + len(expected.keys() ^ actual.keys()), bonus
+
+def main():
+    parser = argparse.ArgumentParser(description="CDC apply path benchmark")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--drivers", type=int, default=50_000)
+    parser.add_argument("--batch-sizes", default="100,1000,10000", help="comma-separated batch sizes")
+    parser.add_argument("--store", choices=["dict", "array"], default="dict", help="local state store")
+    parser.add_argument("--with-logging", action="store_true", help="format INFO logs (to /dev/null) as in production")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    if args.with_logging:
+        # Keep the INFO lines (formatting included) but send them nowhere
+        for handler in consumer.logger.handlers:
+            handler.setStream(open(os.devnull, "w"))
+    else:
+        # Per-event INFO lines would dominate the measurement
+        consumer.logger.setLevel(logging.WARNING)
+    events = make_events(args.events, args.drivers, args.seed)
+    initial = make_cache(args.store, args.drivers)
+    
+    single_s, expected = run_single(events, initial)
+    if args.store == "array":
+        report = expected.memory_report()
+        memory = f"{report['total_bytes'] / 2**20:.1f} MiB ({report['bytes_per_driver']:.0f} B/driver)"
+    else:
+        total = dict_cache_bytes(expected)
+        memory = f"{total / 2**20:.1f} MiB ({total / len(expected):.0f} B/driver)"
+    print(f"{args.events} events, {args.drivers} drivers, {args.store} store: {memory}")
+    print(f"{'path':>12} {'events/s':>12} {'speedup':>8} {'state diff':>11} {'bonus diff':>11}")
+    print(f"{'per-event':>12} {args.events / single_s:>12.0f} {1.0:>8.1f} {0:>11d} {0:>11d}")
+    
+    failed = False
+    for size in (int(x) for x in args.batch_sizes.split(",")):
+        batch_s, actual = run_batched(events, initial, size)
+        state, bonus = compare(expected, actual)
+        failed |= state > 0 or bonus > 0
+        print(f"{'batch ' + str(size):>12} {args.events / batch_s:>12.0f} {single_s / batch_s:>8.1f} "
+              f"{state:>11d} {bonus:>11d}")
+    
+    # Snapshot cost: capture pauses the apply thread, the write runs beside it
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        snap = capture(expected, len(events) - 1, 0)
+        capture_s = time.perf_counter() - start
+        start = time.perf_counter()
+        path = write_snapshot(directory, snap)
+        write_s = time.perf_counter() - start
+        start = time.perf_counter()
+        restored, _, _ = load_latest(directory, args.store)
+        restore_s = time.perf_counter() - start
+        size = os.path.getsize(path)
+    failed |= compare(expected, restored) != (0, 0)
+    print(f"snapshot: {size / 2**20:.1f} MiB, capture {capture_s * 1000:.1f} ms (pauses apply), "
+          f"write {write_s * 1000:.1f} ms (background), restore {restore_s * 1000:.1f} ms")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
\ No newline at end of file
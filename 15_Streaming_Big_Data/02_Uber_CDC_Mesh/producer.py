@@ -1,7 +1,9 @@
+import argparse
 import time
 import json
 import random
 from utils_logger import setup_logger
+from wal import SEGMENT_BYTES, WALWriter
 
 logger = setup_logger("cdc_producer")
 
@@ -9,8 +11,11 @@ logger = setup_logger("cdc_producer")
 # We simulate a "Write-Ahead Log" (WAL) stream
 DRIVER_IDS = [101, 102, 103, 104, 105]
 
-def generate_wal_event():
-    driver_id = random.choice(DRIVER_IDS)
+# WAL mode: events appended between flushes (flushed events are visible to readers)
+WAL_FLUSH_EVERY = 256
+
+def generate_wal_event(driver_ids=DRIVER_IDS):
+    driver_id = random.choice(driver_ids)
     
     # 60% chance of a Trip Update (Ride completed)
     # 30% chance of a Rating Change
@@ -55,15 +60,57 @@ def generate_wal_event():
             }
         }
 
-def start_cdc_stream():
+def start_cdc_stream(wal_dir=None, rate=1.0, count=None, n_drivers=None, segment_bytes=SEGMENT_BYTES):
     logger.info("Starting Postgres CDC Simulator (Debezium Style)...")
-    logger.info("Streaming database changes to 'cdc-events' topic...")
+    driver_ids = range(1, n_drivers + 1) if n_drivers else DRIVER_IDS
+    
+    if wal_dir is None:
+        logger.info("Streaming database changes to 'cdc-events' topic...")
+        while True:
+            event = generate_wal_event(driver_ids)
+            # Log it like a database change event
+            logger.info(f"CDC Event: {json.dumps(event)}")
+            time.sleep(1)
     
-    while True:
-        event = generate_wal_event()
-        # Log it like a database change event
-        logger.info(f"CDC Event: {json.dumps(event)}")
-        time.sleep(1)
+    # Durable local log the consumer tails (consumer.py --wal-dir)
+    logger.info(f"Appending database changes to WAL at {wal_dir} ({f'{rate:g} events/s' if rate else 'unpaced'})...")
+    writer = WALWriter(wal_dir, segment_bytes)
+    start = time.perf_counter()
+    last_report = start
+    sent = 0
+    try:
+        while count is None or sent < count:
+            # Emit whatever is due at `rate` (everything when unpaced) in
+            # flushed bursts, then nap until the next event is due
+            elapsed = time.perf_counter() - start
+            due = int(elapsed * rate) + 1 if rate else sent + WAL_FLUSH_EVERY
+            burst = min(due - sent, WAL_FLUSH_EVERY)
+            if count is not None:
+                burst = min(burst, count - sent)
+            if burst <= 0:
+                time.sleep(sent / rate - elapsed)
+                continue
+            for _ in range(burst):
+                event = generate_wal_event(driver_ids)
+                writer.append(event)
+            writer.flush()
+            sent += burst
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                logger.info(f"WAL: {sent} events, next offset {writer.next_offset}, "
+                            f"{sent / (now - start):.0f} events/s")
+                last_report = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+    logger.info(f"WAL: wrote {sent} events in {time.perf_counter() - start:.1f}s")
 
 if __name__ == "__main__":
-    start_cdc_stream()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Postgres CDC simulator")
+    parser.add_argument("--wal-dir", help="append events to a local segmented WAL instead of logging them")
+    parser.add_argument("--rate", type=float, default=1.0, help="events per second (0 = as fast as possible)")
+    parser.add_argument("--count", type=int, help="stop after this many events (WAL mode)")
+    parser.add_argument("--drivers", type=int, help="driver id range 1..N (default: 5 demo drivers)")
+    args = parser.parse_args()
+    start_cdc_stream(args.wal_dir, args.rate, args.count, args.drivers)
\ No newline at end of file
@@ -0,0 +1,188 @@
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from utils_logger import setup_logger
+from state_store import DriverStatsStore
+
+logger = setup_logger("state_snapshot")
+
+# Binary snapshots of the incentive service's local state, tagged with the
+# last applied stream offset and ts_ms. On restart the service loads the
+# newest valid snapshot and only replays events after that offset.
+#
+# Layout (little-endian): header, then four columns of `count` entries:
+#   int64 driver_id | int32 trips | float64 rating | uint8 bonus_eligible
+# The CRC32 covers the columns, so a torn or corrupt file is skipped.
+
+MAGIC = b"CDCS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHqqqI")  # magic, version, reserved, count, offset, ts_ms, crc32
+SNAPSHOT_EVERY = 50_000  # applied events between snapshots
+SNAPSHOT_KEEP = 2        # newest snapshot files kept on disk
+
+class Snapshot:
+    # Columns copied out of the live state; safe to encode on another thread
+    
+    __slots__ = ("ids", "trips", "rating", "bonus", "offset", "ts_ms")
+    
+    def __init__(self, ids, trips, rating, bonus, offset, ts_ms):
+        self.ids = ids
+        self.trips = trips
+        self.rating = rating
+        self.bonus = bonus
+        self.offset = offset
+        self.ts_ms = ts_ms
+
+def capture(cache, offset, ts_ms):
+    # The only part that runs on the apply thread. For DriverStatsStore it
+    # is a C-level copy of each column; a dict cache is walked once, which
+    # is too slow to pause the live consumer for (the consumer only
+    # snapshots the array store). Driver ids must be integers (int64).
+    if isinstance(cache, DriverStatsStore):
+        return Snapshot(array("q", cache.ids), array("i", cache.trips), array("d", cache.rating),
+                        bytes(cache.bonus), offset, ts_ms)
+    ids, trips, rating, bonus = array("q"), array("i"), array("d"), bytearray()
+    for driver_id, stats in cache.items():
+        ids.append(driver_id)
+        trips.append(stats["trips"])
+        rating.append(stats["rating"])
+        bonus.append(1 if stats["bonus_eligible"] else 0)
+    return Snapshot(ids, trips, rating, bytes(bonus), offset, ts_ms)
+
+def encode(snap):
+    columns = [snap.ids, snap.trips, snap.rating]
+    if sys.byteorder == "big":
+        columns = [array(c.typecode, c) for c in columns]
+        for c in columns:
+            c.byteswap()
+    payload = b"".join(c.tobytes() for c in columns) + snap.bonus
+    header = HEADER.pack(MAGIC, VERSION, 0, len(snap.ids), snap.offset, snap.ts_ms, zlib.crc32(payload))
+    return header + payload
+
+def decode(data):
+    # Returns a Snapshot; raises ValueError on anything that does not check out
+    if len(data) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, _, count, offset, ts_ms, crc = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a v{VERSION} snapshot")
+    payload = memoryview(data)[HEADER.size:]
+    if len(payload) != count * (8 + 4 + 8 + 1) or zlib.crc32(payload) != crc:
+        raise ValueError("corrupt or truncated payload")
+    columns = []
+    pos = 0
+    for typecode, size in (("q", 8), ("i", 4), ("d", 8)):
+        column = array(typecode)
+        column.frombytes(payload[pos:pos + count * size])
+        if sys.byteorder == "big":
+            column.byteswap()
+        columns.append(column)
+        pos += count * size
+    return Snapshot(*columns, bytes(payload[pos:]), offset, ts_ms)
+
+def write_snapshot(directory, snap, keep=SNAPSHOT_KEEP):
+    # Temp file + fsync + os.replace: readers see the old file or the new
+    # one, never a partial write. Older snapshots beyond `keep` are removed.
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"snapshot-{snap.offset:020d}.cdcs")
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode(snap))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    for old in list_snapshots(directory)[:-keep]:
+        os.unlink(old)
+    return path
+
+def list_snapshots(directory):
+    # Oldest first (names sort by offset)
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.startswith("snapshot-") and n.endswith(".cdcs"))
+    return [os.path.join(directory, n) for n in names]
+
+def load_latest(directory, kind="dict"):
+    # Newest valid snapshot as (cache, offset, ts_ms); (empty cache, -1, 0) if none
+    for path in reversed(list_snapshots(directory)):
+        try:
+            with open(path, "rb") as f:
+                snap = decode(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping snapshot {path}: {e}")
+            continue
+        if kind == "array":
+            cache = DriverStatsStore()
+            cache.ids = snap.ids.tolist()
+            cache.slots = {driver_id: slot for slot, driver_id in enumerate(cache.ids)}
+            cache.trips, cache.rating, cache.bonus = snap.trips, snap.rating, bytearray(snap.bonus)
+        else:
+            cache = {}
+            for driver_id, trips, rating, bonus in zip(snap.ids, snap.trips, snap.rating, snap.bonus):
+                cache[driver_id] = {"trips": trips, "rating": rating, "bonus_eligible": bool(bonus)}
+        logger.info(f"Restored {len(snap.ids)} drivers from {path} (offset {snap.offset}, ts_ms {snap.ts_ms})")
+        return cache, snap.offset, snap.ts_ms
+    return (DriverStatsStore() if kind == "array" else {}), -1, 0
+
+class Checkpointer:
+    # Snapshots the state every `every` applied events. Capture happens on
+    # the caller's thread; encoding and the fsync'd write run on a
+    # background thread. If the previous write is still running, the next
+    # snapshot is skipped rather than queued.
+    
+    def __init__(self, directory, every=SNAPSHOT_EVERY, keep=SNAPSHOT_KEEP):
+        if every < 1:
+            raise ValueError(f"every must be >= 1, got {every}")
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.since_last = 0
+        self.writer = None
+        self.stats = {"written": 0, "skipped": 0, "failed": 0, "capture_ms": 0.0, "write_ms": 0.0}
+    
+    def note(self, cache, offset, ts_ms, applied=1):
+        # Call after applying events up to `offset`
+        self.since_last += applied
+        if self.since_last >= self.every:
+            self.snapshot(cache, offset, ts_ms)
+    
+    def snapshot(self, cache, offset, ts_ms):
+        if self.writer is not None and self.writer.is_alive():
+            self.stats["skipped"] += 1
+            return False
+        start = time.perf_counter()
+        snap = capture(cache, offset, ts_ms)
+        self.stats["capture_ms"] = (time.perf_counter() - start) * 1000
+        self.since_last = 0
+        self.writer = threading.Thread(target=self._write, args=(snap,), daemon=True, name="state-snapshot")
+        self.writer.start()
+        return True
+    
+    def _write(self, snap):
+        start = time.perf_counter()
+        try:
+            path = write_snapshot(self.directory, snap, self.keep)
+        except (OSError, ValueError, OverflowError) as e:
+            self.stats["failed"] += 1
+            logger.error(f"Snapshot at offset {snap.offset} failed: {e}")
+            return
+        self.stats["write_ms"] = (time.perf_counter() - start) * 1000
+        self.stats["written"] += 1
+        logger.info(f"📸 Snapshot: {len(snap.ids)} drivers at offset {snap.offset} -> {path}")
+    
+    def close(self, cache=None, offset=None, ts_ms=0):
+        # Wait for the in-flight write; with state given, write a final snapshot
+        if self.writer is not None:
+            self.writer.join()
+        if cache is not None and offset is not None and offset >= 0 and self.since_last:
+            self.snapshot(cache, offset, ts_ms)
+            self.writer.join()
\ No newline at end of file
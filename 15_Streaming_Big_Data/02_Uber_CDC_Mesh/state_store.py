@@ -0,0 +1,157 @@
+import sys
+from array import array
+
+# Compact local state store for the incentive service.
+# A driver_id -> slot dict plus parallel typed arrays replaces the dict of
+# small dicts: per driver that is one index entry and 13 bytes of columns
+# (int32 trips, float64 rating, one byte for the bonus flag).
+
+FIELDS = ("trips", "rating", "bonus_eligible")
+DEFAULT_STATS = {"trips": 0, "rating": 5.0, "bonus_eligible": False}
+
+class DriverStats:
+    # Mapping-like view of one driver's row, so code written against
+    # driver_stats_cache[driver_id]["trips"] works unchanged. Valid until
+    # the driver is deleted from the store.
+    
+    __slots__ = ("_store", "_slot")
+    
+    def __init__(self, store, slot):
+        self._store = store
+        self._slot = slot
+    
+    def __getitem__(self, field):
+        store, slot = self._store, self._slot
+        if field == "trips":
+            return store.trips[slot]
+        if field == "rating":
+            return store.rating[slot]
+        if field == "bonus_eligible":
+            return bool(store.bonus[slot])
+        raise KeyError(field)
+    
+    def __setitem__(self, field, value):
+        store, slot = self._store, self._slot
+        if field == "trips":
+            store.trips[slot] = value
+        elif field == "rating":
+            store.rating[slot] = value
+        elif field == "bonus_eligible":
+            store.bonus[slot] = 1 if value else 0
+        else:
+            raise KeyError(field)
+    
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        return FIELDS
+    
+    def __iter__(self):
+        return iter(FIELDS)
+    
+    def __len__(self):
+        return len(FIELDS)
+    
+    def __eq__(self, other):
+        try:
+            return all(self[field] == other[field] for field in FIELDS)
+        except (KeyError, TypeError):
+            return NotImplemented
+    
+    def __repr__(self):
+        return repr({field: self[field] for field in FIELDS})
+
+class DriverStatsStore:
+    # Drop-in for driver_stats_cache: `in`, get(), store[id], store[id] = {...},
+    # del store[id], len() and iteration behave like the dict version.
+    # Deleting swaps the last row into the hole, so columns stay dense.
+    
+    def __init__(self):
+        self.slots = {}
+        self.ids = []
+        self.trips = array("i")
+        self.rating = array("d")
+        self.bonus = bytearray()
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def __contains__(self, driver_id):
+        return driver_id in self.slots
+    
+    def __iter__(self):
+        return iter(self.slots)
+    
+    def keys(self):
+        return self.slots.keys()
+    
+    def items(self):
+        return ((driver_id, DriverStats(self, slot)) for driver_id, slot in self.slots.items())
+    
+    def __getitem__(self, driver_id):
+        return DriverStats(self, self.slots[driver_id])
+    
+    def get(self, driver_id, default=None):
+        slot = self.slots.get(driver_id)
+        if slot is None:
+            return default
+        return DriverStats(self, slot)
+    
+    def __setitem__(self, driver_id, stats):
+        # Missing fields take their defaults, as in a fresh cache entry
+        slot = self.slots.get(driver_id)
+        if slot is None:
+            slot = self.slots[driver_id] = len(self.ids)
+            self.ids.append(driver_id)
+            self.trips.append(0)
+            self.rating.append(0.0)
+            self.bonus.append(0)
+        row = DriverStats(self, slot)
+        for field in FIELDS:
+            row[field] = stats.get(field, DEFAULT_STATS[field])
+    
+    def __delitem__(self, driver_id):
+        slot = self.slots.pop(driver_id)
+        last_id = self.ids.pop()
+        if last_id != driver_id:
+            self.ids[slot] = last_id
+            self.slots[last_id] = slot
+            self.trips[slot] = self.trips[-1]
+            self.rating[slot] = self.rating[-1]
+            self.bonus[slot] = self.bonus[-1]
+        self.trips.pop()
+        self.rating.pop()
+        del self.bonus[-1]
+    
+    def setdefault(self, driver_id, stats=None):
+        if driver_id not in self.slots:
+            self[driver_id] = stats or DEFAULT_STATS
+        return self[driver_id]
+    
+    def memory_report(self):
+        # Bytes held by the store, by component (allocated capacity, driver id objects included)
+        index = sys.getsizeof(self.slots) + sum(sys.getsizeof(d) for d in self.ids)
+        ids = sys.getsizeof(self.ids)
+        columns = sys.getsizeof(self.trips) + sys.getsizeof(self.rating) + sys.getsizeof(self.bonus)
+        total = index + ids + columns
+        return {
+            "drivers": len(self.ids),
+            "index_bytes": index,
+            "ids_bytes": ids,
+            "column_bytes": columns,
+            "total_bytes": total,
+            "bytes_per_driver": total / len(self.ids) if self.ids else 0.0
+        }
+
+def dict_cache_bytes(cache):
+    # Same accounting for a plain dict-of-dicts cache, for comparison
+    total = sys.getsizeof(cache)
+    for driver_id, stats in cache.items():
+        total += sys.getsizeof(driver_id) + sys.getsizeof(stats)
+        # Small ints and bools are shared singletons; ratings are real objects
+        total += sum(sys.getsizeof(v) for v in stats.values() if not (isinstance(v, int) and -5 <= v <= 256))
+    return total
\ No newline at end of file
@@ -0,0 +1,219 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+
+# Append-only, segment-rotated local change log: a Kafka-like stand-in the
+# producer writes and the consumer tails, without external services.
+#
+# A log is a directory of segment files named by the offset of their first
+# record (00000000000000000000.wal, ...). Each record is
+#   uint64 offset | uint32 length | uint32 crc32(payload) | payload (JSON)
+# little-endian. Only the newest segment is written to; older (sealed)
+# segments are read through mmap.
+
+RECORD = struct.Struct("<QII")
+SEGMENT_SUFFIX = ".wal"
+SEGMENT_BYTES = 64 * 1024 * 1024  # roll to a new segment past this size
+WRITE_BUFFER = 1 << 16
+READ_CHUNK = 4 * 1024 * 1024      # bytes read per call from the active segment
+
+# Reused codec objects: json.dumps/loads rebuild or re-sniff on every call
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+_decode = json.JSONDecoder().decode
+
+class WALCorruptError(ValueError):
+    pass
+
+def segment_path(directory, base_offset):
+    return os.path.join(directory, f"{base_offset:020d}{SEGMENT_SUFFIX}")
+
+def list_segments(directory):
+    # Base offsets of all segments, oldest first
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+                  if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit())
+
+def scan_records(buf, pos, end, start_offset, limit, out):
+    # Parse complete records from buf[pos:end] into out as (offset, event),
+    # skipping offsets below start_offset without decoding them. Stops at
+    # a partial record (a tail still being written) or once out holds
+    # `limit` records in total; returns the position after the last record read.
+    while pos + RECORD.size <= end and len(out) < limit:
+        offset, length, crc = RECORD.unpack_from(buf, pos)
+        stop = pos + RECORD.size + length
+        if stop > end:
+            break
+        if offset >= start_offset:
+            payload = buf[pos + RECORD.size:stop]
+            if zlib.crc32(payload) != crc:
+                raise WALCorruptError(f"CRC mismatch at offset {offset}")
+            out.append((offset, _decode(payload.decode())))
+        pos = stop
+    return pos
+
+def _valid_prefix(path):
+    # (bytes of intact records, next offset) for a segment; a torn or
+    # corrupt tail left by a crash is everything after that
+    base = int(os.path.basename(path)[:-len(SEGMENT_SUFFIX)])
+    with open(path, "rb") as f:
+        data = f.read()
+    pos, next_offset = 0, base
+    while pos + RECORD.size <= len(data):
+        offset, length, crc = RECORD.unpack_from(data, pos)
+        stop = pos + RECORD.size + length
+        if offset != next_offset or stop > len(data) or zlib.crc32(data[pos + RECORD.size:stop]) != crc:
+            break
+        pos, next_offset = stop, offset + 1
+    return pos, next_offset
+
+class WALWriter:
+    # Appends JSON events and hands out consecutive offsets. Writes are
+    # buffered: call flush() to make them visible to readers (and, with
+    # fsync=True, durable). Reopening a log truncates a torn tail and
+    # continues from the next offset.
+    
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, fsync=False):
+        if segment_bytes < 1:
+            raise ValueError(f"segment_bytes must be >= 1, got {segment_bytes}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        segments = list_segments(directory)
+        if segments:
+            path = segment_path(directory, segments[-1])
+            self.size, self.next_offset = _valid_prefix(path)
+            with open(path, "r+b") as f:
+                f.truncate(self.size)
+            self.file = open(path, "ab", buffering=WRITE_BUFFER)
+        else:
+            self.next_offset = 0
+            self._open_segment()
+    
+    def _open_segment(self):
+        self.size = 0
+        self.file = open(segment_path(self.directory, self.next_offset), "ab", buffering=WRITE_BUFFER)
+    
+    def append(self, event):
+        # Returns the event's offset
+        payload = _encode(event).encode()
+        offset = self.next_offset
+        self.file.write(RECORD.pack(offset, len(payload), zlib.crc32(payload)))
+        self.file.write(payload)
+        self.size += RECORD.size + len(payload)
+        self.next_offset += 1
+        if self.size >= self.segment_bytes:
+            self._roll()
+        return offset
+    
+    def _roll(self):
+        # Seal the current segment; readers move on once the next one exists
+        self.flush()
+        self.file.close()
+        self._open_segment()
+    
+    def flush(self):
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+    
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+class WALReader:
+    # Reads a log from start_offset onwards. poll() never blocks: it returns
+    # up to max_records (offset, event) pairs, or [] once caught up with the
+    # writer. Sealed segments are mmapped; the active one is read through a
+    # file handle and a partially written record is left for the next poll.
+    
+    def __init__(self, directory, start_offset=0):
+        self.directory = directory
+        self.next_offset = start_offset
+        self.base = None     # base offset of the open segment
+        self.buf = None      # mmap of a sealed segment
+        self.file = None     # handle on the active segment
+        self.pos = 0
+    
+    def _open(self):
+        # Open the segment holding next_offset; False if there is none yet
+        segments = list_segments(self.directory)
+        candidates = [base for base in segments if base <= self.next_offset]
+        if not candidates:
+            return False
+        self.base = candidates[-1]
+        self.pos = 0
+        path = segment_path(self.directory, self.base)
+        sealed = self.base != segments[-1]
+        if sealed and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.file = open(path, "rb")
+        return True
+    
+    def _close_segment(self):
+        if self.buf is not None:
+            self.buf.close()
+        if self.file is not None:
+            self.file.close()
+        self.base = self.buf = self.file = None
+    
+    def _has_next_segment(self):
+        return any(base > self.base for base in list_segments(self.directory))
+    
+    def _read(self, limit, out):
+        if self.buf is not None:
+            self.pos = scan_records(self.buf, self.pos, len(self.buf), self.next_offset, limit, out)
+            return self.pos >= len(self.buf)
+        size = READ_CHUNK
+        while True:
+            self.file.seek(self.pos)
+            data = self.file.read(size)
+            consumed = scan_records(data, 0, len(data), self.next_offset, limit, out)
+            if consumed or len(data) < size or len(out) >= limit:
+                break
+            size *= 2  # a single record larger than the chunk
+        self.pos += consumed
+        return False
+    
+    def poll(self, max_records=10_000):
+        out = []
+        while len(out) < max_records:
+            if self.base is None and not self._open():
+                break
+            before = len(out)
+            exhausted = self._read(max_records, out)
+            if len(out) > before:
+                self.next_offset = out[-1][0] + 1
+            if len(out) >= max_records:
+                break
+            if not exhausted:
+                # Active segment drained: move on only once the writer has rolled,
+                # after one more read for anything it flushed before rolling
+                if not self._has_next_segment():
+                    break
+                before = len(out)
+                self._read(max_records, out)
+                if len(out) > before:
+                    self.next_offset = out[-1][0] + 1
+                if len(out) >= max_records:
+                    break
+            self._close_segment()
+            # Skip straight to the segment that starts at next_offset
+        return out
+    
+    def __iter__(self):
+        # Everything currently in the log from next_offset on
+        while True:
+            records = self.poll()
+            if not records:
+                return
+            yield from records
+    
+    def close(self):
+        self._close_segment()
\ No newline at end of file
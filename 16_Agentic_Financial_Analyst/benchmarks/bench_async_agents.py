@@ -0,0 +1,49 @@
+"""
+Benchmark: throughput of async analyses as concurrency grows.
+Run with: python benchmarks/bench_async_agents.py --analyses 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import agents
+from main import FinancialSwarm
+
+
+async def run_batch(swarm: FinancialSwarm, tickers, concurrency: int) -> float:
+    """Run one batch and return its wall time in seconds."""
+    start = time.perf_counter()
+    async for _ticker, _memo in swarm.aanalyze_many(tickers, max_concurrency=concurrency):
+        pass
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--analyses", type=int, default=500, help="analyses per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated LLM latency (s)")
+    parser.add_argument("--levels", default="1,10,50,100,500", help="comma-separated concurrency levels")
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    agents.SIMULATED_LATENCY = args.latency
+    
+    swarm = FinancialSwarm()
+    tickers = ["NVDA", "TSLA"] * (args.analyses // 2) + ["NVDA"] * (args.analyses % 2)
+    
+    print(f"{args.analyses} analyses, {args.latency:.3f}s simulated latency per stage")
+    print(f"{'concurrency':>12} {'wall (s)':>10} {'analyses/s':>12}")
+    for level in (int(x) for x in args.levels.split(",")):
+        elapsed = asyncio.run(run_batch(swarm, tickers, level))
+        print(f"{level:>12} {elapsed:>10.2f} {args.analyses / elapsed:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
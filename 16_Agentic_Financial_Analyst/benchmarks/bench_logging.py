@@ -0,0 +1,60 @@
+"""
+Benchmark: analyses per second with synchronous vs async (batched) logging.
+Run with: python benchmarks/bench_logging.py --analyses 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import agents
+from logging_setup import configure_logging, shutdown_logging
+from main import FinancialSwarm
+
+
+def run(swarm: FinancialSwarm, analyses: int, async_mode: bool, sample_rate: float, log_file: str) -> float:
+    """Analyze `analyses` tickers and return analyses per second (log flush included)."""
+    with open(os.devnull, "w") as devnull:
+        configure_logging(async_mode=async_mode, sample_rate=sample_rate, log_file=log_file, stream=devnull)
+        start = time.perf_counter()
+        for i in range(analyses):
+            swarm.analyze("NVDA" if i % 2 else "TSLA")
+        shutdown_logging()
+        elapsed = time.perf_counter() - start
+    return analyses / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--analyses", type=int, default=2000, help="analyses per mode")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="INFO sample rate for the sampled run")
+    args = parser.parse_args()
+    
+    agents.SIMULATED_LATENCY = 0
+    swarm = FinancialSwarm()
+    modes = [
+        ("sync", False, 1.0),
+        ("async", True, 1.0),
+        (f"async+sample {args.sample_rate:g}", True, args.sample_rate)
+    ]
+    
+    print(f"{args.analyses} analyses, logging to a temp file and {os.devnull}")
+    print(f"{'mode':>20} {'analyses/s':>12} {'log lines':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, async_mode, rate in modes:
+            log_file = os.path.join(tmp, f"{name.split()[0]}-{rate:g}.log")
+            throughput = run(swarm, args.analyses, async_mode, rate, log_file)
+            with open(log_file) as f:
+                lines = sum(1 for _ in f)
+            print(f"{name:>20} {throughput:>12.1f} {lines:>10}")
+    
+    configure_logging(log_file=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark: cold start and Python heap usage of the JSON loader vs the memory-mapped store.
+Run with: python benchmarks/bench_market_store.py --tickers 10000 --news 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from market_store import convert_json_to_store
+from synthetic import write_synthetic_market_data
+
+# Runs in a fresh interpreter so start time and heap peak are not polluted
+PROBE = """
+import json, logging, sys, time, tracemalloc
+sys.path.insert(0, {src!r})
+logging.disable(logging.CRITICAL)
+from tools import FinancialTools
+tracemalloc.start()
+start = time.perf_counter()
+tools = FinancialTools({path!r}, reload_interval=0)
+loaded = time.perf_counter()
+for ticker in {lookups!r}:
+    tools.get_stock_price(ticker)
+done = time.perf_counter()
+print(json.dumps({{
+    "load_s": loaded - start,
+    "lookups_s": done - loaded,
+    "heap_peak_kb": tracemalloc.get_traced_memory()[1] // 1024,
+}}))
+"""
+
+
+def probe(path: str, lookups) -> dict:
+    """Open `path` with FinancialTools in a subprocess and report timings."""
+    script = PROBE.format(src=SRC_DIR, path=path, lookups=lookups)
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=10000)
+    parser.add_argument("--news", type=int, default=20, help="headlines per ticker")
+    parser.add_argument("--lookups", type=int, default=50, help="tickers requested after start")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "market.json")
+        store_path = os.path.join(tmp, "market.mkts")
+        db = write_synthetic_market_data(json_path, args.tickers, args.news)
+        convert_json_to_store(json_path, store_path)
+        lookups = sorted(db)[:args.lookups]
+        
+        print(f"{args.tickers} tickers x {args.news} headlines, {len(lookups)} lookups")
+        print(f"{'backend':>10} {'file (MB)':>10} {'load (ms)':>10} {'lookups (ms)':>13} {'heap peak KB':>13}")
+        for name, path in (("json", json_path), ("mmap", store_path)):
+            result = probe(path, lookups)
+            print(f"{name:>10} {os.path.getsize(path) / 1e6:>10.1f} {result['load_s'] * 1000:>10.1f} "
+                  f"{result['lookups_s'] * 1000:>13.2f} {result['heap_peak_kb']:>13}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
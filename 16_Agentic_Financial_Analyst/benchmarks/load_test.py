@@ -0,0 +1,207 @@
+"""
+Load test: FinancialSwarm throughput, latency percentiles and peak memory
+on a synthetic universe of N tickers, with an optional regression guard.
+
+Run with:
+    python benchmarks/load_test.py --tickers 500 --concurrency 16 --latency-scale 0
+    python benchmarks/load_test.py --baseline benchmarks/baseline.json --tolerance 0.5 --repeat 3
+    python benchmarks/load_test.py --repeat 3 --write-baseline benchmarks/baseline.json
+
+Exits with status 1 when throughput falls more than --tolerance below the
+baseline, so it can guard CI. Throughput is compared relative to a fixed
+calibration loop timed in the same process, so a slower or busier machine
+than the one that recorded the baseline does not read as a regression.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import agents
+import config
+from cache import CachedFinancialTools
+from main import FinancialSwarm
+from synthetic import write_synthetic_market_data
+from tools import FinancialTools
+from tracing import tracer
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0 where unavailable)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def calibrate(seconds: float = 0.2, repeats: int = 3) -> float:
+    """
+    Speed of this machine on a fixed pure-Python loop (JSON round-trips and
+    string formatting, like the analysis path), in loops/s, best of `repeats`.
+    """
+    record = {"price": 123.45, "pe_ratio": 42.0, "news": ["headline"] * 5,
+              "financials": {"revenue_growth": "15%", "debt_to_equity": 0.8}}
+    best = 0.0
+    for _ in range(repeats):
+        loops = 0
+        start = time.perf_counter()
+        while True:
+            for _ in range(100):
+                json.loads(json.dumps(record))
+                f"{record['price']:.2f} P/E {record['pe_ratio']} {record['financials']}"
+            loops += 100
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds:
+                break
+        best = max(best, loops / elapsed)
+    return best
+
+
+def run_threads(swarm: FinancialSwarm, tickers, concurrency: int) -> int:
+    """Analyze on the thread pool; returns the number of failed analyses."""
+    return sum(memo is None for _, memo in swarm.analyze_many(tickers, max_concurrency=concurrency))
+
+
+def run_async(swarm: FinancialSwarm, tickers, concurrency: int) -> int:
+    """Analyze on one event loop; returns the number of failed analyses."""
+    async def collect() -> int:
+        failed = 0
+        async for _, memo in swarm.aanalyze_many(tickers, max_concurrency=concurrency):
+            failed += memo is None
+        return failed
+    return asyncio.run(collect())
+
+
+def load_test(n_tickers: int, analyses: int, concurrency: int, latency_scale: float, mode: str) -> dict:
+    """Run one load test and return its metrics."""
+    agents.SIMULATED_LATENCY = config.SIMULATED_LATENCY * latency_scale
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "market.json")
+        db = write_synthetic_market_data(path, n_tickers)
+        universe = sorted(db)
+        tickers = [universe[i % len(universe)] for i in range(analyses)]
+        
+        swarm = FinancialSwarm(CachedFinancialTools(FinancialTools(path, reload_interval=0)))
+        runner = run_async if mode == "async" else run_threads
+        span = "FinancialSwarm.aanalyze" if mode == "async" else "FinancialSwarm.analyze"
+        
+        tracer.reset()
+        tracer.enable()
+        start = time.perf_counter()
+        failed = runner(swarm, tickers, concurrency)
+        elapsed = time.perf_counter() - start
+        tracer.disable()
+    
+    latency = tracer.latency_summary().get(span, {})
+    return {
+        "mode": mode,
+        "tickers": n_tickers,
+        "analyses": analyses,
+        "concurrency": concurrency,
+        "latency_scale": latency_scale,
+        "failed": failed,
+        "wall_s": elapsed,
+        "throughput_per_s": analyses / elapsed,
+        "p50_ms": latency.get("p50_ms", 0.0),
+        "p95_ms": latency.get("p95_ms", 0.0),
+        "p99_ms": latency.get("p99_ms", 0.0),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def best_of(repeat: int, *args) -> dict:
+    """Run load_test() `repeat` times and keep the highest-throughput run."""
+    runs = [load_test(*args) for _ in range(max(1, repeat))]
+    return max(runs, key=lambda run: run["throughput_per_s"])
+
+
+def check_baseline(result: dict, baseline_path: str, tolerance: float) -> bool:
+    """
+    Print the comparison with the baseline; False on a throughput regression.
+    
+    Both sides are scaled by their calibration loop rate, so the guard
+    checks analyses per calibration loop rather than raw analyses/s.
+    Baselines recorded without a calibration fall back to raw throughput.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    
+    mismatched = [key for key in ("mode", "tickers", "analyses", "concurrency", "latency_scale")
+                  if key in baseline and baseline[key] != result[key]]
+    if mismatched:
+        print(f"warning: baseline was recorded with different {', '.join(mismatched)}")
+    
+    expected = baseline["throughput_per_s"]
+    if baseline.get("calibration_per_s"):
+        speed = result["calibration_per_s"] / baseline["calibration_per_s"]
+        expected *= speed
+        print(f"machine speed {speed:.2f}x the baseline's "
+              f"({result['calibration_per_s']:.0f} vs {baseline['calibration_per_s']:.0f} calibration loops/s)")
+    else:
+        print("warning: baseline has no calibration, comparing raw throughput")
+    
+    floor = expected * (1 - tolerance)
+    ok = result["throughput_per_s"] >= floor
+    print(f"expected {expected:.1f}/s, floor {floor:.1f}/s "
+          f"(tolerance {tolerance:.0%}): {'OK' if ok else 'REGRESSION'}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=200, help="synthetic tickers in the data file")
+    parser.add_argument("--analyses", type=int, default=2000, help="analyses to run (tickers are cycled)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="multiplier on SIMULATED_LATENCY (0 disables it)")
+    parser.add_argument("--mode", choices=("threads", "async"), default="threads")
+    parser.add_argument("--baseline", help="baseline JSON to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed fractional throughput drop")
+    parser.add_argument("--repeat", type=int, default=1, help="runs to make, keeping the fastest")
+    parser.add_argument("--write-baseline", help="write this run's metrics to the given JSON file")
+    args = parser.parse_args()
+    
+    logging.disable(logging.ERROR)
+    calibration = calibrate()
+    result = best_of(args.repeat, args.tickers, args.analyses, args.concurrency,
+                     args.latency_scale, args.mode)
+    # Calibrate on both sides of the run, so a slowdown partway through counts too
+    result["calibration_per_s"] = max(calibration, calibrate())
+    
+    print(f"{result['analyses']} analyses over {result['tickers']} tickers, "
+          f"{result['mode']} x{result['concurrency']}, latency scale {result['latency_scale']:g}")
+    print(f"throughput {result['throughput_per_s']:.1f}/s | p50 {result['p50_ms']:.2f} ms | "
+          f"p95 {result['p95_ms']:.2f} ms | p99 {result['p99_ms']:.2f} ms | "
+          f"peak RSS {result['peak_rss_mb']:.1f} MB | failed {result['failed']}")
+    print(f"calibration {result['calibration_per_s']:.0f} loops/s")
+    
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"baseline written to {args.write_baseline}")
+    
+    if result["failed"]:
+        print("FAILED: some analyses did not complete")
+        return 1
+    if args.baseline and not check_baseline(result, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Synthetic market data for benchmarks and load tests.
+"""
+import json
+import random
+import string
+from typing import Any, Dict
+
+def synthetic_market_data(n_tickers: int, news_per_ticker: int = 3, seed: int = 42) -> Dict[str, Any]:
+    """
+    Build a market_knowledge.json style dict with n_tickers random tickers.
+    
+    Args:
+        n_tickers: Number of tickers to generate
+        news_per_ticker: Headlines per ticker
+        seed: Random seed, so runs are reproducible
+    
+    Returns:
+        Dictionary keyed by ticker
+    """
+    rng = random.Random(seed)
+    db: Dict[str, Any] = {}
+    
+    while len(db) < n_tickers:
+        ticker = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 6)))
+        if ticker in db:
+            continue
+        db[ticker] = {
+            "price": round(rng.uniform(5, 1500), 2),
+            "pe_ratio": round(rng.uniform(5, 150), 1),
+            "news": [
+                f"{ticker} headline {i}: " + " ".join(rng.choices(string.ascii_lowercase, k=12))
+                for i in range(news_per_ticker)
+            ],
+            "financials": {
+                "revenue_growth": f"{rng.randint(-20, 300)}%",
+                "operating_margin": f"{rng.randint(-10, 60)}%"
+            }
+        }
+    
+    return db
+
+def write_synthetic_market_data(path: str, n_tickers: int, news_per_ticker: int = 3, seed: int = 42) -> Dict[str, Any]:
+    """Generate synthetic market data, write it to `path` as JSON and return it."""
+    db = synthetic_market_data(n_tickers, news_per_ticker, seed)
+    with open(path, "w") as f:
+        json.dump(db, f)
+    return db
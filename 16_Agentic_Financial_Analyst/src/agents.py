@@ -2,10 +2,22 @@
 Agent implementations with enhanced error handling and logging.
 Each agent represents a specialized role in the financial analysis workflow.
 """
+import asyncio
+import contextvars
+import random
+import threading
 import time
 import logging
-from typing import Dict, Any, Optional, Tuple
-from config import AGENT_TIMEOUT, RISK_THRESHOLDS
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import IO, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple, Union
+from config import (
+    AGENT_ATTEMPT_WORKERS, AGENT_TIMEOUT, MAX_RETRIES, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX,
+    MEMO_FORMAT, RISK_THRESHOLDS, SIMULATED_LATENCY
+)
+from tools import format_news, format_quote
+from memo import MemoRenderer, format_analysis
+from risk import classify_batch, classify_pe, portfolio_summary
+from tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +25,95 @@ class AgentError(Exception):
     """Custom exception for agent errors."""
     pass
 
+class AgentTimeoutError(AgentError):
+    """Raised when a stage misses its deadline or the analysis budget runs out."""
+    pass
+
+class Deadline:
+    """
+    Overall time budget shared by every stage of one analysis.
+    """
+    
+    def __init__(self, budget: float):
+        """
+        Start a budget that expires `budget` seconds from now.
+        
+        Args:
+            budget: Seconds available for the whole analysis
+        """
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+    
+    def remaining(self) -> float:
+        """Seconds left before the budget expires (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+_attempt_pool: Optional[ThreadPoolExecutor] = None
+_attempt_pool_lock = threading.Lock()
+# One slot per pool worker, held until the attempt returns (timed out or not)
+_attempt_slots = threading.BoundedSemaphore(AGENT_ATTEMPT_WORKERS)
+
+def _attempt_executor() -> ThreadPoolExecutor:
+    """Shared pool that runs timed attempts, created on first use."""
+    global _attempt_pool
+    with _attempt_pool_lock:
+        if _attempt_pool is None:
+            _attempt_pool = ThreadPoolExecutor(max_workers=AGENT_ATTEMPT_WORKERS,
+                                               thread_name_prefix="agent-attempt")
+        return _attempt_pool
+
+def _run_with_timeout(func: Callable[[Any, threading.Event], Any], arg: Any, timeout: float) -> Any:
+    """
+    Run func(arg, cancelled) on the shared attempt pool and stop waiting
+    `timeout` seconds after it starts.
+    
+    The call runs in a copy of the caller's context, so context variables
+    such as a pinned data snapshot are visible to it. On timeout
+    `cancelled` is set so the attempt can give up at its next check; one
+    that ignores it keeps its worker slot until it returns.
+    
+    Raises:
+        AgentTimeoutError: If the attempt overruns `timeout`
+        AgentError: If every worker is still held by earlier attempts;
+            not retried, so stuck attempts cannot queue up others
+    """
+    if not _attempt_slots.acquire(blocking=False):
+        raise AgentError(f"all {AGENT_ATTEMPT_WORKERS} attempt workers are busy")
+    
+    context = contextvars.copy_context()
+    cancelled = threading.Event()
+    started = threading.Event()
+    
+    def attempt() -> Any:
+        started.set()
+        try:
+            return context.run(func, arg, cancelled)
+        finally:
+            _attempt_slots.release()
+    
+    try:
+        future = _attempt_executor().submit(attempt)
+    except BaseException:
+        _attempt_slots.release()
+        raise
+    # A held slot means a worker is free, so the attempt starts right away
+    started.wait()
+    done, _ = wait([future], timeout)
+    
+    if not done:
+        cancelled.set()
+        raise AgentTimeoutError(f"stage exceeded its {timeout:.2f}s deadline")
+    return future.result()
+
 class Agent:
     """
     Base class for all agents in the swarm.
     Provides common functionality for thinking and execution.
     """
     
+    # Failures worth another attempt; anything else fails the stage at once
+    RETRYABLE_ERRORS: Tuple[type, ...] = (AgentTimeoutError, ConnectionError, TimeoutError)
+    
     def __init__(self, name: str, role: str, tools: Optional[Any] = None):
         """
         Initialize an agent.
@@ -31,30 +126,157 @@ class Agent:
         self.name = name
         self.role = role
         self.tools = tools
-        logger.info(f"Initialized {self.name} ({self.role})")
+        logger.info("Initialized %s (%s)", self.name, self.role)
     
-    def think(self, prompt: Any) -> Any:
+    @traced
+    def think(self, prompt: Any, deadline: Optional[Deadline] = None) -> Any:
         """
         Main thinking method that simulates LLM reasoning.
         
+        Each attempt is bounded by AGENT_TIMEOUT and by the remaining
+        analysis budget; with neither set it runs on the calling thread.
+        Transient failures are retried up to MAX_RETRIES times with
+        jittered exponential backoff.
+        
         Args:
             prompt: Input data for the agent to process
+            deadline: Optional budget shared with the other stages
         
         Returns:
             Agent's output after processing
+        
+        Raises:
+            AgentTimeoutError: If the stage or the analysis budget times out
+            AgentError: If execution fails for any other reason
         """
-        logger.info(f"{self.name} ({self.role}): Starting analysis...")
+        logger.info("%s (%s): Starting analysis...", self.name, self.role)
+        attempt = 0
         
-        try:
-            # Simulate API call latency
-            time.sleep(1)
-            result = self.execute(prompt)
-            logger.info(f"{self.name}: Analysis complete")
-            return result
+        while True:
+            attempt += 1
+            timeout = self._attempt_timeout(deadline)
+            
+            try:
+                if timeout is None:
+                    result = self._invoke(prompt)
+                else:
+                    result = _run_with_timeout(self._invoke, prompt, timeout)
+                logger.info("%s: Analysis complete", self.name)
+                return result
+            
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise self._stage_error(e)
+                logger.warning("%s: Attempt %s failed (%s), retrying in %.2fs", self.name, attempt, e, delay)
+                time.sleep(delay)
+    
+    @traced
+    async def athink(self, prompt: Any, deadline: Optional[Deadline] = None) -> Any:
+        """
+        Awaitable counterpart of think() for use inside an event loop.
         
-        except Exception as e:
-            logger.error(f"{self.name}: Error during execution - {e}")
-            raise AgentError(f"{self.name} failed: {e}")
+        The simulated LLM latency is awaited rather than slept, so many
+        analyses can be in flight on a single thread. Timed-out attempts
+        are cancelled rather than abandoned.
+        
+        Args:
+            prompt: Input data for the agent to process
+            deadline: Optional budget shared with the other stages
+        
+        Returns:
+            Agent's output after processing
+        """
+        logger.info("%s (%s): Starting analysis...", self.name, self.role)
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            timeout = self._attempt_timeout(deadline)
+            
+            try:
+                try:
+                    result = await asyncio.wait_for(self._ainvoke(prompt), timeout)
+                except asyncio.TimeoutError:
+                    raise AgentTimeoutError(f"stage exceeded its {timeout:.2f}s deadline")
+                logger.info("%s: Analysis complete", self.name)
+                return result
+            
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise self._stage_error(e)
+                logger.warning("%s: Attempt %s failed (%s), retrying in %.2fs", self.name, attempt, e, delay)
+                await asyncio.sleep(delay)
+    
+    def _invoke(self, prompt: Any, cancelled: Optional[threading.Event] = None) -> Any:
+        """
+        One attempt: simulated API call latency, then the agent logic.
+        
+        An attempt abandoned by its caller (`cancelled` set) stops during
+        the latency wait and never reaches execute().
+        """
+        if cancelled is None:
+            time.sleep(SIMULATED_LATENCY)
+        elif cancelled.wait(SIMULATED_LATENCY):
+            raise AgentTimeoutError(f"{self.name}: attempt abandoned after its deadline")
+        return self.execute(prompt)
+    
+    async def _ainvoke(self, prompt: Any) -> Any:
+        """One awaitable attempt: non-blocking latency, then the agent logic."""
+        await asyncio.sleep(SIMULATED_LATENCY)
+        return self.execute(prompt)
+    
+    def _attempt_timeout(self, deadline: Optional[Deadline]) -> Optional[float]:
+        """
+        Time allowed for the next attempt, or None when unbounded.
+        
+        Raises:
+            AgentTimeoutError: If the remaining budget cannot even cover the
+                simulated latency, so the attempt is skipped outright
+        """
+        timeout = AGENT_TIMEOUT if AGENT_TIMEOUT > 0 else None
+        if deadline is None:
+            return timeout
+        
+        remaining = deadline.remaining()
+        if remaining <= SIMULATED_LATENCY:
+            raise AgentTimeoutError(
+                f"{self.name}: {remaining:.2f}s left in analysis budget, stage cancelled"
+            )
+        return remaining if timeout is None else min(timeout, remaining)
+    
+    def _retry_delay(self, error: Exception, attempt: int,
+                     deadline: Optional[Deadline]) -> Optional[float]:
+        """
+        Backoff before the next attempt, or None if the stage should fail now.
+        
+        Uses full jitter: a uniform draw from [0, min(max, base * 2^(n-1))].
+        A retry is abandoned when the wait plus the simulated latency would
+        not fit in the remaining analysis budget.
+        """
+        if attempt > MAX_RETRIES or not self._is_retryable(error):
+            return None
+        
+        delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1)))
+        if deadline is not None and delay + SIMULATED_LATENCY >= deadline.remaining():
+            return None
+        return delay
+    
+    def _is_retryable(self, error: BaseException) -> bool:
+        """Check the error and whatever it wraps against RETRYABLE_ERRORS."""
+        while error is not None:
+            if isinstance(error, self.RETRYABLE_ERRORS):
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+    
+    def _stage_error(self, error: Exception) -> AgentError:
+        """Log a final stage failure and wrap it as an AgentError."""
+        logger.error("%s: Error during execution - %s", self.name, error)
+        if isinstance(error, AgentTimeoutError):
+            return error
+        return AgentError(f"{self.name} failed: {error}")
     
     def execute(self, prompt: Any) -> Any:
         """
@@ -69,36 +291,49 @@ class ResearcherAgent(Agent):
     Acts as the "eyes" of the swarm.
     """
     
-    def execute(self, ticker: str) -> Dict[str, Any]:
+    def execute(self, request: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Fetch market data for the given ticker.
         
         Args:
-            ticker: Stock ticker to research
+            request: Stock ticker to research, or a dict with "ticker" and
+                "render" (False skips building the display strings)
         
         Returns:
-            Dictionary with ticker and raw market data
+            Dictionary with the ticker, typed fields (price, pe_ratio, news)
+            and, when rendering, the human-readable raw_data
         """
-        logger.info(f"{self.name}: Fetching data for {ticker}")
+        if isinstance(request, dict):
+            ticker = request["ticker"]
+            render = request.get("render", True)
+        else:
+            ticker, render = request, True
+        
+        logger.info("%s: Fetching data for %s", self.name, ticker)
         
         if not self.tools:
             raise AgentError(f"{self.name}: No tools available")
         
         try:
-            price = self.tools.get_stock_price(ticker)
-            news = self.tools.get_recent_news(ticker)
+            quote = self.tools.get_quote(ticker)
+            news = self.tools.get_news_items(ticker)
             
             result = {
                 "ticker": ticker,
-                "raw_data": f"{price}\nNews: {news}",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                "price": quote["price"],
+                "pe_ratio": quote["pe_ratio"],
+                "news": news,
+                "render": render
             }
+            if render:
+                result["raw_data"] = f"{format_quote(ticker.upper(), quote)}\nNews: {format_news(news)}"
+                result["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
             
-            logger.info(f"{self.name}: Successfully gathered data for {ticker}")
+            logger.info("%s: Successfully gathered data for %s", self.name, ticker)
             return result
         
         except Exception as e:
-            logger.error(f"{self.name}: Failed to fetch data - {e}")
+            logger.error("%s: Failed to fetch data - %s", self.name, e)
             raise AgentError(f"Research failed for {ticker}: {e}")
 
 class QuantAgent(Agent):
@@ -118,16 +353,17 @@ class QuantAgent(Agent):
             Dictionary with risk assessment and analysis
         """
         ticker = research_data.get("ticker", "UNKNOWN")
-        logger.info(f"{self.name}: Analyzing risk for {ticker}")
+        logger.info("%s: Analyzing risk for %s", self.name, ticker)
         
         if not self.tools:
             raise AgentError(f"{self.name}: No tools available")
         
         try:
-            raw = research_data.get("raw_data", "")
-            
-            # Extract P/E ratio from raw data
-            pe_ratio = self._extract_pe_ratio(raw)
+            # Prefer the typed field; parse the display string only for
+            # payloads produced without one
+            pe_ratio = research_data.get("pe_ratio")
+            if pe_ratio is None:
+                pe_ratio = self._extract_pe_ratio(research_data.get("raw_data", ""))
             risk_level = self._calculate_risk(pe_ratio)
             
             metrics = self.tools.get_financial_metrics(ticker)
@@ -136,15 +372,17 @@ class QuantAgent(Agent):
                 "ticker": ticker,
                 "risk_assessment": risk_level,
                 "pe_ratio": pe_ratio,
-                "quantitative_analysis": f"Valuation is {risk_level}. P/E Ratio: {pe_ratio}. Metrics: {metrics}",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                "metrics": metrics
             }
+            if research_data.get("render", True):
+                result["quantitative_analysis"] = format_analysis(risk_level, pe_ratio, metrics)
+                result["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
             
-            logger.info(f"{self.name}: Risk assessment complete - {risk_level}")
+            logger.info("%s: Risk assessment complete - %s", self.name, risk_level)
             return result
         
         except Exception as e:
-            logger.error(f"{self.name}: Analysis failed - {e}")
+            logger.error("%s: Analysis failed - %s", self.name, e)
             raise AgentError(f"Quantitative analysis failed: {e}")
     
     def _extract_pe_ratio(self, raw_data: str) -> float:
@@ -161,12 +399,46 @@ class QuantAgent(Agent):
     
     def _calculate_risk(self, pe_ratio: float) -> str:
         """Calculate risk level based on P/E ratio thresholds."""
-        if pe_ratio >= RISK_THRESHOLDS["HIGH"]:
-            return "HIGH"
-        elif pe_ratio >= RISK_THRESHOLDS["MODERATE"]:
-            return "MODERATE"
-        else:
-            return "LOW"
+        return classify_pe(pe_ratio, RISK_THRESHOLDS)
+    
+    def assess_batch(
+        self,
+        pe_ratios: Sequence[float],
+        weights: Optional[Sequence[float]] = None,
+        metrics: Optional[Dict[str, Sequence[float]]] = None,
+        tables: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Score many tickers in one vectorized pass (requires NumPy).
+        
+        Gives the same labels as the per-ticker path for the same tables.
+        
+        Args:
+            pe_ratios: P/E ratio per ticker
+            weights: Optional position weights for portfolio aggregates
+            metrics: Optional extra metric arrays, aligned with pe_ratios
+            tables: Threshold table per metric; "pe_ratio" defaults to
+                RISK_THRESHOLDS
+        
+        Returns:
+            Dictionary with "risk_levels" (array of labels), per-metric
+            codes and a "portfolio" summary
+        """
+        try:
+            all_metrics = {"pe_ratio": pe_ratios}
+            all_metrics.update(metrics or {})
+            scored = classify_batch(all_metrics, {"pe_ratio": RISK_THRESHOLDS, **(tables or {})})
+            
+            logger.info("%s: Scored %s tickers in batch", self.name, len(scored['codes']))
+            return {
+                "risk_levels": scored["labels"],
+                "per_metric": scored["per_metric"],
+                "portfolio": portfolio_summary(scored["codes"], weights, pe_ratios)
+            }
+        
+        except Exception as e:
+            logger.error("%s: Batch scoring failed - %s", self.name, e)
+            raise AgentError(f"Batch risk scoring failed: {e}")
 
 class WriterAgent(Agent):
     """
@@ -174,6 +446,19 @@ class WriterAgent(Agent):
     Acts as the "voice" of the swarm.
     """
     
+    def __init__(self, name: str, role: str, tools: Optional[Any] = None, memo_format: str = MEMO_FORMAT):
+        """
+        Initialize the writer.
+        
+        Args:
+            name: Agent's name (e.g., "Charlie")
+            role: Agent's role (e.g., "Portfolio Manager")
+            tools: Tools object (unused by the writer)
+            memo_format: Output format, one of memo.MEMO_FORMATS
+        """
+        super().__init__(name, role, tools)
+        self.renderer = MemoRenderer(memo_format, analyst=f"{name} ({role})")
+    
     def execute(self, analysis_data: Tuple[Dict[str, Any], Dict[str, Any]]) -> str:
         """
         Generate investment memo from research and quant analysis.
@@ -187,36 +472,44 @@ class WriterAgent(Agent):
         research, quant = analysis_data
         ticker = research.get("ticker", "UNKNOWN")
         
-        logger.info(f"{self.name}: Drafting report for {ticker}")
+        logger.info("%s: Drafting report for %s", self.name, ticker)
         
         try:
-            report = f"""
-=== INVESTMENT MEMO: {ticker} ===
-DATE: {time.strftime("%Y-%m-%d %H:%M:%S")}
-ANALYST: {self.name} ({self.role})
-
-1. MARKET SNAPSHOT
-{research.get('raw_data', 'No data available')}
-
-2. QUANTITATIVE ANALYSIS
-Risk Level: {quant.get('risk_assessment', 'UNKNOWN')}
-P/E Ratio: {quant.get('pe_ratio', 'N/A')}
-{quant.get('quantitative_analysis', 'No analysis available')}
-
-3. RECOMMENDATION
-Based on the {quant.get('risk_assessment', 'UNKNOWN')} risk profile and current market conditions,
-we recommend a {'HOLD' if quant.get('risk_assessment') == 'HIGH' else 'BUY'} strategy.
-
-DISCLAIMER: This is a simulated analysis for demonstration purposes only.
-Not financial advice. Consult a licensed financial advisor before investing.
-
----
-Generated by The Wall Street Swarm v1.0
-"""
-            
-            logger.info(f"{self.name}: Report draft complete")
+            report = self.renderer.render(research, quant)
+            logger.info("%s: Report draft complete", self.name)
             return report
         
         except Exception as e:
-            logger.error(f"{self.name}: Report generation failed - {e}")
-            raise AgentError(f"Report writing failed: {e}")
\ No newline at end of file
+            logger.error("%s: Report generation failed - %s", self.name, e)
+            raise AgentError(f"Report writing failed: {e}")
+    
+    def write_batch(
+        self,
+        pairs: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]],
+        out: Union[str, IO[str]],
+        memo_format: Optional[str] = None
+    ) -> int:
+        """
+        Render memos for a batch of (research, quant) pairs straight to a
+        file or stream, without holding the memo strings in memory.
+        
+        Args:
+            pairs: (research_output, quant_output) pairs, consumed lazily
+            out: Output path or open text stream
+            memo_format: Override the writer's format for this batch
+        
+        Returns:
+            Number of memos written
+        """
+        renderer = self.renderer
+        if memo_format and memo_format != renderer.memo_format:
+            renderer = MemoRenderer(memo_format, analyst=renderer.analyst)
+        
+        try:
+            written = renderer.render_batch(pairs, out)
+        except (OSError, KeyError, TypeError) as e:
+            logger.error("%s: Batch report generation failed - %s", self.name, e)
+            raise AgentError(f"Batch report writing failed: {e}")
+        
+        logger.info("%s: Wrote %d %s memos", self.name, written, renderer.memo_format)
+        return written
\ No newline at end of file
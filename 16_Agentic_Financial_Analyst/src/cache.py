@@ -0,0 +1,237 @@
+"""
+Caching layer for FinancialTools lookups.
+Provides a TTL + LRU cache with single-flight loading and a drop-in
+wrapper that caches each tool method under its own TTL.
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from config import TOOL_CACHE_MAX_SIZE, TOOL_CACHE_TTLS
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """A load in progress that concurrent callers for the same key wait on."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class TTLCache:
+    """
+    Thread-safe cache with per-entry expiry and LRU eviction by size.
+    
+    Concurrent misses for the same key are coalesced: one caller runs the
+    loader while the others wait for its result (single-flight).
+    """
+    
+    def __init__(self, max_size: int = TOOL_CACHE_MAX_SIZE):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of entries kept before evicting the
+                least recently used one
+        """
+        if max_size < 1:
+            raise ValueError(f"max_size must be >= 1, got {max_size}")
+        
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.discarded = 0
+    
+    def get_or_load(self, key: Hashable, ttl: float, loader: Callable[[], Any],
+                    still_valid: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Return the cached value for key, loading it on a miss.
+        
+        Args:
+            key: Cache key
+            ttl: Seconds the loaded value stays fresh
+            loader: Zero-argument callable producing the value
+            still_valid: Checked after the load; when it returns False the
+                value is handed to the waiting callers but not cached
+        
+        Returns:
+            The cached or freshly loaded value
+        
+        Raises:
+            Whatever the loader raises; failures are never cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    if still_valid is None or still_valid():
+                        self._store(key, flight.result, ttl)
+                    else:
+                        self.discarded += 1
+                del self._flights[key]
+            flight.done.set()
+        
+        return flight.result
+    
+    def _store(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Insert an entry and evict LRU entries beyond max_size (lock held)."""
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every entry when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "discarded": self.discarded,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+def _copy(value: Any) -> Any:
+    """Shallow copy of a cached list or dict, so callers cannot mutate the entry."""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+class CachedFinancialTools:
+    """
+    Drop-in wrapper that caches FinancialTools lookups per method and ticker.
+    
+    Any tools object with the same method names can be wrapped, which is
+    where this pays off: a real API client is hit once per TTL window
+    instead of once per agent call.
+    """
+    
+    CACHED_METHODS = (
+        "get_quote", "get_stock_price", "get_news_items", "get_recent_news", "get_financial_metrics"
+    )
+    
+    def __init__(self, backend: Any, ttls: Optional[Dict[str, float]] = None,
+                 max_size: int = TOOL_CACHE_MAX_SIZE):
+        """
+        Wrap a tools backend.
+        
+        Args:
+            backend: Object implementing the FinancialTools methods
+            ttls: Per-method TTLs in seconds (defaults to TOOL_CACHE_TTLS)
+            max_size: Maximum number of cached lookups across all methods
+        """
+        self.backend = backend
+        self.ttls = dict(TOOL_CACHE_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.cache = TTLCache(max_size)
+        logger.info("Tool cache enabled (max_size=%s, ttls=%s)", max_size, self.ttls)
+    
+    def _cached(self, method: str, ticker: str) -> Any:
+        """
+        Look up method(ticker) through the cache.
+        
+        Keys include the backend's data version when it exposes one, so a
+        hot reload never serves stale entries and pinned readers stay on
+        their own snapshot. A load that a reload overtakes is returned but
+        not cached, since it may hold either version's data. Lists and
+        dicts are copied on the way out.
+        """
+        ticker = ticker.upper()
+        loader = getattr(self.backend, method)
+        version = getattr(self.backend, "version", None)
+        key = (method, ticker, version)
+        
+        def same_version() -> bool:
+            return getattr(self.backend, "version", None) == version
+        
+        return _copy(self.cache.get_or_load(key, self.ttls[method], lambda: loader(ticker), same_version))
+    
+    def get_quote(self, ticker: str) -> Dict[str, float]:
+        """Cached FinancialTools.get_quote()."""
+        return self._cached("get_quote", ticker)
+    
+    def get_stock_price(self, ticker: str) -> str:
+        """Cached FinancialTools.get_stock_price()."""
+        return self._cached("get_stock_price", ticker)
+    
+    def get_news_items(self, ticker: str) -> List[str]:
+        """Cached FinancialTools.get_news_items()."""
+        return self._cached("get_news_items", ticker)
+    
+    def get_recent_news(self, ticker: str) -> str:
+        """Cached FinancialTools.get_recent_news()."""
+        return self._cached("get_recent_news", ticker)
+    
+    def get_financial_metrics(self, ticker: str) -> Dict[str, Any]:
+        """Cached FinancialTools.get_financial_metrics()."""
+        return self._cached("get_financial_metrics", ticker)
+    
+    def invalidate(self, ticker: Optional[str] = None) -> None:
+        """Drop cached lookups for one ticker, or everything."""
+        if ticker is None:
+            self.cache.invalidate()
+            return
+        version = getattr(self.backend, "version", None)
+        for method in self.CACHED_METHODS:
+            self.cache.invalidate((method, ticker.upper(), version))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters."""
+        return self.cache.stats()
+    
+    def __getattr__(self, name: str) -> Any:
+        """Delegate everything else (db, data_path, ...) to the backend."""
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
@@ -9,6 +9,8 @@ from typing import List
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(BASE_DIR), "data")
 DATA_PATH = os.path.join(DATA_DIR, "market_knowledge.json")
+MARKET_STORE_EXTENSION = ".mkts"  # DATA_PATH suffix selecting the memory-mapped store
+DATA_RELOAD_INTERVAL = 5.0  # seconds between data file change checks (0 = off)
 
 # Supported tickers
 SUPPORTED_TICKERS: List[str] = ["TSLA", "NVDA", "AAPL", "MSFT", "GOOGL"]
@@ -22,8 +24,56 @@ RISK_THRESHOLDS = {
 
 # Agent configuration
 AGENT_TIMEOUT = 30  # seconds
+AGENT_ATTEMPT_WORKERS = 32  # shared threads running timed think() attempts
 MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 0.5  # seconds, doubled on each retry
+RETRY_BACKOFF_MAX = 8.0   # cap on a single backoff wait
+ANALYSIS_BUDGET = 90      # seconds for all stages of one analysis
+SIMULATED_LATENCY = 1.0  # seconds of mock LLM latency per think() call
+
+# Tool cache configuration (seconds a lookup stays fresh, per method)
+TOOL_CACHE_ENABLED = True
+TOOL_CACHE_MAX_SIZE = 1024
+TOOL_CACHE_TTLS = {
+    "get_quote": 5.0,
+    "get_stock_price": 5.0,
+    "get_news_items": 60.0,
+    "get_recent_news": 60.0,
+    "get_financial_metrics": 3600.0
+}
+
+# Batch analysis configuration
+MAX_CONCURRENCY = 4  # tickers analyzed in parallel by analyze_many()
+
+# Pipelined execution: worker threads per stage and input queue capacity
+PIPELINE_WORKERS = {"research": 2, "quant": 2, "writer": 1}
+PIPELINE_QUEUE_SIZE = 8
+
+# Persistent result store (SWARM_RESULT_STORE=<dir> enables it by default)
+RESULT_STORE_DIR = os.getenv("SWARM_RESULT_STORE")
+RESULT_STORE_MAX_BYTES = 64 * 1024 * 1024
+
+# Memo output format used by WriterAgent: "text", "markdown" or "jsonl"
+MEMO_FORMAT = "text"
+
+# HTTP service (python main.py --serve); binds locally only by default
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8016
+SERVER_WORKERS = MAX_CONCURRENCY  # analyses running at once
+
+# Tracing configuration (SWARM_TRACING=1 records spans; SWARM_TRACE_FILE
+# makes main() write a Chrome trace there on exit)
+TRACING_ENABLED = os.getenv("SWARM_TRACING", "0") == "1"
+TRACE_EXPORT_PATH = os.getenv("SWARM_TRACE_FILE")
+TRACE_MAX_SPANS = 100_000
 
 # Logging configuration
 LOG_LEVEL = "INFO"
-LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
\ No newline at end of file
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_FILE = "swarm.log"
+LOG_ASYNC = os.getenv("SWARM_LOG_ASYNC", "0") == "1"  # queue + background writer (opt-in)
+LOG_BATCH_SIZE = 256           # most records written per batch in async mode
+LOG_QUEUE_SIZE = 10_000        # records queued for the async writer at most
+LOG_QUEUE_BLOCK = False        # when full: wait for room (True) or drop the record (False)
+LOG_INFO_SAMPLE_RATE = 1.0     # fraction of agent/tool INFO records kept
+LOG_SAMPLED_LOGGERS = ("agents", "tools", "cache")
\ No newline at end of file
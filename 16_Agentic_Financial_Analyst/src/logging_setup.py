@@ -0,0 +1,228 @@
+"""
+Logging setup for the swarm.
+Synchronous mode (the default) mirrors the original stdout + swarm.log
+handlers. Async mode puts records on a bounded queue and a background
+thread formats them and writes them in batches, so agents never wait on
+handler locks or disk; when the queue is full, records are dropped and
+counted (or, with LOG_QUEUE_BLOCK, the caller waits for room).
+"""
+import atexit
+import logging
+import queue
+import random
+import sys
+import threading
+from typing import IO, List, Optional, Sequence
+from config import (
+    LOG_ASYNC, LOG_BATCH_SIZE, LOG_FILE, LOG_FORMAT, LOG_INFO_SAMPLE_RATE,
+    LOG_LEVEL, LOG_QUEUE_BLOCK, LOG_QUEUE_SIZE, LOG_SAMPLED_LOGGERS
+)
+
+class InfoSampler(logging.Filter):
+    """
+    Keeps only a fraction of INFO records from the chatty agent/tool
+    loggers. WARNING and above always pass.
+    """
+    
+    def __init__(self, rate: float, loggers: Sequence[str] = LOG_SAMPLED_LOGGERS):
+        """
+        Args:
+            rate: Fraction of INFO records kept, in [0, 1]
+            loggers: Logger names (and their children) subject to sampling
+        """
+        super().__init__()
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"sample rate must be in [0, 1], got {rate}")
+        self.rate = rate
+        self.prefixes = tuple(loggers)
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.INFO or self.rate >= 1.0:
+            return True
+        if not record.name.startswith(self.prefixes):
+            return True
+        return random.random() < self.rate
+
+class _DeferredQueueHandler(logging.Handler):
+    """
+    Enqueues records without formatting them.
+    
+    Unlike logging.handlers.QueueHandler, the %-style message is merged on
+    the writer thread, so the analysis thread only pays for the record.
+    With a full queue the record is dropped and counted in `dropped`,
+    unless `block` is set.
+    """
+    
+    def __init__(self, records: "queue.Queue", block: bool = LOG_QUEUE_BLOCK):
+        super().__init__()
+        self.records = records
+        self.block = block
+        self.dropped = 0
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if record.exc_info:
+                # Tracebacks hold frames; render them while they are valid
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.records.put(record, block=self.block)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+class BatchLogWriter:
+    """
+    Background thread draining the record queue into one or more streams,
+    writing and flushing once per batch instead of once per record.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, records: "queue.Queue", streams: List[IO[str]],
+                 formatter: logging.Formatter, batch_size: int = LOG_BATCH_SIZE):
+        """
+        Args:
+            records: Queue fed by the deferred queue handler
+            streams: Text streams every line is written to
+            formatter: Formatter applied on the writer thread
+            batch_size: Most records formatted per write; whatever is
+                queued when the writer wakes up goes out in one write
+        """
+        self.records = records
+        self.streams = streams
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="swarm-log-writer")
+    
+    def start(self) -> None:
+        """Start the writer thread."""
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Write everything still queued, then stop the thread."""
+        if self._thread.is_alive():
+            self.records.put(self._STOP)
+            self._thread.join()
+    
+    def _run(self) -> None:
+        while True:
+            batch = [self.records.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stopping = any(record is self._STOP for record in batch)
+            self._write([record for record in batch if record is not self._STOP])
+            if stopping:
+                return
+    
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        if not batch:
+            return
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception as e:
+                lines.append(f"<unformattable log record from {record.name}: {e}>")
+        text = "\n".join(lines) + "\n"
+        for stream in self.streams:
+            try:
+                stream.write(text)
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+        self.written += len(batch)
+
+_writer: Optional[BatchLogWriter] = None
+_handler: Optional[_DeferredQueueHandler] = None
+_log_file: Optional[IO[str]] = None
+_installed: List[logging.Handler] = []  # root handlers added by configure_logging
+
+def dropped_records() -> int:
+    """Records the running async writer has dropped on a full queue."""
+    return _handler.dropped if _handler is not None else 0
+
+def shutdown_logging() -> None:
+    """
+    Remove the handlers configure_logging installed on the root logger,
+    then flush and stop the async writer, if one is running. Handlers
+    added by anyone else are left alone.
+    """
+    global _writer, _handler, _log_file
+    root = logging.getLogger()
+    for handler in _installed:
+        root.removeHandler(handler)
+        handler.close()
+    _installed.clear()
+    if _writer is not None:
+        _writer.stop()
+        if _handler.dropped:
+            # Written directly: the writer thread has already stopped
+            record = logging.LogRecord("logging_setup", logging.WARNING, __file__, 0,
+                                       "%d log records dropped: async log queue was full",
+                                       (_handler.dropped,), None)
+            _writer._write([record])
+        _writer = None
+        _handler = None
+    if _log_file is not None:
+        _log_file.close()
+        _log_file = None
+
+def configure_logging(async_mode: bool = LOG_ASYNC, sample_rate: float = LOG_INFO_SAMPLE_RATE,
+                      log_file: Optional[str] = LOG_FILE, stream: Optional[IO[str]] = None,
+                      level: str = LOG_LEVEL, queue_size: int = LOG_QUEUE_SIZE) -> None:
+    """
+    (Re)configure root logging for the swarm. Only the handlers a
+    previous call installed are replaced; handlers the caller added to
+    the root logger stay in place.
+    
+    Args:
+        async_mode: Queue records and write them from a background thread
+        sample_rate: Fraction of agent/tool INFO records kept
+        log_file: File every line is appended to (None for stdout only)
+        stream: Console stream (defaults to sys.stdout)
+        level: Root log level name
+        queue_size: Most records queued in async mode
+    """
+    global _writer, _handler, _log_file
+    shutdown_logging()
+    
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level))
+    
+    stream = stream or sys.stdout
+    formatter = logging.Formatter(LOG_FORMAT)
+    sampler = InfoSampler(sample_rate)
+    
+    if not async_mode:
+        handlers: List[logging.Handler] = [logging.StreamHandler(stream)]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            handler.addFilter(sampler)
+            root.addHandler(handler)
+            _installed.append(handler)
+        return
+    
+    streams: List[IO[str]] = [stream]
+    if log_file:
+        _log_file = open(log_file, "a")
+        streams.append(_log_file)
+    
+    records: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    _handler = _DeferredQueueHandler(records)
+    _handler.addFilter(sampler)
+    root.addHandler(_handler)
+    _installed.append(_handler)
+    
+    _writer = BatchLogWriter(records, streams, formatter)
+    _writer.start()
+
+atexit.register(shutdown_logging)
@@ -2,22 +2,28 @@
 Main orchestrator for The Wall Street Swarm.
 Coordinates agent workflow and handles errors gracefully.
 """
+import argparse
+import asyncio
+import contextlib
 import logging
 import sys
-from typing import Optional
-from config import LOG_LEVEL, LOG_FORMAT, SUPPORTED_TICKERS
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import IO, Any, AsyncIterator, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from config import (
+    SUPPORTED_TICKERS, MAX_CONCURRENCY, ANALYSIS_BUDGET, RESULT_STORE_DIR, RISK_THRESHOLDS,
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, TOOL_CACHE_ENABLED, PIPELINE_QUEUE_SIZE, PIPELINE_WORKERS, TRACE_EXPORT_PATH
+)
 from tools import FinancialTools, FinancialToolsError
-from agents import ResearcherAgent, QuantAgent, WriterAgent, AgentError
+from cache import CachedFinancialTools
+from agents import ResearcherAgent, QuantAgent, WriterAgent, AgentError, Deadline
+from pipeline import Stage, StagePipeline
+from result_store import AnalysisResultStore, config_fingerprint
+from server import serve
+from tracing import traced, tracer
+from logging_setup import configure_logging
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format=LOG_FORMAT,
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('swarm.log')
-    ]
-)
+# Configure logging (stdout + swarm.log; queue-backed writer when LOG_ASYNC)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 class FinancialSwarm:
@@ -25,22 +31,76 @@ class FinancialSwarm:
     Orchestrates the multi-agent financial analysis workflow.
     """
     
-    def __init__(self):
-        """Initialize the swarm with tools and agents."""
+    def __init__(self, tools: Optional[Any] = None, result_store: Optional[AnalysisResultStore] = None):
+        """
+        Initialize the swarm with tools and agents.
+        
+        Args:
+            tools: Tools backend to use; defaults to FinancialTools, wrapped
+                in CachedFinancialTools when TOOL_CACHE_ENABLED is set
+            result_store: Store of finished memos reused while the ticker's
+                data and the agent config are unchanged; defaults to one in
+                RESULT_STORE_DIR when that is set
+        """
         logger.info("Initializing Financial Swarm...")
         
         try:
-            self.tools = FinancialTools()
+            if tools is None:
+                tools = FinancialTools()
+                if TOOL_CACHE_ENABLED:
+                    tools = CachedFinancialTools(tools)
+            self.tools = tools
             self.researcher = ResearcherAgent("Alice", "Senior Researcher", self.tools)
             self.quant = QuantAgent("Bob", "Quantitative Analyst", self.tools)
             self.writer = WriterAgent("Charlie", "Portfolio Manager", None)
+            self.pipeline: Optional[StagePipeline] = None
+            if result_store is None and RESULT_STORE_DIR:
+                result_store = AnalysisResultStore(RESULT_STORE_DIR)
+            self.result_store = result_store
             
             logger.info("Swarm initialization complete")
         
         except Exception as e:
-            logger.critical(f"Failed to initialize swarm: {e}")
+            logger.critical("Failed to initialize swarm: %s", e)
             raise
     
+    def _pinned_data(self, snapshot: Any = None) -> ContextManager:
+        """Pin one market data snapshot for an analysis, if the tools support it."""
+        pinned = getattr(self.tools, "pinned", None)
+        return pinned(snapshot) if pinned is not None else contextlib.nullcontext()
+    
+    def _config_fingerprint(self) -> str:
+        """Fingerprint of every setting that changes a memo for the same data."""
+        return config_fingerprint({
+            "risk_thresholds": RISK_THRESHOLDS,
+            "memo_format": self.writer.renderer.memo_format,
+            "analyst": self.writer.renderer.analyst
+        })
+    
+    def _result_key(self, ticker: str) -> Optional[Tuple[Any, str]]:
+        """
+        (market record, config fingerprint) addressing this ticker's memo in
+        the result store, or None when there is no store or no record.
+        Call inside _pinned_data() so the record matches what the agents read.
+        """
+        db = getattr(self.tools, "db", None)
+        if self.result_store is None or db is None:
+            return None
+        record = db.get(ticker)
+        if record is None:
+            return None
+        return record, self._config_fingerprint()
+    
+    def _store_result(self, ticker: str, key: Optional[Tuple[Any, str]], memo: str) -> None:
+        """Persist a finished memo; a failing store never fails the analysis."""
+        if key is None:
+            return
+        try:
+            self.result_store.put(ticker, key[0], key[1], memo)
+        except OSError as e:
+            logger.warning("Could not store analysis for %s: %s", ticker, e)
+    
+    @traced
     def analyze(self, ticker: str) -> Optional[str]:
         """
         Run the complete analysis workflow for a ticker.
@@ -53,40 +113,298 @@ class FinancialSwarm:
         """
         ticker = ticker.upper()
         
-        logger.info(f"="*60)
-        logger.info(f"STARTING ANALYSIS FOR: {ticker}")
-        logger.info(f"="*60)
+        logger.info("=" * 60)
+        logger.info("STARTING ANALYSIS FOR: %s", ticker)
+        logger.info("=" * 60)
         
         # Validate ticker
         if ticker not in SUPPORTED_TICKERS:
-            logger.warning(f"Ticker {ticker} not in supported list: {SUPPORTED_TICKERS}")
+            logger.warning("Ticker %s not in supported list: %s", ticker, SUPPORTED_TICKERS)
+        
+        # All three stages share one time budget
+        deadline = Deadline(ANALYSIS_BUDGET)
         
         try:
-            # Step 1: Research
-            logger.info("Step 1/3: Research Phase")
-            research_output = self.researcher.think(ticker)
-            
-            # Step 2: Quantitative Analysis
-            logger.info("Step 2/3: Quantitative Analysis Phase")
-            quant_output = self.quant.think(research_output)
-            
-            # Step 3: Report Writing
-            logger.info("Step 3/3: Report Writing Phase")
-            final_report = self.writer.think((research_output, quant_output))
+            # Every stage reads the same market data snapshot
+            with self._pinned_data():
+                # Unchanged data and config: reuse the stored memo
+                result_key = self._result_key(ticker)
+                if result_key is not None:
+                    stored = self.result_store.get(ticker, *result_key)
+                    if stored is not None:
+                        return stored
+                
+                # Step 1: Research
+                logger.info("Step 1/3: Research Phase")
+                research_output = self.researcher.think(ticker, deadline)
+                
+                # Step 2: Quantitative Analysis
+                logger.info("Step 2/3: Quantitative Analysis Phase")
+                quant_output = self.quant.think(research_output, deadline)
+                
+                # Step 3: Report Writing
+                logger.info("Step 3/3: Report Writing Phase")
+                final_report = self.writer.think((research_output, quant_output), deadline)
             
+            self._store_result(ticker, result_key, final_report)
             logger.info("Analysis workflow complete")
             return final_report
         
         except (FinancialToolsError, AgentError) as e:
-            logger.error(f"Analysis failed for {ticker}: {e}")
+            logger.error("Analysis failed for %s: %s", ticker, e)
+            return None
+        
+        except Exception as e:
+            logger.critical("Unexpected error during analysis: %s", e)
+            return None
+    
+    @traced
+    def assess(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """
+        Run Research -> Quant on typed fields only, without writing a memo.
+        
+        Fast path for screens that need the risk numbers but no
+        human-readable text: no display strings are formatted or parsed.
+        
+        Args:
+            ticker: Stock ticker to assess
+        
+        Returns:
+            Quant output (ticker, risk_assessment, pe_ratio, metrics) or
+            None if the assessment fails
+        """
+        ticker = ticker.upper()
+        deadline = Deadline(ANALYSIS_BUDGET)
+        
+        try:
+            with self._pinned_data():
+                research_output = self.researcher.think({"ticker": ticker, "render": False}, deadline)
+                return self.quant.think(research_output, deadline)
+        
+        except (FinancialToolsError, AgentError) as e:
+            logger.error("Assessment failed for %s: %s", ticker, e)
+            return None
+        
+        except Exception as e:
+            logger.critical("Unexpected error during assessment: %s", e)
+            return None
+    
+    def write_memos(self, tickers: Iterable[str], out: Union[str, IO[str]],
+                    memo_format: Optional[str] = None) -> int:
+        """
+        Research and assess each ticker, streaming one memo per success to
+        a file or text stream.
+        
+        Research runs without rendering display strings; the writer
+        rebuilds the market snapshot from the typed fields. Tickers that
+        fail are logged and skipped.
+        
+        Args:
+            tickers: Stock tickers to write up
+            out: Output path or open text stream
+            memo_format: "text", "markdown" or "jsonl" (defaults to MEMO_FORMAT)
+        
+        Returns:
+            Number of memos written
+        """
+        def pairs() -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+            for ticker in tickers:
+                ticker = ticker.upper()
+                deadline = Deadline(ANALYSIS_BUDGET)
+                try:
+                    with self._pinned_data():
+                        research_output = self.researcher.think({"ticker": ticker, "render": False}, deadline)
+                        quant_output = self.quant.think(research_output, deadline)
+                except (FinancialToolsError, AgentError) as e:
+                    logger.error("Memo skipped for %s: %s", ticker, e)
+                    continue
+                yield research_output, quant_output
+        
+        return self.writer.write_batch(pairs(), out, memo_format)
+    
+    def analyze_pipelined(
+        self,
+        tickers: Iterable[str],
+        workers: Optional[Dict[str, int]] = None,
+        queue_size: int = PIPELINE_QUEUE_SIZE
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Run tickers through a staged pipeline (research -> quant -> writer).
+        
+        Each agent is a stage with its own bounded queue and workers, so
+        ticker B can be researched while ticker A is with the Quant. While
+        or after iterating, self.pipeline.stats() reports per-stage
+        throughput, utilization and queue depth.
+        
+        Args:
+            tickers: Stock tickers to analyze
+            workers: Worker threads per stage (defaults to PIPELINE_WORKERS)
+            queue_size: Capacity of each stage's input queue
+        
+        Yields:
+            (ticker, memo) tuples in completion order; memo is None if any
+            stage failed
+        """
+        workers = {**PIPELINE_WORKERS, **(workers or {})}
+        
+        def research(ctx: Dict[str, Any]) -> Dict[str, Any]:
+            # The budget starts when work starts, not while queued; the data
+            # snapshot pinned here travels with the ticker to later stages
+            ctx["deadline"] = Deadline(ANALYSIS_BUDGET)
+            with self._pinned_data() as snapshot:
+                ctx["snapshot"] = snapshot
+                ctx["research"] = self.researcher.think(ctx["ticker"], ctx["deadline"])
+            return ctx
+        
+        def quant(ctx: Dict[str, Any]) -> Dict[str, Any]:
+            with self._pinned_data(ctx["snapshot"]):
+                ctx["quant"] = self.quant.think(ctx["research"], ctx["deadline"])
+            return ctx
+        
+        def write(ctx: Dict[str, Any]) -> Dict[str, Any]:
+            ctx["memo"] = self.writer.think((ctx["research"], ctx["quant"]), ctx["deadline"])
+            return ctx
+        
+        self.pipeline = StagePipeline([
+            Stage("research", research, workers["research"], queue_size),
+            Stage("quant", quant, workers["quant"], queue_size),
+            Stage("writer", write, workers["writer"], queue_size)
+        ])
+        
+        items = [(ticker.upper(), {"ticker": ticker.upper()}) for ticker in tickers]
+        for item in self.pipeline.run(items):
+            if item.error is not None:
+                logger.error("Pipelined analysis failed for %s: %s", item.key, item.error)
+                yield item.key, None
+            else:
+                yield item.key, item.value["memo"]
+        
+        logger.info("Pipeline stats: %s (bottleneck: %s)", self.pipeline.stats(), self.pipeline.bottleneck())
+    
+    @traced
+    async def aanalyze(self, ticker: str) -> Optional[str]:
+        """
+        Awaitable version of analyze() built on Agent.athink().
+        
+        Args:
+            ticker: Stock ticker to analyze
+        
+        Returns:
+            Final investment memo or None if analysis fails
+        """
+        ticker = ticker.upper()
+        logger.info("STARTING ASYNC ANALYSIS FOR: %s", ticker)
+        
+        if ticker not in SUPPORTED_TICKERS:
+            logger.warning("Ticker %s not in supported list: %s", ticker, SUPPORTED_TICKERS)
+        
+        deadline = Deadline(ANALYSIS_BUDGET)
+        
+        try:
+            with self._pinned_data():
+                result_key = self._result_key(ticker)
+                if result_key is not None:
+                    stored = self.result_store.get(ticker, *result_key)
+                    if stored is not None:
+                        return stored
+                
+                research_output = await self.researcher.athink(ticker, deadline)
+                quant_output = await self.quant.athink(research_output, deadline)
+                final_report = await self.writer.athink((research_output, quant_output), deadline)
+            
+            self._store_result(ticker, result_key, final_report)
+            logger.info("Async analysis workflow complete for %s", ticker)
+            return final_report
+        
+        except (FinancialToolsError, AgentError) as e:
+            logger.error("Analysis failed for %s: %s", ticker, e)
             return None
         
         except Exception as e:
-            logger.critical(f"Unexpected error during analysis: {e}")
+            logger.critical("Unexpected error during analysis: %s", e)
             return None
+    
+    async def aanalyze_many(
+        self,
+        tickers: Iterable[str],
+        max_concurrency: int = MAX_CONCURRENCY
+    ) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """
+        Run many analyses on the current event loop.
+        
+        Args:
+            tickers: Stock tickers to analyze
+            max_concurrency: Maximum number of analyses in flight at once
+        
+        Yields:
+            (ticker, memo) tuples in completion order
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be >= 1, got {max_concurrency}")
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run(ticker: str) -> Tuple[str, Optional[str]]:
+            async with semaphore:
+                return ticker, await self.aanalyze(ticker)
+        
+        tasks = [asyncio.ensure_future(run(ticker.upper())) for ticker in tickers]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def analyze_many(
+        self,
+        tickers: Iterable[str],
+        max_concurrency: int = MAX_CONCURRENCY
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Run the analysis workflow for several tickers in parallel.
+        
+        Each ticker still walks Researcher -> Quant -> Writer in order on a
+        single worker thread; different tickers overlap on a bounded pool.
+        
+        Args:
+            tickers: Stock tickers to analyze
+            max_concurrency: Maximum number of tickers analyzed at once
+        
+        Yields:
+            (ticker, memo) tuples in completion order; memo is None if the
+            analysis failed
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be >= 1, got {max_concurrency}")
+        
+        tickers = [ticker.upper() for ticker in tickers]
+        if not tickers:
+            return
+        
+        workers = min(max_concurrency, len(tickers))
+        logger.info("Analyzing %s tickers with concurrency %s", len(tickers), workers)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="swarm") as pool:
+            futures = {pool.submit(self.analyze, ticker): ticker for ticker in tickers}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                # Caller stopped consuming early: drop work that has not started
+                for future in futures:
+                    future.cancel()
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Wall Street Swarm - multi-agent financial analysis")
+    parser.add_argument("--ticker", default="NVDA", help="ticker to analyze (default: NVDA)")
+    parser.add_argument("--serve", action="store_true", help="run the local HTTP analysis service")
+    parser.add_argument("--host", default=SERVER_HOST, help=f"service interface (default: {SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"service port (default: {SERVER_PORT})")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="concurrent analyses in service mode")
+    args = parser.parse_args(argv)
+    
     print("🚀 WALL STREET SWARM - Multi-Agent Financial Analysis System")
     print("="*60)
     
@@ -97,11 +415,21 @@ def main():
         print(f"❌ Failed to initialize swarm: {e}")
         return 1
     
-    # Run analysis (you can change the ticker here)
-    ticker = "NVDA"  # Change to TSLA, AAPL, etc.
+    if args.serve:
+        print(f"🌐 Serving on http://{args.host}:{args.port} (GET /analyze?ticker=NVDA, /stats, /health)")
+        serve(swarm, args.host, args.port, args.workers)
+        return 0
+    
+    ticker = args.ticker
     
     result = swarm.analyze(ticker)
     
+    if tracer.enabled:
+        logger.info("Latency summary: %s", tracer.latency_summary())
+        if TRACE_EXPORT_PATH:
+            tracer.export_chrome_trace(TRACE_EXPORT_PATH)
+            print(f"📈 Trace written to {TRACE_EXPORT_PATH}")
+    
     if result:
         print("\n✅ FINAL REPORT GENERATED:")
         print(result)
@@ -0,0 +1,202 @@
+"""
+Indexed, memory-mapped market data store for large ticker universes.
+
+File layout (little-endian):
+    header   magic (8s) | key width (I) | ticker count (I)
+    index    count x [ticker (key width, NUL padded) | offset (Q) | length (I)],
+             sorted by ticker so lookups binary-search the mapped bytes
+    records  one UTF-8 JSON object per ticker
+
+Only the header is read at open time; a ticker's record is decoded when
+it is requested, and the most recently used decoded records are kept.
+
+Convert the JSON file with:
+    python market_store.py ../data/market_knowledge.json ../data/market_knowledge.mkts
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MKTSTOR1"
+HEADER = struct.Struct("<8sII")
+DECODED_CACHE_SIZE = 1024  # decoded records kept per open store
+
+class MarketStoreError(Exception):
+    """Custom exception for market store errors."""
+    pass
+
+def _index_entry(key_width: int) -> struct.Struct:
+    """Struct for one index entry with the given ticker width."""
+    return struct.Struct(f"<{key_width}sQI")
+
+class MarketStore(Mapping):
+    """
+    Read-only ticker -> record mapping backed by a memory-mapped file.
+    Usable anywhere FinancialTools expects its `db` dict.
+    """
+    
+    def __init__(self, path: str, cache_size: int = DECODED_CACHE_SIZE):
+        """
+        Open and map a store file.
+        
+        Args:
+            path: Path to a file written by write_store()
+            cache_size: Most decoded records kept (least recently used go first)
+        
+        Raises:
+            MarketStoreError: If the file is missing, not a market store,
+                or too short for the index its header declares
+        """
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise MarketStoreError(f"Cannot map market store {path}: {e}")
+        
+        if len(self._mm) < HEADER.size:
+            raise MarketStoreError(f"Truncated market store: {path}")
+        
+        magic, self._key_width, self._count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise MarketStoreError(f"Not a market store file: {path}")
+        
+        self._entry = _index_entry(self._key_width)
+        if HEADER.size + self._count * self._entry.size > len(self._mm):
+            raise MarketStoreError(f"Truncated market store index: {path}")
+        self._cache_size = cache_size
+        self._decoded: "OrderedDict[str, Any]" = OrderedDict()
+        self._decoded_lock = threading.Lock()
+    
+    def _key_at(self, i: int) -> bytes:
+        """Raw (padded) ticker bytes of index entry i."""
+        start = HEADER.size + i * self._entry.size
+        return self._mm[start:start + self._key_width]
+    
+    def _find(self, key: bytes) -> Optional[int]:
+        """Binary-search the mapped index for a padded ticker key."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key_at(lo) == key:
+            return lo
+        return None
+    
+    def __getitem__(self, ticker: str) -> Any:
+        """
+        Decoded record for a ticker.
+        
+        Raises:
+            KeyError: If the ticker is not in the store
+            MarketStoreError: If the ticker's record is truncated or not valid JSON
+        """
+        with self._decoded_lock:
+            record = self._decoded.get(ticker)
+            if record is not None:
+                self._decoded.move_to_end(ticker)
+                return record
+        
+        key = ticker.encode("utf-8")
+        if len(key) > self._key_width:
+            raise KeyError(ticker)
+        i = self._find(key.ljust(self._key_width, b"\0"))
+        if i is None:
+            raise KeyError(ticker)
+        
+        _, offset, length = self._entry.unpack_from(self._mm, HEADER.size + i * self._entry.size)
+        if offset + length > len(self._mm):
+            raise MarketStoreError(f"Truncated record for {ticker} in {self.path}")
+        try:
+            record = json.loads(self._mm[offset:offset + length])
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise MarketStoreError(f"Corrupt record for {ticker} in {self.path}: {e}")
+        
+        with self._decoded_lock:
+            self._decoded[ticker] = record
+            while len(self._decoded) > self._cache_size:
+                self._decoded.popitem(last=False)
+        return record
+    
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._key_at(i).rstrip(b"\0").decode("utf-8")
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def close(self) -> None:
+        """Unmap the file. Lookups after close() fail."""
+        self._mm.close()
+
+def write_store(db: Dict[str, Any], path: str) -> None:
+    """
+    Write a ticker -> record dict as a market store file.
+    
+    The file is written next to `path` and renamed into place, so open
+    readers keep mapping the old inode and never see a partial file.
+    
+    Args:
+        db: Market data keyed by ticker
+        path: Destination file
+    """
+    tickers = sorted(db)
+    keys = [t.encode("utf-8") for t in tickers]
+    key_width = max((len(k) for k in keys), default=1)
+    entry = _index_entry(key_width)
+    
+    records = [json.dumps(db[t], separators=(",", ":")).encode("utf-8") for t in tickers]
+    offset = HEADER.size + entry.size * len(tickers)
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, key_width, len(tickers)))
+            for key, record in zip(keys, records):
+                f.write(entry.pack(key, offset, len(record)))
+                offset += len(record)
+            for record in records:
+                f.write(record)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    
+    logger.info("Wrote market store for %s tickers to %s", len(tickers), path)
+
+def convert_json_to_store(json_path: str, store_path: str) -> int:
+    """
+    Convert a market_knowledge.json style file into a market store.
+    
+    Args:
+        json_path: Source JSON file
+        store_path: Destination store file
+    
+    Returns:
+        Number of tickers written
+    """
+    with open(json_path, "r") as f:
+        db = json.load(f)
+    write_store(db, store_path)
+    return len(db)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python market_store.py <input.json> <output.mkts>")
+        sys.exit(1)
+    count = convert_json_to_store(sys.argv[1], sys.argv[2])
+    print(f"Converted {count} tickers into {sys.argv[2]}")
@@ -0,0 +1,205 @@
+"""
+Memo rendering for the Writer agent.
+Templates are compiled once per renderer; a batch of (research, quant)
+pairs is streamed to a file or text stream memo by memo, with the date
+stamped once per batch. Formats: plain text, Markdown and JSON lines.
+"""
+import json
+import string
+import time
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple, Union
+from tools import format_news, format_quote
+
+TEXT_TEMPLATE = """
+=== INVESTMENT MEMO: {ticker} ===
+DATE: {date}
+ANALYST: {analyst}
+
+1. MARKET SNAPSHOT
+{snapshot}
+
+2. QUANTITATIVE ANALYSIS
+Risk Level: {risk_level}
+P/E Ratio: {pe_ratio}
+{analysis}
+
+3. RECOMMENDATION
+Based on the {risk_level} risk profile and current market conditions,
+we recommend a {recommendation} strategy.
+
+DISCLAIMER: This is a simulated analysis for demonstration purposes only.
+Not financial advice. Consult a licensed financial advisor before investing.
+
+---
+Generated by The Wall Street Swarm v1.0
+"""
+
+MARKDOWN_TEMPLATE = """# Investment Memo: {ticker}
+
+**Date:** {date}  
+**Analyst:** {analyst}
+
+## 1. Market Snapshot
+{snapshot}
+
+## 2. Quantitative Analysis
+- **Risk Level:** {risk_level}
+- **P/E Ratio:** {pe_ratio}
+
+{analysis}
+
+## 3. Recommendation
+Based on the **{risk_level}** risk profile and current market conditions,
+we recommend a **{recommendation}** strategy.
+
+> DISCLAIMER: This is a simulated analysis for demonstration purposes only.
+> Not financial advice. Consult a licensed financial advisor before investing.
+
+---
+
+"""
+
+MEMO_FORMATS = ("text", "markdown", "jsonl")
+
+_TEMPLATES = {"text": TEXT_TEMPLATE, "markdown": MARKDOWN_TEMPLATE}
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def compile_template(template: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """
+    Split a str.format-style template into (literal, field name) pairs.
+    
+    Only plain named fields are supported; format specs and conversions
+    are rejected so rendering is a straight join.
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if spec or conversion:
+            raise ValueError(f"Unsupported template field '{{{field}!{conversion}:{spec}}}'")
+        parts.append((literal, field))
+    return tuple(parts)
+
+def format_analysis(risk_level: str, pe_ratio: Any, metrics: Any) -> str:
+    """The quantitative analysis line, from the quant agent's typed fields."""
+    return f"Valuation is {risk_level}. P/E Ratio: {pe_ratio}. Metrics: {metrics}"
+
+def memo_fields(research: Dict[str, Any], quant: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Collect the memo fields (everything except date and analyst) from one
+    research/quant pair.
+    
+    The market snapshot is the researcher's rendered raw_data when present,
+    otherwise it is rebuilt from the typed price/P/E/news fields. The
+    analysis line is rebuilt the same way from the quant metrics.
+    """
+    ticker = research.get("ticker", "UNKNOWN")
+    snapshot = research.get("raw_data")
+    if snapshot is None:
+        if research.get("price") is not None:
+            quote = {"price": research["price"], "pe_ratio": research.get("pe_ratio")}
+            snapshot = f"{format_quote(ticker.upper(), quote)}\nNews: {format_news(research.get('news') or [])}"
+        else:
+            snapshot = "No data available"
+    
+    risk_level = quant.get("risk_assessment", "UNKNOWN")
+    analysis = quant.get("quantitative_analysis")
+    if analysis is None:
+        if "metrics" in quant:
+            analysis = format_analysis(risk_level, quant.get("pe_ratio"), quant["metrics"])
+        else:
+            analysis = "No analysis available"
+    
+    return {
+        "ticker": ticker,
+        "snapshot": snapshot,
+        "price": research.get("price"),
+        "news": research.get("news"),
+        "risk_level": risk_level,
+        "pe_ratio": quant.get("pe_ratio", "N/A"),
+        "metrics": quant.get("metrics"),
+        "analysis": analysis,
+        "recommendation": "HOLD" if quant.get("risk_assessment") == "HIGH" else "BUY"
+    }
+
+class MemoRenderer:
+    """
+    Renders investment memos in one output format.
+    """
+    
+    def __init__(self, memo_format: str = "text", analyst: str = "The Wall Street Swarm"):
+        """
+        Initialize a renderer.
+        
+        Args:
+            memo_format: One of MEMO_FORMATS
+            analyst: Analyst line, e.g. "Charlie (Portfolio Manager)"
+        """
+        if memo_format not in MEMO_FORMATS:
+            raise ValueError(f"Unknown memo format '{memo_format}', expected one of {MEMO_FORMATS}")
+        self.memo_format = memo_format
+        self.analyst = analyst
+        self._parts = compile_template(_TEMPLATES[memo_format]) if memo_format in _TEMPLATES else None
+    
+    def _render(self, research: Dict[str, Any], quant: Dict[str, Any], date: str) -> str:
+        fields = memo_fields(research, quant)
+        fields["date"] = date
+        fields["analyst"] = self.analyst
+        
+        if self._parts is None:
+            record = {key: fields[key] for key in (
+                "ticker", "date", "analyst", "price", "pe_ratio", "news",
+                "risk_level", "metrics", "analysis", "recommendation"
+            )}
+            return json.dumps(record) + "\n"
+        
+        chunks: List[str] = []
+        for literal, field in self._parts:
+            chunks.append(literal)
+            if field is not None:
+                chunks.append(str(fields[field]))
+        return "".join(chunks)
+    
+    def render(self, research: Dict[str, Any], quant: Dict[str, Any], date: Optional[str] = None) -> str:
+        """
+        Render one memo.
+        
+        Args:
+            research: Output from ResearcherAgent
+            quant: Output from QuantAgent
+            date: Date line (defaults to now)
+        
+        Returns:
+            The memo text (one JSON line for "jsonl")
+        """
+        return self._render(research, quant, date or time.strftime(DATE_FORMAT))
+    
+    def render_batch(
+        self,
+        pairs: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]],
+        out: Union[str, IO[str]],
+        date: Optional[str] = None
+    ) -> int:
+        """
+        Render a batch of memos, writing each one as soon as it is ready.
+        
+        Pairs are consumed lazily, so a generator keeps memory flat no
+        matter how large the batch is.
+        
+        Args:
+            pairs: (research, quant) pairs
+            out: Path to write (truncated) or an open text stream
+            date: Date line shared by the whole batch (defaults to now)
+        
+        Returns:
+            Number of memos written
+        """
+        date = date or time.strftime(DATE_FORMAT)
+        if isinstance(out, str):
+            with open(out, "w") as f:
+                return self.render_batch(pairs, f, date)
+        
+        written = 0
+        for research, quant in pairs:
+            out.write(self._render(research, quant, date))
+            written += 1
+        return written
@@ -0,0 +1,193 @@
+"""
+Staged pipeline executor for the swarm.
+Each stage has its own bounded input queue and worker threads, so
+different tickers occupy different stages at the same time.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling a stage worker to exit
+_STOP = object()
+
+class PipelineItem:
+    """One unit of work flowing through the pipeline."""
+    
+    __slots__ = ("key", "value", "error", "seq")
+    
+    def __init__(self, key: Any, value: Any, seq: int):
+        self.key = key
+        self.value = value
+        self.error: Optional[BaseException] = None
+        self.seq = seq
+
+class Stage:
+    """
+    One pipeline stage: a function, its workers and its input queue.
+    """
+    
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, queue_size: int = 8):
+        """
+        Define a stage.
+        
+        Args:
+            name: Stage name used in stats (e.g. "research")
+            func: Callable applied to each item's value
+            workers: Worker threads serving this stage
+            queue_size: Capacity of the input queue; a full queue blocks
+                the upstream stage (backpressure)
+        """
+        if workers < 1:
+            raise ValueError(f"Stage {name}: workers must be >= 1, got {workers}")
+        
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.inbox: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.started_at: Optional[float] = None
+    
+    def _record(self, elapsed: float, failed: bool) -> None:
+        """Update counters after one item."""
+        with self._lock:
+            self.processed += 1
+            self.failed += failed
+            self.busy_seconds += elapsed
+    
+    def _note_depth(self) -> None:
+        """Track the deepest the input queue has been."""
+        depth = self.inbox.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+    
+    def stats(self) -> Dict[str, Any]:
+        """Throughput, utilization and queue depth for this stage."""
+        with self._lock:
+            wall = time.perf_counter() - self.started_at if self.started_at else 0.0
+            capacity = wall * self.workers
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "failed": self.failed,
+                "queue_depth": self.inbox.qsize(),
+                "max_queue_depth": self.max_depth,
+                "throughput_per_s": self.processed / wall if wall else 0.0,
+                "avg_service_s": self.busy_seconds / self.processed if self.processed else 0.0,
+                "utilization": self.busy_seconds / capacity if capacity else 0.0
+            }
+
+class StagePipeline:
+    """
+    Runs items through a fixed sequence of stages.
+    
+    Items that fail in one stage skip the remaining stages and come out
+    with their error set. Results are yielded in completion order.
+    """
+    
+    def __init__(self, stages: List[Stage]):
+        """
+        Build a pipeline.
+        
+        Args:
+            stages: Stages in execution order
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self._results: "queue.Queue" = queue.Queue()
+        self._cancelled = threading.Event()
+    
+    def _worker(self, index: int) -> None:
+        """Serve one stage until the stop sentinel arrives."""
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        
+        while True:
+            item = stage.inbox.get()
+            if item is _STOP:
+                return
+            
+            if item.error is None and not self._cancelled.is_set():
+                start = time.perf_counter()
+                try:
+                    item.value = stage.func(item.value)
+                except Exception as e:
+                    item.error = e
+                    logger.error("Pipeline stage %s failed for %s: %s", stage.name, item.key, e)
+                stage._record(time.perf_counter() - start, item.error is not None)
+            
+            # Failed items skip straight to the results
+            if downstream is None or item.error is not None:
+                self._results.put(item)
+            else:
+                downstream.inbox.put(item)
+                downstream._note_depth()
+    
+    def run(self, items: Iterable[Tuple[Any, Any]]) -> Iterator[PipelineItem]:
+        """
+        Push (key, value) pairs through every stage.
+        
+        Args:
+            items: (key, initial value) pairs, e.g. (ticker, ticker)
+        
+        Yields:
+            Finished PipelineItem objects (check .error) as they complete
+        """
+        items = list(items)
+        self._cancelled.clear()
+        threads: List[List[threading.Thread]] = []
+        now = time.perf_counter()
+        for index, stage in enumerate(self.stages):
+            stage.started_at = now
+            workers = []
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(index,), daemon=True,
+                                     name=f"pipeline-{stage.name}-{n}")
+                t.start()
+                workers.append(t)
+            threads.append(workers)
+        
+        # Feed from a separate thread so a full first queue cannot deadlock the consumer
+        def feed() -> None:
+            first = self.stages[0]
+            for seq, (key, value) in enumerate(items):
+                first.inbox.put(PipelineItem(key, value, seq))
+                first._note_depth()
+        
+        feeder = threading.Thread(target=feed, daemon=True, name="pipeline-feed")
+        feeder.start()
+        
+        try:
+            for _ in range(len(items)):
+                yield self._results.get()
+        finally:
+            # Consumer stopped early: let queued items drain without running them
+            self._cancelled.set()
+            feeder.join()
+            # Stop stages front to back so no worker blocks on a dead downstream queue
+            for stage, workers in zip(self.stages, threads):
+                for _ in workers:
+                    stage.inbox.put(_STOP)
+                for t in workers:
+                    t.join()
+            # Drop results nobody collected so the next run starts clean
+            while not self._results.empty():
+                self._results.get_nowait()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage stats, keyed by stage name, in pipeline order."""
+        return {stage.name: stage.stats() for stage in self.stages}
+    
+    def bottleneck(self) -> Optional[str]:
+        """Name of the stage with the highest utilization so far."""
+        stats = self.stats()
+        busiest = max(stats.items(), key=lambda kv: kv[1]["utilization"], default=None)
+        return busiest[0] if busiest and busiest[1]["processed"] else None
@@ -0,0 +1,229 @@
+"""
+Persistent store for finished analyses.
+Memos are content-addressed by ticker, a hash of that ticker's market
+record and a fingerprint of the agent configuration, so an unchanged
+input returns the stored memo without re-running any agent.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+from config import RESULT_STORE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+MEMO_SUFFIX = ".memo"
+FINGERPRINT_FILE = "FINGERPRINT"
+
+def _digest(value: Any) -> str:
+    """SHA-256 of a JSON-serializable value in canonical form."""
+    blob = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def config_fingerprint(settings: Mapping[str, Any]) -> str:
+    """
+    Fingerprint the settings that shape a memo (risk thresholds, memo
+    format, agent names...). Any change yields a different fingerprint.
+    """
+    return _digest(dict(settings))
+
+class AnalysisResultStore:
+    """
+    On-disk memo store with size-bounded LRU eviction.
+    
+    Each memo lives in its own file named "<TICKER>-<key hash>.memo".
+    Files are written to a temp file and renamed into place, so readers
+    never see a partial memo. The configuration fingerprint the entries
+    were produced under is kept next to them; when it changes every entry
+    is dropped.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = RESULT_STORE_MAX_BYTES):
+        """
+        Open (or create) a store.
+        
+        Args:
+            directory: Directory holding the memo files
+            max_bytes: Total memo bytes kept before the least recently
+                used entries are evicted
+        """
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be >= 1, got {max_bytes}")
+        
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        self.fingerprint = self._read_fingerprint()
+        self._scan()
+    
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+    
+    def _read_fingerprint(self) -> Optional[str]:
+        try:
+            with open(self._path(FINGERPRINT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def _scan(self) -> None:
+        """Rebuild the LRU index from the files on disk, oldest use first."""
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(MEMO_SUFFIX):
+                st = os.stat(self._path(name))
+                found.append((st.st_mtime, name, st.st_size))
+        for _mtime, name, size in sorted(found):
+            self._entries[name] = size
+            self.total_bytes += size
+        self._evict()
+    
+    def key(self, ticker: str, record: Any, fingerprint: str) -> str:
+        """
+        File name for one analysis input.
+        
+        Args:
+            ticker: Stock ticker
+            record: The ticker's market data record
+            fingerprint: config_fingerprint() of the agent settings
+        """
+        ticker = ticker.upper()
+        content = hashlib.sha256(f"{ticker}\0{_digest(record)}\0{fingerprint}".encode("utf-8"))
+        return f"{ticker}-{content.hexdigest()[:32]}{MEMO_SUFFIX}"
+    
+    def sync_config(self, fingerprint: str) -> bool:
+        """
+        Drop every entry if the configuration changed since they were written.
+        
+        Returns:
+            True if the store was invalidated
+        """
+        if fingerprint == self.fingerprint:
+            return False
+        
+        with self._lock:
+            if fingerprint == self.fingerprint:
+                return False
+            stale = self.fingerprint is not None and bool(self._entries)
+            self._remove(list(self._entries))
+            self._atomic_write(FINGERPRINT_FILE, fingerprint)
+            self.fingerprint = fingerprint
+        
+        if stale:
+            logger.info("Agent configuration changed; cleared stored analyses")
+        return stale
+    
+    def get(self, ticker: str, record: Any, fingerprint: str) -> Optional[str]:
+        """
+        Return the stored memo for this input, or None.
+        
+        Args:
+            ticker: Stock ticker
+            record: The ticker's market data record
+            fingerprint: config_fingerprint() of the agent settings
+        """
+        self.sync_config(fingerprint)
+        name = self.key(ticker, record, fingerprint)
+        
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(name), encoding="utf-8") as f:
+                    memo = f.read()
+                os.utime(self._path(name))
+            except FileNotFoundError:
+                # Removed behind our back (e.g. by another process)
+                self.total_bytes -= self._entries.pop(name)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        
+        logger.info("Result store hit for %s", ticker.upper())
+        return memo
+    
+    def put(self, ticker: str, record: Any, fingerprint: str, memo: str) -> None:
+        """
+        Store a finished memo, evicting old entries beyond max_bytes.
+        
+        Args:
+            ticker: Stock ticker
+            record: The ticker's market data record
+            fingerprint: config_fingerprint() of the agent settings
+            memo: The memo text
+        """
+        self.sync_config(fingerprint)
+        name = self.key(ticker, record, fingerprint)
+        size = len(memo.encode("utf-8"))
+        
+        with self._lock:
+            self._atomic_write(name, memo)
+            self.total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict()
+    
+    def invalidate(self, ticker: Optional[str] = None) -> int:
+        """
+        Remove stored memos for one ticker, or all of them.
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            # Tickers may contain "-" (BRK-B); the key hash never does
+            names = [name for name in self._entries
+                     if not ticker or name.rsplit("-", 1)[0] == ticker.upper()]
+            self._remove(names)
+        return len(names)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, bytes used and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+    
+    def _atomic_write(self, name: str, text: str) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, self._path(name))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+    
+    def _remove(self, names: Any) -> None:
+        """Delete entries; the caller holds the lock."""
+        for name in names:
+            self.total_bytes -= self._entries.pop(name)
+            try:
+                os.unlink(self._path(name))
+            except FileNotFoundError:
+                pass
+    
+    def _evict(self) -> None:
+        """Drop least recently used entries until under max_bytes."""
+        while self.total_bytes > self.max_bytes and self._entries:
+            name = next(iter(self._entries))
+            self._remove([name])
+            self.evictions += 1
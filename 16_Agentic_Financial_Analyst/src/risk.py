@@ -0,0 +1,173 @@
+"""
+Risk classification for single tickers and vectorized batches.
+The scalar and batch paths share one threshold model so their labels
+always agree; the batch path needs NumPy (optional dependency).
+"""
+import math
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+from config import RISK_THRESHOLDS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for batch scoring
+    np = None
+
+# Risk labels from least to most risky
+RISK_LEVELS: Tuple[str, ...] = ("LOW", "MODERATE", "HIGH")
+
+class RiskModelError(Exception):
+    """Custom exception for risk model errors."""
+    pass
+
+def _require_numpy() -> None:
+    """Fail with a clear message when batch scoring runs without NumPy."""
+    if np is None:
+        raise RiskModelError("Batch risk scoring requires numpy (pip install numpy)")
+
+def threshold_edges(thresholds: Optional[Mapping[str, float]] = None) -> Tuple[float, ...]:
+    """
+    Turn a {label: lower bound} table into ascending cut points.
+    
+    The lowest level (LOW) is the catch-all, so its own bound is ignored,
+    exactly like the original if/elif chain.
+    
+    Args:
+        thresholds: Table keyed by RISK_LEVELS (defaults to RISK_THRESHOLDS)
+    
+    Returns:
+        Lower bounds of every level above LOW, in RISK_LEVELS order
+    """
+    thresholds = thresholds if thresholds is not None else RISK_THRESHOLDS
+    try:
+        edges = tuple(float(thresholds[level]) for level in RISK_LEVELS[1:])
+    except KeyError as e:
+        raise RiskModelError(f"Threshold table is missing level {e}")
+    
+    if any(lo > hi for lo, hi in zip(edges, edges[1:])):
+        raise RiskModelError(f"Thresholds must increase with risk level: {dict(thresholds)}")
+    return edges
+
+def classify_pe(pe_ratio: float, thresholds: Optional[Mapping[str, float]] = None) -> str:
+    """
+    Classify one P/E ratio.
+    
+    Args:
+        pe_ratio: Price to earnings ratio
+        thresholds: Optional threshold table (defaults to RISK_THRESHOLDS)
+    
+    Returns:
+        One of RISK_LEVELS
+    """
+    code = 0
+    for edge in threshold_edges(thresholds):
+        if pe_ratio >= edge:
+            code += 1
+    return RISK_LEVELS[code]
+
+def risk_codes(values: Sequence[float], thresholds: Optional[Mapping[str, float]] = None) -> "np.ndarray":
+    """
+    Classify an array of values in one pass.
+    
+    Args:
+        values: Metric values (e.g. P/E ratios)
+        thresholds: Optional threshold table (defaults to RISK_THRESHOLDS)
+    
+    Returns:
+        Integer array of indexes into RISK_LEVELS. NaN maps to LOW, as it
+        does in the scalar path where every comparison with NaN is False.
+    """
+    _require_numpy()
+    values = np.asarray(values, dtype=np.float64)
+    edges = np.asarray(threshold_edges(thresholds))
+    # Number of edges <= value, i.e. how many levels the value clears
+    codes = np.searchsorted(edges, values, side="right")
+    codes[np.isnan(values)] = 0
+    return codes
+
+def classify_batch(
+    metrics: Mapping[str, Sequence[float]],
+    tables: Optional[Mapping[str, Mapping[str, float]]] = None
+) -> Dict[str, Any]:
+    """
+    Classify several metrics for many tickers; the overall level is the
+    riskiest level any metric reaches.
+    
+    Args:
+        metrics: Metric name -> values, all the same length
+            (e.g. {"pe_ratio": [...]})
+        tables: Metric name -> threshold table; "pe_ratio" defaults to
+            RISK_THRESHOLDS, every other metric needs a table
+    
+    Returns:
+        Dictionary with per-metric "codes", overall "codes" and "labels"
+    """
+    _require_numpy()
+    if not metrics:
+        raise RiskModelError("No metrics given")
+    
+    tables = dict(tables or {})
+    tables.setdefault("pe_ratio", RISK_THRESHOLDS)
+    
+    per_metric = {}
+    for name, values in metrics.items():
+        if name not in tables:
+            raise RiskModelError(f"No threshold table for metric '{name}'")
+        per_metric[name] = risk_codes(values, tables[name])
+    
+    lengths = {len(codes) for codes in per_metric.values()}
+    if len(lengths) != 1:
+        raise RiskModelError(f"Metric arrays differ in length: {sorted(lengths)}")
+    
+    overall = np.maximum.reduce(list(per_metric.values()))
+    return {
+        "codes": overall,
+        "labels": np.asarray(RISK_LEVELS)[overall],
+        "per_metric": per_metric
+    }
+
+def portfolio_summary(codes: Sequence[int], weights: Optional[Sequence[float]] = None,
+                      pe_ratios: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+    """
+    Aggregate per-ticker risk codes into portfolio-level figures.
+    
+    Args:
+        codes: Output of risk_codes() / classify_batch()["codes"]
+        weights: Position weights (equal weights when omitted); they are
+            normalized to sum to 1
+        pe_ratios: Optional P/E ratios for a weighted average P/E
+    
+    Returns:
+        Dictionary with weighted exposure per level, a weighted risk score
+        in [0, 1] (0 = all LOW, 1 = all HIGH) and position counts per level
+    """
+    _require_numpy()
+    codes = np.asarray(codes)
+    if codes.size == 0:
+        raise RiskModelError("Empty portfolio")
+    
+    if weights is None:
+        weights = np.full(codes.size, 1.0 / codes.size)
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != codes.shape:
+            raise RiskModelError("weights must match the number of positions")
+        total = weights.sum()
+        if not total > 0:
+            raise RiskModelError("weights must sum to a positive value")
+        weights = weights / total
+    
+    exposure = np.bincount(codes, weights=weights, minlength=len(RISK_LEVELS))
+    counts = np.bincount(codes, minlength=len(RISK_LEVELS))
+    summary = {
+        "exposure": {level: float(exposure[i]) for i, level in enumerate(RISK_LEVELS)},
+        "counts": {level: int(counts[i]) for i, level in enumerate(RISK_LEVELS)},
+        "weighted_risk_score": float(np.dot(weights, codes) / (len(RISK_LEVELS) - 1))
+    }
+    
+    if pe_ratios is not None:
+        pe = np.asarray(pe_ratios, dtype=np.float64)
+        valid = ~np.isnan(pe)
+        covered = weights[valid].sum()
+        summary["weighted_pe_ratio"] = float(np.dot(weights[valid], pe[valid]) / covered) if covered else math.nan
+    
+    return summary
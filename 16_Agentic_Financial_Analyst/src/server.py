@@ -0,0 +1,218 @@
+"""
+Local HTTP service for the swarm.
+Keeps one FinancialSwarm (tools, caches, agents) warm across requests,
+collapses concurrent requests for the same ticker into one analysis and
+reports queueing and service latency. Runs fully offline.
+
+Endpoints:
+    GET /analyze?ticker=NVDA   -> {"ticker", "memo", "coalesced", "queue_ms", "service_ms", "wait_ms"}
+    GET /stats                 -> request counters and latency percentiles
+    GET /health                -> {"status": "ok"}
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS
+from tracing import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+class AnalysisService:
+    """
+    Runs swarm analyses on a bounded worker pool with per-ticker
+    request coalescing (single-flight).
+    """
+    
+    def __init__(self, swarm: Any, workers: int = SERVER_WORKERS):
+        """
+        Initialize the service.
+        
+        Args:
+            swarm: FinancialSwarm kept warm between requests
+            workers: Analyses running at the same time; further distinct
+                tickers wait in the pool queue
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1, got {workers}")
+        
+        self.swarm = swarm
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="swarm-service")
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.coalesced = 0
+        self.computations = 0
+        self.failures = 0
+        self._queue = LatencyHistogram()
+        self._service = LatencyHistogram()
+        self._wait = LatencyHistogram()
+    
+    def _compute(self, ticker: str, submitted: float) -> Tuple[Optional[str], float, float]:
+        """Run one analysis on a pool thread; returns (memo, queue_s, service_s)."""
+        start = time.perf_counter()
+        memo = self.swarm.analyze(ticker)
+        end = time.perf_counter()
+        return memo, start - submitted, end - start
+    
+    def analyze(self, ticker: str) -> Dict[str, Any]:
+        """
+        Analyze a ticker, joining an identical analysis already in flight.
+        
+        Args:
+            ticker: Stock ticker to analyze
+        
+        Returns:
+            Dictionary with the memo (None on failure), whether the request
+            was coalesced, and queue/service/wait times in milliseconds
+        """
+        ticker = ticker.upper()
+        arrived = time.perf_counter()
+        
+        with self._lock:
+            self.requests += 1
+            flight = self._flights.get(ticker)
+            coalesced = flight is not None
+            if coalesced:
+                self.coalesced += 1
+            else:
+                self.computations += 1
+                flight = self._flights[ticker] = self._pool.submit(self._compute, ticker, arrived)
+        
+        if not coalesced:
+            # Registered outside the lock: a flight that has already finished
+            # runs the callback inline, and _land() takes the lock itself
+            flight.add_done_callback(lambda f, t=ticker: self._land(t, f))
+        
+        try:
+            memo, queue_s, service_s = flight.result()
+        except Exception as e:
+            logger.error("Service analysis crashed for %s: %s", ticker, e)
+            memo, queue_s, service_s = None, 0.0, 0.0
+        wait_s = time.perf_counter() - arrived
+        
+        with self._lock:
+            self._wait.add(wait_s)
+            if not coalesced:
+                self._queue.add(queue_s)
+                self._service.add(service_s)
+                self.failures += memo is None
+        
+        return {
+            "ticker": ticker,
+            "memo": memo,
+            "coalesced": coalesced,
+            "queue_ms": queue_s * 1000,
+            "service_ms": service_s * 1000,
+            "wait_ms": wait_s * 1000
+        }
+    
+    def _land(self, ticker: str, flight: Future) -> None:
+        """Forget a finished flight so the next request starts a fresh one."""
+        with self._lock:
+            if self._flights.get(ticker) is flight:
+                del self._flights[ticker]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Request counters, latency percentiles and cache/store stats."""
+        with self._lock:
+            stats: Dict[str, Any] = {
+                "uptime_s": time.monotonic() - self.started_at,
+                "workers": self.workers,
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "computations": self.computations,
+                "failures": self.failures,
+                "in_flight": len(self._flights),
+                "latency": {
+                    "queue": self._queue.summary(),
+                    "service": self._service.summary(),
+                    "wait": self._wait.summary()
+                }
+            }
+        
+        tool_stats = getattr(self.swarm.tools, "stats", None)
+        if callable(tool_stats):
+            stats["tool_cache"] = tool_stats()
+        if getattr(self.swarm, "result_store", None) is not None:
+            stats["result_store"] = self.swarm.result_store.stats()
+        return stats
+    
+    def close(self) -> None:
+        """Finish running analyses and stop the worker pool."""
+        self._pool.shutdown(wait=True)
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """Routes GET requests to the AnalysisService attached to the server."""
+    
+    server_version = "WallStreetSwarm/1.0"
+    
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        service: AnalysisService = self.server.service
+        
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif url.path == "/stats":
+            self._send_json(200, service.stats())
+        elif url.path == "/analyze":
+            ticker = parse_qs(url.query).get("ticker", [""])[0].strip()
+            if not ticker:
+                self._send_json(400, {"error": "missing 'ticker' query parameter"})
+                return
+            result = service.analyze(ticker)
+            if result["memo"] is None:
+                self._send_json(422, dict(result, error=f"analysis failed for {result['ticker']}"))
+            else:
+                self._send_json(200, result)
+        else:
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+    
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+def make_server(swarm: Any, host: str = SERVER_HOST, port: int = SERVER_PORT,
+                workers: int = SERVER_WORKERS) -> ThreadingHTTPServer:
+    """
+    Build (but do not start) the HTTP server.
+    
+    Args:
+        swarm: FinancialSwarm to serve
+        host: Interface to bind (local only by default)
+        port: Port to bind (0 picks a free one)
+        workers: Concurrent analyses
+    
+    Returns:
+        ThreadingHTTPServer with the service attached as .service
+    """
+    server = ThreadingHTTPServer((host, port), AnalysisRequestHandler)
+    server.daemon_threads = True
+    server.service = AnalysisService(swarm, workers)
+    return server
+
+def serve(swarm: Any, host: str = SERVER_HOST, port: int = SERVER_PORT,
+          workers: int = SERVER_WORKERS) -> None:
+    """Serve until interrupted (Ctrl+C)."""
+    server = make_server(swarm, host, port, workers)
+    logger.info("Swarm service listening on http://%s:%s", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down swarm service")
+    finally:
+        server.server_close()
+        server.service.close()
@@ -2,11 +2,17 @@
 Financial tools module with enhanced error handling and type hints.
 These tools provide deterministic access to market data.
 """
+import contextlib
+import contextvars
 import json
 import os
 import logging
-from typing import Dict, Any, Optional
-from config import DATA_PATH, SUPPORTED_TICKERS
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Mapping, Optional, Tuple
+from config import DATA_PATH, DATA_RELOAD_INTERVAL, MARKET_STORE_EXTENSION, SUPPORTED_TICKERS
+from market_store import MarketStore, MarketStoreError
+from tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -14,50 +20,195 @@ class FinancialToolsError(Exception):
     """Custom exception for financial tools errors."""
     pass
 
+def format_quote(ticker: str, quote: Dict[str, float]) -> str:
+    """Render a quote from get_quote() the way get_stock_price() reports it."""
+    return f"{ticker} Current Price: ${quote['price']} (P/E: {quote['pe_ratio']})"
+
+def format_news(headlines: List[str]) -> str:
+    """Render headlines from get_news_items() the way get_recent_news() reports them."""
+    if not headlines:
+        return "No recent news available."
+    return " | ".join(headlines)
+
+class MarketSnapshot:
+    """
+    Immutable view of one parsed version of the market data file.
+    Replaced wholesale on reload, never mutated in place.
+    """
+    
+    __slots__ = ("db", "signature", "version")
+    
+    def __init__(self, db: Mapping[str, Any], signature: Tuple[int, int], version: int):
+        self.db = db
+        self.signature = signature
+        self.version = version
+
 class FinancialTools:
     """
     Provides deterministic tools for accessing market data.
     Designed to be easily swapped with real API clients (Bloomberg, AlphaVantage).
     """
     
-    def __init__(self, data_path: Optional[str] = None):
+    def __init__(self, data_path: Optional[str] = None,
+                 reload_interval: float = DATA_RELOAD_INTERVAL):
         """
         Initialize the financial tools with market data.
         
         Args:
-            data_path: Path to the market data JSON file
+            data_path: Path to the market data JSON file, or to a memory-mapped
+                market store (MARKET_STORE_EXTENSION) for large universes
+            reload_interval: Seconds between checks of the file's mtime and
+                size; a change triggers a re-parse. 0 disables hot reload.
         """
         self.data_path = data_path or DATA_PATH
-        self.db: Dict[str, Any] = {}
+        self.reload_interval = reload_interval
+        self._snapshot = MarketSnapshot({}, (0, 0), 0)
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
+        self._pinned: contextvars.ContextVar = contextvars.ContextVar(
+            f"pinned_snapshot_{id(self)}", default=None
+        )
         self._load_data()
     
+    @property
+    def db(self) -> Mapping[str, Any]:
+        """Market data visible to the caller (the pinned or latest snapshot)."""
+        return self._current().db
+    
+    @property
+    def version(self) -> int:
+        """Version of the snapshot visible to the caller; bumps on every reload."""
+        return self._current().version
+    
+    def _stat_signature(self) -> Tuple[int, int]:
+        """Return (mtime_ns, size) of the data file."""
+        st = os.stat(self.data_path)
+        return st.st_mtime_ns, st.st_size
+    
     def _load_data(self) -> None:
-        """Load market data from JSON file."""
+        """Load market data from the JSON file or map the market store."""
         try:
             if not os.path.exists(self.data_path):
                 raise FileNotFoundError(f"Data file not found: {self.data_path}")
             
-            with open(self.data_path, "r") as f:
-                self.db = json.load(f)
+            # Stat before reading so a write racing the read triggers another reload
+            signature = self._stat_signature()
+            if self.data_path.endswith(MARKET_STORE_EXTENSION):
+                # Records are decoded lazily, on first lookup
+                db = MarketStore(self.data_path)
+            else:
+                with open(self.data_path, "r") as f:
+                    db = json.load(f)
             
-            logger.info(f"Loaded market data for {len(self.db)} tickers")
+            self._snapshot = MarketSnapshot(db, signature, self._snapshot.version + 1)
+            logger.info("Loaded market data for %s tickers", len(db))
         
         except FileNotFoundError as e:
-            logger.error(f"Data file not found: {e}")
+            logger.error("Data file not found: %s", e)
             raise FinancialToolsError(f"Failed to load data: {e}")
         except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in data file: {e}")
+            logger.error("Invalid JSON in data file: %s", e)
+            raise FinancialToolsError(f"Invalid data format: {e}")
+        except MarketStoreError as e:
+            logger.error("Invalid market store: %s", e)
             raise FinancialToolsError(f"Invalid data format: {e}")
     
-    def get_stock_price(self, ticker: str) -> str:
+    def reload_if_changed(self) -> bool:
         """
-        Get current stock price and P/E ratio.
+        Re-parse the data file if its mtime or size changed.
+        
+        The new snapshot replaces the old one with a single reference swap,
+        so readers never take a lock and in-flight analyses holding the old
+        snapshot are unaffected. A file that fails to parse is logged and
+        skipped; the previous snapshot stays live.
+        
+        Returns:
+            True if a new snapshot was installed
+        """
+        # Only one reloader at a time; concurrent callers just keep reading
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        
+        try:
+            try:
+                signature = self._stat_signature()
+            except OSError as e:
+                logger.warning("Cannot stat data file for reload: %s", e)
+                return False
+            
+            if signature == self._snapshot.signature:
+                return False
+            
+            try:
+                self._load_data()
+            except FinancialToolsError as e:
+                logger.error("Hot reload skipped, keeping version %s: %s", self._snapshot.version, e)
+                # Remember the bad file so it is not re-parsed on every check
+                current = self._snapshot
+                self._snapshot = MarketSnapshot(current.db, signature, current.version)
+                return False
+            
+            logger.info("Hot-reloaded market data (version %s)", self._snapshot.version)
+            return True
+        
+        finally:
+            self._reload_lock.release()
+    
+    def _current(self) -> MarketSnapshot:
+        """Return the pinned snapshot, or the latest one after a throttled reload check."""
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned
+        
+        if self.reload_interval > 0:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.reload_interval
+                self.reload_if_changed()
+        
+        return self._snapshot
+    
+    def _record(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """
+        Raw record for a ticker from the current snapshot, or None.
+        
+        Raises:
+            FinancialToolsError: If the stored record cannot be decoded
+        """
+        try:
+            return self._current().db.get(ticker)
+        except MarketStoreError as e:
+            logger.error("Unreadable record for %s: %s", ticker, e)
+            raise FinancialToolsError(f"Market data for {ticker} is corrupt: {e}")
+    
+    @contextlib.contextmanager
+    def pinned(self, snapshot: Optional[MarketSnapshot] = None) -> Iterator[MarketSnapshot]:
+        """
+        Pin the current snapshot for the calling thread or asyncio task.
+        
+        Every lookup inside the block sees the same version of the data,
+        even if a reload happens meanwhile.
+        
+        Args:
+            snapshot: Snapshot to pin instead of the current one, e.g. to
+                carry one analysis' view across threads
+        """
+        token = self._pinned.set(snapshot or self._current())
+        try:
+            yield self._pinned.get()
+        finally:
+            self._pinned.reset(token)
+    
+    @traced
+    def get_quote(self, ticker: str) -> Dict[str, float]:
+        """
+        Get current stock price and P/E ratio as numbers.
         
         Args:
             ticker: Stock ticker symbol (e.g., "TSLA")
         
         Returns:
-            Formatted string with price and P/E ratio
+            Dictionary with "price" and "pe_ratio"
         
         Raises:
             FinancialToolsError: If ticker not found
@@ -65,43 +216,77 @@ class FinancialTools:
         ticker = ticker.upper()
         
         if ticker not in SUPPORTED_TICKERS:
-            logger.warning(f"Unsupported ticker requested: {ticker}")
+            logger.warning("Unsupported ticker requested: %s", ticker)
         
-        data = self.db.get(ticker)
+        data = self._record(ticker)
         if not data:
-            logger.error(f"Ticker not found in database: {ticker}")
+            logger.error("Ticker not found in database: %s", ticker)
             raise FinancialToolsError(f"Ticker {ticker} not found in database")
         
-        logger.info(f"Retrieved price data for {ticker}")
-        return f"{ticker} Current Price: ${data['price']} (P/E: {data['pe_ratio']})"
+        logger.info("Retrieved price data for %s", ticker)
+        return {"price": data['price'], "pe_ratio": data['pe_ratio']}
     
-    def get_recent_news(self, ticker: str) -> str:
+    @traced
+    def get_stock_price(self, ticker: str) -> str:
         """
-        Get recent news headlines for a ticker.
+        Get current stock price and P/E ratio.
+        
+        Args:
+            ticker: Stock ticker symbol (e.g., "TSLA")
+        
+        Returns:
+            Formatted string with price and P/E ratio
+        
+        Raises:
+            FinancialToolsError: If ticker not found
+        """
+        return format_quote(ticker.upper(), self.get_quote(ticker))
+    
+    @traced
+    def get_news_items(self, ticker: str) -> List[str]:
+        """
+        Get recent news headlines for a ticker as a list.
         
         Args:
             ticker: Stock ticker symbol
         
         Returns:
-            News headlines separated by " | "
+            Headlines, possibly empty
         
         Raises:
             FinancialToolsError: If ticker not found
         """
         ticker = ticker.upper()
-        data = self.db.get(ticker)
+        data = self._record(ticker)
         
         if not data:
-            logger.error(f"Ticker not found: {ticker}")
+            logger.error("Ticker not found: %s", ticker)
             raise FinancialToolsError(f"Ticker {ticker} not found")
         
         if "news" not in data or not data["news"]:
-            logger.warning(f"No news available for {ticker}")
-            return "No recent news available."
+            logger.warning("No news available for %s", ticker)
+            return []
+        
+        logger.info("Retrieved %s news items for %s", len(data['news']), ticker)
+        return data['news']
+    
+    @traced
+    def get_recent_news(self, ticker: str) -> str:
+        """
+        Get recent news headlines for a ticker.
         
-        logger.info(f"Retrieved {len(data['news'])} news items for {ticker}")
-        return " | ".join(data['news'])
+        Args:
+            ticker: Stock ticker symbol
+        
+        Returns:
+            News headlines separated by " | "
+        
+        Raises:
+            FinancialToolsError: If ticker not found
+        """
+        return format_news(self.get_news_items(ticker))
     
+    @traced
     def get_financial_metrics(self, ticker: str) -> Dict[str, Any]:
         """
         Get financial metrics for a ticker.
@@ -116,15 +301,15 @@ class FinancialTools:
             FinancialToolsError: If ticker not found or metrics unavailable
         """
         ticker = ticker.upper()
-        data = self.db.get(ticker)
+        data = self._record(ticker)
         
         if not data:
-            logger.error(f"Ticker not found: {ticker}")
+            logger.error("Ticker not found: %s", ticker)
             raise FinancialToolsError(f"Ticker {ticker} not found")
         
         if "financials" not in data:
-            logger.error(f"No financial metrics for {ticker}")
+            logger.error("No financial metrics for %s", ticker)
             raise FinancialToolsError(f"Financial metrics not available for {ticker}")
         
-        logger.info(f"Retrieved financial metrics for {ticker}")
+        logger.info("Retrieved financial metrics for %s", ticker)
         return data['financials']
\ No newline at end of file
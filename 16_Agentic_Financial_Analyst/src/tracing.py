@@ -0,0 +1,234 @@
+"""
+Lightweight tracing for the swarm.
+Records start/end spans tagged with a ticker, keeps per-span latency
+histograms and exports JSON or Chrome trace files (chrome://tracing,
+Perfetto). When disabled, instrumented calls cost one attribute check.
+"""
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from config import TRACE_MAX_SPANS, TRACING_ENABLED
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with bounded memory.
+    Buckets grow by 2^(1/8) (~9% relative error) from 1 microsecond.
+    """
+    
+    BASE = 1e-6
+    GROWTH = 2 ** 0.125
+    
+    __slots__ = ("buckets", "count", "total", "max")
+    
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def add(self, seconds: float) -> None:
+        """Record one duration."""
+        index = 0 if seconds <= self.BASE else math.ceil(math.log(seconds / self.BASE, self.GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th percentile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.BASE * self.GROWTH ** index, self.max)
+        return self.max
+    
+    def summary(self) -> Dict[str, float]:
+        """Count, mean, max and p50/p95/p99 in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000
+        }
+
+class _NoopSpan:
+    """Shared do-nothing context manager returned while tracing is off."""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> "_NoopSpan":
+        return self
+    
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+class _Span:
+    """An open span; records itself on the tracer when the block exits."""
+    
+    __slots__ = ("tracer", "name", "ticker", "start")
+    
+    def __init__(self, tracer: "Tracer", name: str, ticker: Optional[str]):
+        self.tracer = tracer
+        self.name = name
+        self.ticker = ticker
+    
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        self.tracer.record(self.name, self.ticker, self.start, time.perf_counter(), exc_type is not None)
+        return False
+
+class Tracer:
+    """
+    Collects spans and latency histograms.
+    """
+    
+    def __init__(self, enabled: bool = TRACING_ENABLED, max_spans: int = TRACE_MAX_SPANS):
+        """
+        Initialize a tracer.
+        
+        Args:
+            enabled: Whether spans are recorded
+            max_spans: Most recent spans kept for export (histograms keep
+                counting past this limit)
+        """
+        self.enabled = enabled
+        self.epoch = time.perf_counter()
+        self._spans: Deque[tuple] = deque(maxlen=max_spans)
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+    
+    def enable(self) -> None:
+        """Start recording spans."""
+        self.enabled = True
+    
+    def disable(self) -> None:
+        """Stop recording spans; instrumented code falls back to no-ops."""
+        self.enabled = False
+    
+    def span(self, name: str, ticker: Optional[str] = None) -> Any:
+        """
+        Context manager timing the enclosed block.
+        
+        Args:
+            name: Span name (e.g. "FinancialSwarm.analyze")
+            ticker: Ticker tag for the span
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return _Span(self, name, ticker)
+    
+    def record(self, name: str, ticker: Optional[str], start: float, end: float, error: bool = False) -> None:
+        """Store a finished span and feed its duration into the histogram."""
+        with self._lock:
+            self._spans.append((name, ticker, start, end, threading.get_ident(), error))
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.add(end - start)
+    
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-span-name count, mean, max and p50/p95/p99 latency in ms."""
+        with self._lock:
+            return {name: hist.summary() for name, hist in sorted(self._histograms.items())}
+    
+    def spans(self) -> List[Dict[str, Any]]:
+        """Recorded spans, oldest first, with times relative to the tracer start."""
+        with self._lock:
+            spans = list(self._spans)
+        return [
+            {
+                "name": name,
+                "ticker": ticker,
+                "start_ms": (start - self.epoch) * 1000,
+                "duration_ms": (end - start) * 1000,
+                "thread": tid,
+                "error": error
+            }
+            for name, ticker, start, end, tid, error in spans
+        ]
+    
+    def export_json(self, path: str) -> None:
+        """Write spans and latency summaries to a JSON file."""
+        with open(path, "w") as f:
+            json.dump({"spans": self.spans(), "latency": self.latency_summary()}, f, indent=2)
+    
+    def export_chrome_trace(self, path: str) -> None:
+        """Write spans in Chrome trace-event format (complete "X" events)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span["name"],
+                "cat": "swarm",
+                "ph": "X",
+                "ts": span["start_ms"] * 1000,
+                "dur": span["duration_ms"] * 1000,
+                "pid": pid,
+                "tid": span["thread"],
+                "args": {"ticker": span["ticker"], "error": span["error"]}
+            }
+            for span in self.spans()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    
+    def reset(self) -> None:
+        """Drop all spans and histograms."""
+        with self._lock:
+            self._spans.clear()
+            self._histograms.clear()
+            self.epoch = time.perf_counter()
+
+# Process-wide tracer used by the instrumented swarm code
+tracer = Tracer()
+
+def _ticker_of(value: Any) -> Optional[str]:
+    """Best-effort ticker tag from a call argument (ticker, payload or tuple of payloads)."""
+    if isinstance(value, str):
+        return value.upper()
+    if isinstance(value, dict):
+        return value.get("ticker")
+    if isinstance(value, (tuple, list)) and value:
+        return _ticker_of(value[0])
+    return None
+
+def traced(func: Callable) -> Callable:
+    """
+    Decorator tracing a method as "<ClassName>.<method>", tagged with the
+    ticker found in its first argument. Works for sync and async methods.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            if not tracer.enabled:
+                return await func(self, *args, **kwargs)
+            name = f"{type(self).__name__}.{func.__name__}"
+            with tracer.span(name, _ticker_of(args[0]) if args else None):
+                return await func(self, *args, **kwargs)
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        if not tracer.enabled:
+            return func(self, *args, **kwargs)
+        name = f"{type(self).__name__}.{func.__name__}"
+        with tracer.span(name, _ticker_of(args[0]) if args else None):
+            return func(self, *args, **kwargs)
+    return wrapper
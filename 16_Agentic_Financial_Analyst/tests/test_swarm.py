@@ -2,15 +2,35 @@
 Unit tests for The Wall Street Swarm.
 Run with: python -m pytest tests/
 """
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import random
 import pytest
 import sys
 import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from tools import FinancialTools, FinancialToolsError
-from agents import ResearcherAgent, QuantAgent, WriterAgent, AgentError
+from cache import TTLCache, CachedFinancialTools
+from market_store import MarketStore, convert_json_to_store, write_store
+from tracing import tracer
+from logging_setup import configure_logging, dropped_records, shutdown_logging
+from memo import MemoRenderer
+from result_store import AnalysisResultStore
+from server import make_server
+import config
+from agents import ResearcherAgent, QuantAgent, WriterAgent, AgentError, AgentTimeoutError, Deadline
+import agents
 
 class TestFinancialTools:
     """Test suite for FinancialTools."""
@@ -37,6 +57,220 @@ class TestFinancialTools:
         assert isinstance(result, str)
         assert len(result) > 0
 
+class TestMarketStore:
+    """Test suite for the memory-mapped market store backend."""
+    
+    @pytest.fixture
+    def store_path(self, tmp_path):
+        """Convert the bundled data file into a market store."""
+        path = str(tmp_path / "market.mkts")
+        convert_json_to_store(FinancialTools().data_path, path)
+        return path
+    
+    def test_store_matches_json(self, store_path):
+        """Test that every record round-trips through the store."""
+        json_tools = FinancialTools()
+        store = MarketStore(store_path)
+        
+        assert sorted(store) == sorted(json_tools.db)
+        for ticker, record in json_tools.db.items():
+            assert store[ticker] == record
+        assert "INVALID" not in store
+    
+    def test_tools_on_store_backend(self, store_path):
+        """Test that FinancialTools serves lookups from a store file."""
+        json_tools = FinancialTools()
+        store_tools = FinancialTools(store_path)
+        
+        assert store_tools.get_stock_price("NVDA") == json_tools.get_stock_price("NVDA")
+        assert store_tools.get_recent_news("TSLA") == json_tools.get_recent_news("TSLA")
+        with pytest.raises(FinancialToolsError):
+            store_tools.get_stock_price("INVALID")
+    
+    def test_rejects_non_store_file(self, tmp_path):
+        """Test that a file without the store header is rejected."""
+        path = tmp_path / "bogus.mkts"
+        path.write_bytes(b"{}" * 20)
+        with pytest.raises(FinancialToolsError):
+            FinancialTools(str(path))
+    
+    def test_decoded_records_are_bounded(self, tmp_path):
+        """Test that only the most recently used records stay decoded."""
+        path = str(tmp_path / "market.mkts")
+        write_store({t: {"price": 1.0} for t in ("A", "B", "C")}, path)
+        store = MarketStore(path, cache_size=2)
+        for ticker in ("A", "B", "C", "A"):
+            store[ticker]
+        
+        assert list(store._decoded) == ["C", "A"]
+    
+    def test_corrupt_record_names_ticker(self, tmp_path):
+        """Test that an undecodable record surfaces as a tools error for that ticker."""
+        path = tmp_path / "market.mkts"
+        write_store({"NVDA": {"price": 1.0, "pe_ratio": 2.0, "news": []}}, str(path))
+        path.write_bytes(path.read_bytes().replace(b'{"price"', b'#"price"'))
+        
+        tools = FinancialTools(str(path))
+        with pytest.raises(FinancialToolsError, match="NVDA"):
+            tools.get_quote("NVDA")
+    
+    def test_rejects_truncated_store(self, tmp_path):
+        """Test that a file cut short is rejected at open or at lookup, never read past its end."""
+        path = tmp_path / "market.mkts"
+        write_store({t: {"price": 1.0, "pe_ratio": 2.0, "news": []} for t in ("A", "B", "C")}, str(path))
+        data = path.read_bytes()
+        
+        path.write_bytes(data[:30])
+        with pytest.raises(FinancialToolsError):
+            FinancialTools(str(path))
+        
+        path.write_bytes(data[:-5])
+        tools = FinancialTools(str(path))
+        assert tools.get_quote("A")["price"] == 1.0
+        with pytest.raises(FinancialToolsError, match="C"):
+            tools.get_quote("C")
+
+class TestHotReload:
+    """Test suite for hot reload of the market data file."""
+    
+    @pytest.fixture
+    def data_file(self, tmp_path):
+        """Write a one-ticker data file."""
+        path = tmp_path / "market.json"
+        path.write_text(json.dumps({"NVDA": {"price": 100.0, "pe_ratio": 10.0, "news": []}}))
+        return path
+    
+    def rewrite(self, path, price):
+        """Replace the file contents and bump its mtime."""
+        path.write_text(json.dumps({"NVDA": {"price": price, "pe_ratio": 10.0, "news": []}}))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    def test_reload_only_when_changed(self, data_file):
+        """Test that the file is re-parsed only after it changes."""
+        tools = FinancialTools(str(data_file), reload_interval=0)
+        assert tools.reload_if_changed() is False
+        
+        self.rewrite(data_file, 250.0)
+        assert tools.reload_if_changed() is True
+        assert "$250.0" in tools.get_stock_price("NVDA")
+        assert tools.version == 2
+    
+    def test_pinned_snapshot_survives_reload(self, data_file):
+        """Test that a pinned reader keeps its view while a reload lands."""
+        tools = FinancialTools(str(data_file), reload_interval=0)
+        
+        with tools.pinned():
+            self.rewrite(data_file, 250.0)
+            assert tools.reload_if_changed() is True
+            assert "$100.0" in tools.get_stock_price("NVDA")
+        
+        assert "$250.0" in tools.get_stock_price("NVDA")
+    
+    def test_bad_file_keeps_previous_snapshot(self, data_file):
+        """Test that a malformed rewrite does not replace good data."""
+        tools = FinancialTools(str(data_file), reload_interval=0)
+        data_file.write_text("{not json")
+        
+        assert tools.reload_if_changed() is False
+        assert "$100.0" in tools.get_stock_price("NVDA")
+    
+    def test_cache_follows_reload(self, data_file):
+        """Test that cached lookups are not served across a reload."""
+        tools = CachedFinancialTools(FinancialTools(str(data_file), reload_interval=0))
+        assert "$100.0" in tools.get_stock_price("NVDA")
+        
+        self.rewrite(data_file, 250.0)
+        tools.reload_if_changed()
+        assert "$250.0" in tools.get_stock_price("NVDA")
+    
+    def test_load_overtaken_by_reload_is_not_cached(self, data_file, monkeypatch):
+        """Test that a lookup racing a reload is not stored under either version."""
+        backend = FinancialTools(str(data_file), reload_interval=0)
+        tools = CachedFinancialTools(backend)
+        get_quote = backend.get_quote
+        
+        def reload_then_load(ticker):
+            self.rewrite(data_file, 250.0)
+            backend.reload_if_changed()
+            return get_quote(ticker)
+        
+        monkeypatch.setattr(backend, "get_quote", reload_then_load)
+        tools.get_quote("NVDA")
+        monkeypatch.setattr(backend, "get_quote", get_quote)
+        
+        assert tools.stats()["discarded"] == 1
+        assert tools.get_quote("NVDA")["price"] == 250.0
+    
+    def test_cached_values_are_copies(self, data_file):
+        """Test that mutating a returned value does not change the cache."""
+        tools = CachedFinancialTools(FinancialTools(str(data_file), reload_interval=0))
+        tools.get_quote("NVDA")["price"] = 0.0
+        tools.get_news_items("NVDA").append("injected")
+        
+        assert tools.get_quote("NVDA")["price"] == 100.0
+        assert tools.get_news_items("NVDA") == []
+
+class TestToolCache:
+    """Test suite for the TTL/LRU tool cache."""
+    
+    def test_hits_and_misses(self):
+        """Test that repeated lookups are served from the cache."""
+        tools = CachedFinancialTools(FinancialTools())
+        first = tools.get_stock_price("nvda")
+        second = tools.get_stock_price("NVDA")
+        
+        assert first == second
+        stats = tools.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+    
+    def test_errors_are_not_cached(self):
+        """Test that a failed lookup is retried on the next call."""
+        tools = CachedFinancialTools(FinancialTools())
+        for _ in range(2):
+            with pytest.raises(FinancialToolsError):
+                tools.get_stock_price("INVALID")
+        assert tools.stats()["misses"] == 2
+    
+    def test_ttl_expiry_and_lru_eviction(self):
+        """Test that stale entries reload and the LRU entry is evicted."""
+        cache = TTLCache(max_size=2)
+        loads = []
+        
+        def loader(value):
+            return lambda: loads.append(value) or value
+        
+        cache.get_or_load("a", 0, loader("a"))
+        cache.get_or_load("a", 60, loader("a"))
+        assert loads == ["a", "a"]
+        
+        cache.get_or_load("b", 60, loader("b"))
+        cache.get_or_load("a", 60, loader("a"))
+        cache.get_or_load("c", 60, loader("c"))
+        assert cache.stats()["evictions"] == 1
+        
+        cache.get_or_load("a", 60, loader("a"))
+        cache.get_or_load("b", 60, loader("b"))
+        assert loads == ["a", "a", "b", "c", "b"]
+    
+    def test_concurrent_misses_are_coalesced(self):
+        """Test that simultaneous misses for one key trigger a single load."""
+        cache = TTLCache()
+        calls = []
+        
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return "value"
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: cache.get_or_load("k", 60, slow_loader), range(8)))
+        
+        assert results == ["value"] * 8
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 7
+
 class TestAgents:
     """Test suite for Agents."""
     
@@ -64,6 +298,581 @@ class TestAgents:
         result = agent.execute(research_data)
         assert "risk_assessment" in result
         assert result["risk_assessment"] in ["LOW", "MODERATE", "HIGH"]
+    
+    def test_researcher_typed_fields(self, tools):
+        """Test that research output carries numeric fields next to the text."""
+        agent = ResearcherAgent("Test", "Researcher", tools)
+        result = agent.execute("NVDA")
+        
+        assert result["price"] == 890.0
+        assert result["pe_ratio"] == 95.2
+        assert len(result["news"]) == 3
+        assert result["raw_data"].startswith("NVDA Current Price: $890.0 (P/E: 95.2)")
+    
+    def test_structured_fast_path_skips_text(self, tools):
+        """Test that render=False produces no display strings and the same risk."""
+        researcher = ResearcherAgent("Test", "Researcher", tools)
+        quant = QuantAgent("Test", "Quant", tools)
+        
+        research = researcher.execute({"ticker": "NVDA", "render": False})
+        assert "raw_data" not in research
+        
+        fast = quant.execute(research)
+        full = quant.execute(researcher.execute("NVDA"))
+        assert "quantitative_analysis" not in fast
+        assert fast["risk_assessment"] == full["risk_assessment"] == "HIGH"
+        assert fast["pe_ratio"] == full["pe_ratio"]
+    
+    def test_memo_formats_share_fields(self, tools):
+        """Test that text memos are unchanged and JSON lines carry typed fields."""
+        research = ResearcherAgent("Test", "Researcher", tools).execute("NVDA")
+        quant = QuantAgent("Test", "Quant", tools).execute(research)
+        writer = WriterAgent("Charlie", "Portfolio Manager", None)
+        
+        text = writer.renderer.render(research, quant, "2024-01-01 00:00:00")
+        assert text.startswith("\n=== INVESTMENT MEMO: NVDA ===\nDATE: 2024-01-01 00:00:00\n")
+        assert "we recommend a HOLD strategy." in text
+        
+        # Without raw_data the snapshot is rebuilt from the typed fields
+        bare = {k: v for k, v in research.items() if k != "raw_data"}
+        assert writer.renderer.render(bare, quant, "2024-01-01 00:00:00") == text
+        
+        out = io.StringIO()
+        assert writer.write_batch([(research, quant)] * 3, out, memo_format="jsonl") == 3
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert len(records) == 3 and len({r["date"] for r in records}) == 1
+        assert records[0]["price"] == 890.0 and records[0]["recommendation"] == "HOLD"
+        
+        with pytest.raises(ValueError):
+            WriterAgent("Test", "Writer", None, memo_format="pdf")
+
+class TestDeadlinesAndRetries:
+    """Test suite for per-stage deadlines and retry scheduling."""
+    
+    class FlakyAgent(ResearcherAgent):
+        """Agent whose execute() misbehaves a configurable number of times."""
+        
+        def __init__(self, failures, error=None, hang=0.0):
+            super().__init__("Flaky", "Test", None)
+            self.failures = failures
+            self.error = error
+            self.hang = hang
+            self.calls = 0
+        
+        def execute(self, prompt):
+            self.calls += 1
+            if self.calls <= self.failures:
+                if self.hang:
+                    time.sleep(self.hang)
+                else:
+                    raise self.error
+            return prompt
+    
+    @pytest.fixture(autouse=True)
+    def fast_timing(self, monkeypatch):
+        """Shrink latency, timeouts and backoff so tests run quickly."""
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0)
+        monkeypatch.setattr(agents, "AGENT_TIMEOUT", 0.05)
+        monkeypatch.setattr(agents, "RETRY_BACKOFF_BASE", 0.001)
+        monkeypatch.setattr(agents, "MAX_RETRIES", 3)
+    
+    def test_transient_error_is_retried(self):
+        """Test that a connection error is retried until it succeeds."""
+        agent = self.FlakyAgent(failures=2, error=ConnectionError("reset"))
+        assert agent.think("NVDA") == "NVDA"
+        assert agent.calls == 3
+    
+    def test_permanent_error_is_not_retried(self):
+        """Test that a non-transient error fails on the first attempt."""
+        agent = self.FlakyAgent(failures=1, error=ValueError("bad input"))
+        with pytest.raises(AgentError):
+            agent.think("NVDA")
+        assert agent.calls == 1
+    
+    def test_stuck_stage_times_out_after_retries(self):
+        """Test that a hanging stage is abandoned after MAX_RETRIES."""
+        agent = self.FlakyAgent(failures=10, hang=0.2)
+        with pytest.raises(AgentTimeoutError):
+            agent.think("NVDA")
+        assert agent.calls == 4
+    
+    def test_abandoned_attempt_stops_before_executing(self, monkeypatch):
+        """Test that a timed-out attempt gives up instead of running on in the background."""
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0.2)
+        monkeypatch.setattr(agents, "MAX_RETRIES", 0)
+        agent = self.FlakyAgent(failures=0)
+        with pytest.raises(AgentTimeoutError):
+            agent.think("NVDA")
+        
+        time.sleep(0.3)
+        assert agent.calls == 0
+    
+    def test_busy_workers_fail_fast(self, monkeypatch):
+        """Test that stuck attempts holding every worker fail other calls at once instead of timing them out."""
+        monkeypatch.setattr(agents, "_attempt_slots", threading.BoundedSemaphore(1))
+        monkeypatch.setattr(agents, "MAX_RETRIES", 0)
+        stuck = self.FlakyAgent(failures=1, hang=0.3)
+        with pytest.raises(AgentTimeoutError):
+            stuck.think("NVDA")
+        
+        healthy = self.FlakyAgent(failures=0)
+        with pytest.raises(AgentError) as excinfo:
+            healthy.think("TSLA")
+        assert not isinstance(excinfo.value, AgentTimeoutError)
+        assert healthy.calls == 0
+        
+        time.sleep(0.35)
+        assert healthy.think("TSLA") == "TSLA"
+    
+    def test_timed_attempt_sees_caller_context(self):
+        """Test that context variables set by the caller reach the attempt."""
+        var = contextvars.ContextVar("test_var", default=None)
+        agent = self.FlakyAgent(failures=0)
+        agent.execute = lambda prompt: var.get()
+        
+        var.set("pinned")
+        assert agent.think("NVDA") == "pinned"
+    
+    def test_exhausted_budget_skips_stage(self):
+        """Test that a stage is cancelled before running when no budget remains."""
+        agent = self.FlakyAgent(failures=0)
+        with pytest.raises(AgentTimeoutError):
+            agent.think("NVDA", Deadline(0))
+        assert agent.calls == 0
+    
+    def test_async_slow_stage_is_cancelled(self, monkeypatch):
+        """Test that athink() cancels attempts whose latency overruns the deadline."""
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0.2)
+        agent = self.FlakyAgent(failures=0)
+        with pytest.raises(AgentTimeoutError):
+            asyncio.run(agent.athink("NVDA"))
+        assert agent.calls == 0
+
+class TestBatchRiskScoring:
+    """Test suite for vectorized risk scoring."""
+    
+    @pytest.fixture
+    def quant(self):
+        pytest.importorskip("numpy")
+        return QuantAgent("Test", "Quant", None)
+    
+    def test_batch_matches_scalar_labels(self, quant):
+        """Test that batch labels equal the scalar path, boundaries included."""
+        rng = random.Random(7)
+        pe_ratios = [rng.uniform(0, 150) for _ in range(500)]
+        pe_ratios += [50.0, 90.0, 49.999, 89.999, 0.0, -5.0, float("nan")]
+        
+        batch = quant.assess_batch(pe_ratios)["risk_levels"]
+        assert list(batch) == [quant._calculate_risk(pe) for pe in pe_ratios]
+    
+    def test_custom_tables_and_worst_metric_wins(self, quant):
+        """Test per-metric tables and that the riskiest metric sets the level."""
+        result = quant.assess_batch(
+            [10.0, 10.0, 95.0],
+            metrics={"debt_to_equity": [0.5, 3.0, 0.5]},
+            tables={"debt_to_equity": {"LOW": 0.0, "MODERATE": 1.0, "HIGH": 2.5}}
+        )
+        assert list(result["risk_levels"]) == ["LOW", "HIGH", "HIGH"]
+    
+    def test_portfolio_exposure(self, quant):
+        """Test weighted exposure and risk score aggregates."""
+        result = quant.assess_batch([10.0, 60.0, 95.0], weights=[2, 1, 1])
+        portfolio = result["portfolio"]
+        
+        assert portfolio["exposure"] == pytest.approx({"LOW": 0.5, "MODERATE": 0.25, "HIGH": 0.25})
+        assert portfolio["counts"] == {"LOW": 1, "MODERATE": 1, "HIGH": 1}
+        assert portfolio["weighted_risk_score"] == pytest.approx(0.375)
+        assert portfolio["weighted_pe_ratio"] == pytest.approx(43.75)
+    
+    def test_rejects_non_monotonic_table(self, quant):
+        """Test that a table whose bounds decrease with risk is rejected."""
+        with pytest.raises(AgentError):
+            quant.assess_batch([10.0], tables={"pe_ratio": {"LOW": 0, "MODERATE": 90, "HIGH": 50}})
+
+class TestLogging:
+    """Test suite for the async logging pipeline."""
+    
+    @pytest.fixture(autouse=True)
+    def restore_logging(self):
+        yield
+        configure_logging()
+    
+    def test_async_writes_after_shutdown(self, tmp_path):
+        """Test that queued records reach every stream once the writer stops."""
+        path = tmp_path / "swarm.log"
+        console = io.StringIO()
+        configure_logging(async_mode=True, sample_rate=1.0, log_file=str(path), stream=console)
+        
+        for i in range(500):
+            logging.getLogger("agents").info("record %d", i)
+        shutdown_logging()
+        
+        lines = path.read_text().splitlines()
+        assert len(lines) == 500
+        assert lines[-1].endswith("record 499")
+        assert console.getvalue().count("\n") == 500
+    
+    def test_full_queue_drops_and_counts(self):
+        """Test that a stalled writer bounds the queue and reports what it dropped."""
+        class StalledStream(io.StringIO):
+            def __init__(self):
+                super().__init__()
+                self.writing = threading.Event()
+                self.release = threading.Event()
+            
+            def write(self, text):
+                self.writing.set()
+                self.release.wait(5)
+                return super().write(text)
+        
+        console = StalledStream()
+        configure_logging(async_mode=True, sample_rate=1.0, log_file=None, stream=console, queue_size=2)
+        logger = logging.getLogger("agents")
+        logger.info("first")
+        assert console.writing.wait(5)
+        
+        for i in range(10):
+            logger.info("burst %d", i)
+        assert dropped_records() == 8
+        
+        console.release.set()
+        shutdown_logging()
+        text = console.getvalue()
+        assert "burst 1" in text and "burst 2" not in text
+        assert "8 log records dropped" in text
+    
+    def test_reconfigure_keeps_foreign_handlers(self):
+        """Test that only the handlers this module installed are replaced or removed."""
+        root = logging.getLogger()
+        shutdown_logging()
+        foreign = logging.NullHandler()
+        root.addHandler(foreign)
+        before = list(root.handlers)
+        try:
+            configure_logging(async_mode=False, sample_rate=1.0, log_file=None, stream=io.StringIO())
+            configure_logging(async_mode=True, sample_rate=1.0, log_file=None, stream=io.StringIO())
+            installed = [h for h in root.handlers if h not in before]
+            assert len(installed) == 1
+            assert all(h in root.handlers for h in before)
+            
+            shutdown_logging()
+            assert root.handlers == before
+        finally:
+            root.removeHandler(foreign)
+    
+    def test_sampling_keeps_warnings(self, tmp_path):
+        """Test that INFO sampling drops agent chatter but never warnings."""
+        path = tmp_path / "swarm.log"
+        configure_logging(async_mode=False, sample_rate=0.0, log_file=str(path), stream=io.StringIO())
+        
+        logging.getLogger("agents").info("dropped")
+        logging.getLogger("agents").warning("kept warning")
+        logging.getLogger("__main__").info("kept info")
+        logging.shutdown()
+        
+        text = path.read_text()
+        assert "dropped" not in text
+        assert "kept warning" in text and "kept info" in text
+
+class TestResultStore:
+    """Test suite for the persistent analysis result store."""
+    
+    @pytest.fixture
+    def data_file(self, tmp_path):
+        """Write a two-ticker data file."""
+        path = tmp_path / "market.json"
+        self.rewrite(path, 100.0)
+        return path
+    
+    def rewrite(self, path, nvda_price):
+        """Replace the file contents and bump its mtime."""
+        record = {"price": nvda_price, "pe_ratio": 60.0, "news": ["x"], "financials": {}}
+        path.write_text(json.dumps({"NVDA": record, "TSLA": dict(record, price=50.0)}))
+        if path.exists():
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    @pytest.fixture
+    def make_swarm(self, monkeypatch, tmp_path, data_file):
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0)
+        from main import FinancialSwarm
+        
+        def make():
+            tools = FinancialTools(str(data_file), reload_interval=0)
+            return FinancialSwarm(tools, AnalysisResultStore(str(tmp_path / "results")))
+        return make
+    
+    def test_unchanged_input_skips_agents(self, make_swarm, monkeypatch):
+        """Test that a repeat analysis returns the stored memo, even after a restart."""
+        memo = make_swarm().analyze("NVDA")
+        
+        swarm = make_swarm()
+        monkeypatch.setattr(swarm.researcher, "think", lambda *a: pytest.fail("agents re-ran"))
+        assert swarm.analyze("nvda") == memo
+        assert swarm.result_store.stats()["hits"] == 1
+    
+    def test_changed_record_or_thresholds_miss(self, make_swarm, data_file, monkeypatch):
+        """Test that new data for the ticker, or new thresholds, force a re-run."""
+        swarm = make_swarm()
+        swarm.analyze("NVDA")
+        swarm.analyze("TSLA")
+        
+        self.rewrite(data_file, 120.0)
+        swarm.tools.reload_if_changed()
+        assert "$120.0" in swarm.analyze("NVDA")
+        assert swarm.result_store.stats()["misses"] == 3
+        
+        # TSLA's record did not change, so its memo is still valid
+        swarm.analyze("TSLA")
+        assert swarm.result_store.stats()["hits"] == 1
+        
+        monkeypatch.setitem(config.RISK_THRESHOLDS, "HIGH", 55)
+        assert "Risk Level: HIGH" in swarm.analyze("NVDA")
+        assert swarm.result_store.stats()["entries"] == 1
+    
+    def test_reload_between_stages_keeps_one_version(self, make_swarm, data_file, monkeypatch):
+        """Test that a reload landing mid-analysis is not seen by later stages or the store key."""
+        swarm = make_swarm()
+        research = swarm.researcher.execute
+        quant = swarm.quant.execute
+        seen = []
+        
+        def research_then_reload(request):
+            result = research(request)
+            self.rewrite(data_file, 120.0)
+            assert swarm.tools.reload_if_changed() is True
+            return result
+        
+        def record_version(research_data):
+            seen.append(swarm.tools.version)
+            return quant(research_data)
+        
+        monkeypatch.setattr(swarm.researcher, "execute", research_then_reload)
+        monkeypatch.setattr(swarm.quant, "execute", record_version)
+        assert "$100.0" in swarm.analyze("NVDA")
+        assert seen == [1]
+        
+        # The v1 memo must not be stored under the v2 record
+        monkeypatch.setattr(swarm.researcher, "execute", research)
+        assert "$120.0" in swarm.analyze("NVDA")
+        assert seen == [1, 2]
+        assert swarm.result_store.stats()["hits"] == 0
+    
+    def test_eviction_and_invalidation(self, tmp_path):
+        """Test that the store stays under its byte budget and can be cleared."""
+        store = AnalysisResultStore(str(tmp_path / "results"), max_bytes=250)
+        for i in range(5):
+            store.put(f"T{i}", {"i": i}, "cfg", "m" * 100)
+        
+        stats = store.stats()
+        assert stats["entries"] == 2 and stats["bytes"] <= 250 and stats["evictions"] == 3
+        assert store.get("T0", {"i": 0}, "cfg") is None
+        assert store.get("T4", {"i": 4}, "cfg") == "m" * 100
+        
+        assert store.invalidate("t4") == 1
+        assert store.get("T4", {"i": 4}, "cfg") is None
+        assert AnalysisResultStore(str(tmp_path / "results")).stats()["entries"] == 1
+    
+    def test_invalidate_matches_whole_ticker(self, tmp_path):
+        """Test that invalidating a ticker leaves tickers it prefixes alone."""
+        store = AnalysisResultStore(str(tmp_path / "results"))
+        store.put("BRK", {"i": 0}, "cfg", "brk")
+        store.put("BRK-B", {"i": 1}, "cfg", "brk-b")
+        
+        assert store.invalidate("brk") == 1
+        assert store.get("BRK-B", {"i": 1}, "cfg") == "brk-b"
+        assert store.invalidate() == 1
+
+class TestFinancialSwarm:
+    """Test suite for the swarm orchestrator."""
+    
+    @pytest.fixture
+    def swarm(self, monkeypatch):
+        """Create a swarm with the simulated LLM latency disabled."""
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0)
+        from main import FinancialSwarm
+        return FinancialSwarm()
+    
+    def test_analyze_many_returns_every_ticker(self, swarm):
+        """Test that each requested ticker yields exactly one result."""
+        results = dict(swarm.analyze_many(["nvda", "TSLA", "INVALID"], max_concurrency=2))
+        
+        assert set(results) == {"NVDA", "TSLA", "INVALID"}
+        assert "INVESTMENT MEMO: NVDA" in results["NVDA"]
+        assert "INVESTMENT MEMO: TSLA" in results["TSLA"]
+        assert results["INVALID"] is None
+    
+    def test_assess_returns_typed_result(self, swarm):
+        """Test the memo-free assessment path."""
+        result = swarm.assess("tsla")
+        assert result["ticker"] == "TSLA"
+        assert result["risk_assessment"] == "MODERATE"
+        assert result["metrics"]["revenue_growth"] == "15%"
+        assert swarm.assess("INVALID") is None
+    
+    def test_analyze_pipelined_overlaps_stages(self, swarm, monkeypatch):
+        """Test that the pipeline finishes every ticker and reports stage stats."""
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0.02)
+        tickers = ["NVDA", "TSLA", "INVALID"] * 4
+        
+        start = time.perf_counter()
+        results = list(swarm.analyze_pipelined(tickers, workers={"research": 2, "quant": 2, "writer": 2}))
+        elapsed = time.perf_counter() - start
+        
+        assert sorted(t for t, _ in results) == sorted(tickers)
+        assert all((memo is None) == (t == "INVALID") for t, memo in results)
+        # 12 tickers x 3 stages x 20ms would take 0.72s if run strictly in sequence
+        assert elapsed < 0.5
+        
+        stats = swarm.pipeline.stats()
+        assert list(stats) == ["research", "quant", "writer"]
+        assert stats["research"]["processed"] == 12
+        assert stats["research"]["failed"] == 4
+        assert stats["writer"]["processed"] == 8
+    
+    def test_tracing_records_tagged_spans(self, swarm, tmp_path):
+        """Test that an analysis produces ticker-tagged spans and exports."""
+        tracer.reset()
+        tracer.enable()
+        try:
+            swarm.analyze("NVDA")
+        finally:
+            tracer.disable()
+        
+        names = {span["name"] for span in tracer.spans()}
+        assert {"FinancialSwarm.analyze", "ResearcherAgent.think", "QuantAgent.think",
+                "WriterAgent.think", "FinancialTools.get_quote"} <= names
+        assert all(span["ticker"] == "NVDA" for span in tracer.spans())
+        assert tracer.latency_summary()["FinancialSwarm.analyze"]["count"] == 1
+        
+        path = tmp_path / "trace.json"
+        tracer.export_chrome_trace(str(path))
+        events = json.loads(path.read_text())["traceEvents"]
+        assert events and all(event["ph"] == "X" for event in events)
+        
+        tracer.reset()
+        swarm.analyze("NVDA")
+        assert tracer.spans() == []
+    
+    def test_write_memos_streams_markdown(self, swarm, tmp_path):
+        """Test batch memo writing to a file, skipping unknown tickers."""
+        path = tmp_path / "memos.md"
+        assert swarm.write_memos(["NVDA", "XYZ", "TSLA"], str(path), memo_format="markdown") == 2
+        
+        text = path.read_text()
+        assert text.count("# Investment Memo:") == 2
+        assert "NVDA Current Price: $890.0" in text
+    
+    def test_write_memos_matches_analyze(self, swarm, monkeypatch):
+        """Test that a batch memo carries the same content as analyze() for the ticker."""
+        def undated(memo):
+            return [line for line in memo.splitlines() if not line.startswith("DATE:")]
+        
+        out = io.StringIO()
+        swarm.write_memos(["NVDA"], out, memo_format="text")
+        assert undated(out.getvalue()) == undated(swarm.analyze("NVDA"))
+        assert "No analysis available" not in out.getvalue()
+        
+        monkeypatch.setattr(swarm.writer, "renderer", MemoRenderer("jsonl", swarm.writer.renderer.analyst))
+        out = io.StringIO()
+        swarm.write_memos(["NVDA"], out)
+        batch = json.loads(out.getvalue())
+        single = json.loads(swarm.analyze("NVDA"))
+        assert batch.pop("date") and single.pop("date")
+        assert batch == single
+        assert batch["metrics"]["revenue_growth"]
+    
+    def test_analyze_many_rejects_bad_concurrency(self, swarm):
+        """Test that a non-positive concurrency limit is rejected."""
+        with pytest.raises(ValueError):
+            list(swarm.analyze_many(["NVDA"], max_concurrency=0))
+    
+    def test_aanalyze_many_on_one_event_loop(self, swarm):
+        """Test that async analyses complete on a shared event loop."""
+        async def collect():
+            return {t: m async for t, m in swarm.aanalyze_many(["NVDA", "TSLA"] * 5, max_concurrency=10)}
+        
+        results = asyncio.run(collect())
+        assert set(results) == {"NVDA", "TSLA"}
+        assert all("INVESTMENT MEMO" in memo for memo in results.values())
+
+class TestAnalysisService:
+    """Test suite for the local HTTP analysis service."""
+    
+    @pytest.fixture
+    def server(self, monkeypatch):
+        """Serve a warm swarm on a free local port."""
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0.1)
+        from main import FinancialSwarm
+        server = make_server(FinancialSwarm(), "127.0.0.1", 0, workers=2)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+    
+    def get(self, server, path):
+        url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+    
+    def test_concurrent_requests_coalesce(self, server):
+        """Test that simultaneous requests for one ticker share one analysis."""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: self.get(server, "/analyze?ticker=nvda"), range(8)))
+        
+        assert all(status == 200 for status, _ in results)
+        assert len({body["memo"] for _, body in results}) == 1
+        
+        status, stats = self.get(server, "/stats")
+        assert status == 200
+        assert stats["requests"] == 8
+        assert stats["computations"] + stats["coalesced"] == 8
+        assert stats["computations"] < 8
+        assert stats["latency"]["service"]["count"] == stats["computations"]
+    
+    def test_health_and_errors(self, server):
+        """Test the health check and the error statuses."""
+        assert self.get(server, "/health") == (200, {"status": "ok"})
+        assert self.get(server, "/analyze")[0] == 400
+        assert self.get(server, "/nope")[0] == 404
+        
+        status, body = self.get(server, "/analyze?ticker=XYZ")
+        assert status == 422 and body["memo"] is None
+    
+    def test_request_on_warm_result_store(self, monkeypatch, tmp_path):
+        """Test that an analysis finishing before its flight is registered does not deadlock."""
+        monkeypatch.setattr(agents, "SIMULATED_LATENCY", 0)
+        from main import FinancialSwarm
+        store = str(tmp_path / "results")
+        memo = FinancialSwarm(result_store=AnalysisResultStore(store)).analyze("NVDA")
+        
+        server = make_server(FinancialSwarm(result_store=AnalysisResultStore(store)), "127.0.0.1", 0, workers=1)
+        # A store hit can finish before submit() returns; force that ordering
+        submit = server.service._pool.submit
+        
+        def submit_and_finish(*args):
+            future = submit(*args)
+            future.exception()
+            return future
+        
+        monkeypatch.setattr(server.service._pool, "submit", submit_and_finish)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            results = [self.get(server, "/analyze?ticker=NVDA") for _ in range(3)]
+            stats = self.get(server, "/stats")[1]
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.service.close()
+        
+        assert all(status == 200 and body["memo"] == memo for status, body in results)
+        assert stats["in_flight"] == 0 and stats["computations"] == 3
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file